@@ -1,5 +1,6 @@
 # Text_data_retreival/Text_data_retreival.py
-import os
+import os, re, glob, json, time, argparse, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 
 
@@ -10,56 +11,85 @@ ROOT = pathlib.Path(__file__).resolve().parents[1]  # .../Semantic_Tech
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from docx import Document
 from rdflib import Graph
-from pipeline.ontology_vocab import load_ontology, extract_vocab
-from pipeline.llm_ie import extract_triples_llm
-from pipeline.emb_linker import OntologyLinker
-from pipeline.abox_writer import write_abox
+from pipeline.docx_stream import read_text
+from pipeline.ontology_vocab import load_vocab
+from pipeline.llm_ie import extract_triples_llm, extract_chunks_llm, TEMPERATURE
+from pipeline.rules_ie import get_engine
+from pipeline.fusion import fuse, rules_as_triples
+from pipeline.validator import validate_abox
+from pipeline.reasoner import reason_abox
+from pipeline.emb_linker import OntologyLinker, model_id
+from pipeline.lexical_index import LexicalIndex
+from pipeline.emb_cache import EmbeddingCache
+from pipeline.llm_cache import LLMCache
+from pipeline.abox_writer import write_abox, merge_aboxes, patch_abox, export_turtle
+from pipeline.triple_store import TripleStore
+from pipeline.manifest import Manifest, update_document, document_lines, extraction_key, linking_key
+from pipeline import metrics
 # from pipeline.wikidata import wikidata_search    # optional
 # from pipeline.viz import visualize_tbox_abox, visualize_abox_rdf  # if you already have these
 
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
-ONTO_PATH = os.path.join(ROOT, "ontology", "general_aec.owl")
+ONTO_PATH = os.path.join(ROOT, "ontology", "general_aec.owl")  # or the builder quadstore, general_aec.sqlite3
 DOCX = os.path.join(ROOT, "input", "Building_X_Risk_Analysis.docx")
 OUT_TTL = os.path.join(ROOT, "input", "llm_linked_abox.ttl")
+EMB_CACHE_DIR = os.path.join(ROOT, "cache", "embeddings")
+EMB_MODEL = "all-MiniLM-L6-v2"
+EMB_BACKEND = os.getenv("EMB_BACKEND", "torch")  # CPU nodes: "int8", "onnx" or "onnx-int8"
+EMB_THREADS = int(os.getenv("EMB_THREADS", "0")) or None  # intra-op threads; None = library default
+LABEL_DTYPE = "float32"  # label matrices: "float16" or "int8" to cut memory
+LLM_MODEL = "gpt-4o-mini"
+LLM_CACHE_PATH = os.path.join(ROOT, "cache", "llm_responses.sqlite")
+LLM_REPLAY = os.getenv("LLM_REPLAY", "") == "1"  # CI: fail on cache miss instead of calling the API
+LINK_INDEX = "exact"  # "ivf" for large TBoxes; index saved next to the ontology
+LINK_LEXICAL = "fuzzy"  # exact/fuzzy label tiers before the embeddings: "exact", "fuzzy" or "" (embeddings only)
+SHAPES_PATH = os.path.join(ROOT, "abox", "fire_safety_shapes.ttl")
+RULES_PATH = os.path.join(ROOT, "abox", "derived_rules.dl")
+REASON = True  # 9) materialize subclass/domain/range/subproperty + RULES_PATH into <abox>.inferred.nt
+EXPORT_TTL = True  # incremental runs patch <out>.nt; also write the Turtle copy at out_ttl
 
 def read_docx_text(path: str) -> str:
-    doc = Document(path)
-    return "\n".join(p.text for p in doc.paragraphs if p.text.strip()).strip()
+    # streamed from word/document.xml; table rows come through as "a | b | c" lines
+    return read_text(path)
 
-def main(docx_path: str, subject_id="Asset_X"):
-    # 1) Load ontology + vocab
+def build_linker(readonly_cache: bool = False):
+    """Ontology vocab + OntologyLinker (lexical tiers, embedding-cached); returns (linker, emb_cache)."""
     if not os.path.exists(ONTO_PATH):
         raise FileNotFoundError(f"Ontology not found at {ONTO_PATH}")
-    onto = load_ontology(ONTO_PATH)
-    classes, obj_props, data_props = extract_vocab(onto)
-    linker = OntologyLinker(classes, obj_props, data_props)
-
-    # 2) Read text
-    print(f"📄 Using DOCX: {docx_path}")
-    text = read_docx_text(docx_path)
+    classes, obj_props, data_props = load_vocab(ONTO_PATH)
+    emb_cache = EmbeddingCache(EMB_CACHE_DIR, model_id(EMB_MODEL, EMB_BACKEND), readonly=readonly_cache)
+    lexical = (LexicalIndex(classes, obj_props, data_props, fuzzy=LINK_LEXICAL == "fuzzy")
+               if LINK_LEXICAL else None)
+    linker = OntologyLinker(classes, obj_props, data_props, model_name=EMB_MODEL, cache=emb_cache,
+                            index=LINK_INDEX, index_path=ONTO_PATH, lexical=lexical,
+                            backend=EMB_BACKEND, threads=EMB_THREADS, label_dtype=LABEL_DTYPE)
+    emb_cache.flush()  # persist label embeddings even if the run stops early
+    return linker, emb_cache
 
-    # 3) LLM → triples (mention-level; unlinked)
-    triples = extract_triples_llm(text)
-    if not triples:
-        print("⚠️ LLM returned no triples.")
-        return
+def link_triples(triples, linker, subject_id):
+    # Link mentions to ontology (exact/fuzzy labels, then embeddings), one batched pass per kind
+    ent_mentions = [t["subject"].strip() for t in triples]
+    ent_mentions += [str(t["object"]).strip() for t in triples
+                     if not t.get("object_is_literal", False) and t.get("object") is not None]
+    ent_links  = linker.link_entities(ent_mentions, top_k=1)
+    pred_links = linker.link_properties([t["predicate"].strip() for t in triples], top_k=1)
 
-    # 4) Link mentions to ontology (embeddings)
     linked = []
     for t in triples:
         subj_m = t["subject"].strip()
         pred_m = t["predicate"].strip()
         obj_is_lit = t.get("object_is_literal", False)
 
-        # subject class via embeddings
-        subj_link = linker.link_entity(subj_m, top_k=1)
+        # subject class via the linker tiers
+        subj_link = ent_links[subj_m]
         subj_class = subj_link[0]["name"] if subj_link else None
+        subj_score = subj_link[0]["score"] if subj_link else None
+        subj_tier = subj_link[0]["tier"] if subj_link else None
 
         # predicate → object or data property
-        pred_link = linker.link_property(pred_m, top_k=1)
+        pred_link = pred_links[pred_m]
         if not pred_link:
             # skip if we cannot decide predicate
             continue
@@ -67,32 +97,315 @@ def main(docx_path: str, subject_id="Asset_X"):
 
         triple_out = {
             "subject": {"name": subject_id if subj_m.lower() in ("building","tunnel","asset") else subj_m.replace(" ","_"),
-                        "class": subj_class},
-            "predicate": {"name": pred_best["name"], "kind": pred_best["kind"]}
+                        "class": subj_class, "score": subj_score, "tier": subj_tier},
+            "predicate": {"name": pred_best["name"], "kind": pred_best["kind"], "tier": pred_best["tier"]}
         }
+        # provenance for fusion
+        for k in ("confidence", "chunk", "offset"):
+            if t.get(k) is not None:
+                triple_out[k] = t[k]
 
         if pred_best["kind"] == "object" and not obj_is_lit:
             obj_m = str(t["object"]).strip()
-            obj_link = linker.link_entity(obj_m, top_k=1)
+            obj_link = ent_links.get(obj_m) or []
             obj_class = obj_link[0]["name"] if obj_link else None
-            triple_out["object"] = {"name": obj_m.replace(" ","_"), "class": obj_class}
+            triple_out["object"] = {"name": obj_m.replace(" ","_"), "class": obj_class,
+                                    "score": obj_link[0]["score"] if obj_link else None,
+                                    "tier": obj_link[0]["tier"] if obj_link else None}
         else:
             # data value
             val = t.get("object")
             triple_out["object_literal"] = {"value": val}
 
         linked.append(triple_out)
+    return linked
+
+def _validate(abox_path: str):
+    # 7) TBox + SHACL checks; violations are reported, never fatal
+    with metrics.span("stage.validate"):
+        report = validate_abox(abox_path, ONTO_PATH,
+                               shapes=SHAPES_PATH if os.path.exists(SHAPES_PATH) else None,
+                               report_path=abox_path + ".validation.json")
+    return {"conforms": report["conforms"], "violations": report["violations"]}
+
+def _reason(abox_path: str, added=None):
+    # 9) derived facts; added = delta lines to apply to the saved reasoner state (no retracts)
+    with metrics.span("stage.reason"):
+        st = reason_abox(abox_path, ONTO_PATH,
+                         rules_path=RULES_PATH if os.path.exists(RULES_PATH) else None,
+                         out_path=abox_path + ".inferred.nt",
+                         state_path=abox_path + ".reasoner.pkl", added=added)
+    return {k: st[k] for k in ("derived", "incremental", "inferred_per_s")}
+
+def process_document(docx_path: str, subject_id: str, linker, llm_cache, out_ttl: str, limiter=None,
+                     incremental: bool = True):
+    """
+    Steps 2-9 for one document; returns per-document stats. Rule and LLM
+    triples are fused (pipeline.fusion) before writing; the written ABox is
+    validated and the report saved as <out_ttl>.validation.json, then
+    derived facts go to <out_ttl>.inferred.nt (pipeline.reasoner).
+    incremental keeps the ABox as N-Triples (<out>.nt) with a manifest next
+    to it (<out>.nt.manifest.json) so a re-run only re-extracts/re-links
+    changed chunks and patches the .nt in place; there, fusion runs per
+    chunk, an add-only delta is reasoned over incrementally from
+    <out>.nt.reasoner.pkl and, with EXPORT_TTL, out_ttl is written once
+    from the patched .nt.
+    """
+    rules = get_engine()
+    t0 = time.perf_counter()
+    stats = {"doc": docx_path, "out": None, "triples": 0, "linked": 0}
+
+    # 2) Read text
+    print(f"📄 Using DOCX: {docx_path}")
+    with metrics.span("stage.read"):
+        text = read_docx_text(docx_path)
+
+    if incremental:
+        # Turtle patches re-serialize the whole graph: patch N-Triples, export Turtle once
+        abox = out_ttl if out_ttl.endswith(".nt") else os.path.splitext(out_ttl)[0] + ".nt"
+        manifest = Manifest(abox + ".manifest.json")
+        keys = {"extract": extraction_key(LLM_MODEL, TEMPERATURE, rules.key, subject_id),
+                "link": linking_key(ONTO_PATH, model_id(EMB_MODEL, EMB_BACKEND), LINK_INDEX,
+                                   LINK_LEXICAL, LABEL_DTYPE, subject_id)}
+        def extract(chunks):
+            with metrics.span("stage.extract"):
+                llm = extract_chunks_llm(chunks, model=LLM_MODEL, cache=llm_cache, limiter=limiter)
+                # rule triples ride along with the chunk's raw LLM triples (None = retry next run)
+                return [None if raw is None else
+                        raw + rules_as_triples(*rules.extract_text(c["text"], subject_id))
+                        for c, raw in zip(chunks, llm)]
+        def link(groups):
+            with metrics.span("stage.link"):
+                out = []
+                for g in groups:
+                    ruled = [t for t in g if t.get("source") == "rule"]
+                    llm = [t for t in g if t.get("source") != "rule"]
+                    out.append(fuse(link_triples(llm, linker, subject_id), ruled).triples())
+                return out
+        delta = update_document(manifest, os.path.abspath(docx_path), text, keys,
+                                extract=extract, link=link)
+        st = delta["stats"]
+        print(f"♻️ Chunks: {st['chunks']} (reused={st['reused']}, extracted={st['extracted']}, "
+              f"linked={st['linked']}, failed={st['failed']})")
+        # a deleted ABox under a current manifest is rebuilt from every linked line
+        if not delta["fresh"] and not os.path.exists(abox):
+            delta.update(retract=[], add=document_lines(manifest, os.path.abspath(docx_path)), fresh=True)
+        changed = delta["fresh"] or delta["retract"] or delta["add"]
+        if changed:
+            with metrics.span("stage.write"):
+                patch_abox(abox, delta["retract"], delta["add"], reset=delta["fresh"])
+        manifest.save()
+        if EXPORT_TTL and abox != out_ttl and (changed or not os.path.exists(out_ttl)):
+            with metrics.span("stage.export"):
+                export_turtle(abox, out_ttl)
+        stats["validation"] = _validate(abox)
+        if REASON:
+            monotone = not (delta["fresh"] or delta["retract"])
+            stats["reasoning"] = _reason(abox, delta["add"] if monotone else None)
+        entry = manifest.doc(os.path.abspath(docx_path))
+        stats["triples"] = sum(len(c["raw"]) for c in entry["chunks"].values())
+        stats["linked"] = sum(len(c["linked"]) for c in entry["chunks"].values())
+        stats.update(out=abox, chunks=st)
+        stats["seconds"] = time.perf_counter() - t0
+        return stats
+
+    # 3) Rules + LLM → triples (mention-level; unlinked)
+    with metrics.span("stage.extract"):
+        ruled = rules_as_triples(*rules.extract_text(text, subject_id))
+        triples = extract_triples_llm(text, model=LLM_MODEL, cache=llm_cache, limiter=limiter)
+    stats["triples"] = len(triples) + len(ruled)
+    if not (triples or ruled):
+        print("⚠️ No triples from rules or LLM.")
+    else:
+        # 4) Link mentions to ontology
+        with metrics.span("stage.link"):
+            linked = link_triples(triples, linker, subject_id)
+        stats["linked"] = len(linked)
+
+        # 6) Fuse: dedupe, confidence + provenance, conflicts → alternates
+        with metrics.span("stage.fuse"):
+            fused = fuse(linked, ruled)
+        fused.report()
+        stats["fusion"] = fused.stats
 
-    # 5) Write ABox TTL
-    g = write_abox(linked, out_ttl=OUT_TTL)
+        # 8) Write ABox TTL
+        with metrics.span("stage.write"):
+            write_abox(fused.triples(), out_ttl=out_ttl)
+        stats["out"] = out_ttl
+        stats["validation"] = _validate(out_ttl)
+        if REASON:
+            stats["reasoning"] = _reason(out_ttl)
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+def main(docx_path: str, subject_id="Asset_X", incremental: bool = True):
+    # 1) Load ontology + vocab
+    with metrics.span("stage.build_linker"):
+        linker, emb_cache = build_linker()
+    llm_cache = LLMCache(LLM_CACHE_PATH, replay=LLM_REPLAY)
+
+    process_document(docx_path, subject_id, linker, llm_cache, OUT_TTL, incremental=incremental)
+
+    llm_cache.report()
+    emb_cache.flush()
+    st = emb_cache.stats()
+    print(f"🧠 Embedding cache: hits={st['hits']} misses={st['misses']} size={st['size']}")
+    if linker.tiers:
+        print("🔗 Link tiers: " + ", ".join(f"{k}={v}" for k, v in linker.tiers.most_common()))
 
     # 6) (Optional) visualize like before
     # visualize_abox_rdf(OUT_TTL, os.path.join(ROOT, "input", "llm_abox.html"))
-    # visualize_tbox_abox(onto, OUT_TTL, os.path.join(ROOT, "input", "llm_tbox_abox.html"))
+    # visualize_tbox_abox(ONTO_PATH, OUT_TTL, os.path.join(ROOT, "input", "llm_tbox_abox.html"))
 
-if __name__ == "__main__":
-    if not os.path.exists(DOCX):
+# ---------- corpus mode ----------
+_WORKER = {}
+
+def _init_worker(limiter, incremental, metrics_on=False):
+    # once per process: ontology, linker (model loads lazily) and caches
+    if metrics_on:
+        metrics.enable()
+    linker, _ = build_linker(readonly_cache=True)
+    _WORKER.update(linker=linker, limiter=limiter, incremental=incremental,
+                   llm_cache=LLMCache(LLM_CACHE_PATH, replay=LLM_REPLAY))
+
+def _run_one(docx_path: str, out_dir: str, name: str):
+    metrics.reset()
+    try:
+        res = process_document(docx_path, name, _WORKER["linker"], _WORKER["llm_cache"],
+                               os.path.join(out_dir, f"{name}.ttl"), limiter=_WORKER["limiter"],
+                               incremental=_WORKER["incremental"])
+        if metrics.enabled():
+            snap = metrics.snapshot()
+            res["metrics"] = {"spans": snap["spans"], "counters": snap["counters"]}
+        return res
+    except Exception as e:
+        return {"doc": docx_path, "error": f"{type(e).__name__}: {e}"}
+
+def _collect_inputs(spec: str):
+    if os.path.isdir(spec):
+        return sorted(glob.glob(os.path.join(spec, "**", "*.docx"), recursive=True))
+    return sorted(glob.glob(spec, recursive=True))
+
+def _doc_names(docs) -> dict:
+    """
+    {path: name} for output files and subject IDs: the path relative to the
+    inputs' common folder, "a/Report.docx" → "a__Report". Raises ValueError
+    if two documents still map to one name, instead of one overwriting the
+    other's ABox.
+    """
+    paths = [os.path.abspath(d) for d in docs]
+    root = os.path.commonpath([os.path.dirname(p) for p in paths])
+    names, seen = {}, {}
+    for doc, path in zip(docs, paths):
+        rel = os.path.splitext(os.path.relpath(path, root))[0]
+        name = re.sub(r"\W+", "_", "__".join(pathlib.Path(rel).parts))
+        if name in seen:
+            raise ValueError(f"{seen[name]} and {doc} both map to output name {name!r}")
+        seen[name], names[doc] = doc, name
+    return names
+
+def run_corpus(spec: str, out_dir: str, workers: int = 4, llm_concurrency: int = 8,
+               merge: bool = False, incremental: bool = True, store: str = None):
+    """
+    Process every .docx under a directory (or matching a glob) on a process
+    pool. Each worker builds the linker once; LLM requests from all workers
+    share one semaphore of llm_concurrency slots. A failing document is
+    recorded in the summary and does not stop the batch. Outputs and
+    subject IDs are named after the path below the inputs' common folder
+    (_doc_names). store (a .sqlite path) receives every written ABox as a
+    named graph per document.
+    """
+    docs = _collect_inputs(spec)
+    if not docs:
+        print(f"⚠️ No .docx found for {spec}")
+        return None
+    names = _doc_names(docs)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # warm label embeddings once; workers then open the cache read-only
+    _, emb_cache = build_linker()
+    emb_cache.flush()
+
+    limiter = multiprocessing.BoundedSemaphore(llm_concurrency)
+    t0 = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(limiter, incremental, metrics.enabled())) as pool:
+        futures = {pool.submit(_run_one, d, out_dir, names[d]): d for d in docs}
+        for fut in as_completed(futures):
+            try:
+                res = fut.result()
+            except Exception as e:  # worker died (e.g. BrokenProcessPool)
+                res = {"doc": futures[fut], "error": f"{type(e).__name__}: {e}"}
+            if "error" in res:
+                print(f"❌ {res['doc']}: {res['error']}")
+            results.append(res)
+    wall = time.perf_counter() - t0
+
+    ok = [r for r in results if "error" not in r]
+    lat = sorted(r["seconds"] for r in ok)
+    pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] if lat else None
+    summary = {
+        "docs": len(docs), "ok": len(ok), "failed": len(results) - len(ok),
+        "wall_seconds": wall, "docs_per_s": len(ok) / wall if wall else 0.0,
+        "latency_p50": pct(0.5), "latency_p95": pct(0.95), "latency_max": lat[-1] if lat else None,
+        "triples": sum(r["triples"] for r in ok), "linked": sum(r["linked"] for r in ok),
+        "results": sorted(results, key=lambda r: r["doc"]),
+    }
+    if merge:
+        outs = [r["out"] for r in summary["results"] if r.get("out")]
+        summary["merged"] = os.path.join(out_dir, "corpus_abox.nt")
+        merge_aboxes(outs, summary["merged"], fmt="nt" if incremental else "turtle")
+    if store:
+        with TripleStore(store) as ts, metrics.span("stage.store"):
+            for r in ok:
+                if r.get("out") and os.path.exists(r["out"]):
+                    ts.load_file(r["out"], graph=pathlib.Path(r["doc"]).resolve().as_uri())
+            summary["store"] = {"path": store, "triples": len(ts)}
+    with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(f"📊 Corpus: {summary['ok']}/{summary['docs']} ok in {wall:.1f}s "
+          f"({summary['docs_per_s']:.2f} docs/s, p50={summary['latency_p50'] or 0:.1f}s, "
+          f"p95={summary['latency_p95'] or 0:.1f}s)")
+    return summary
+
+def _cli():
+    ap = argparse.ArgumentParser(description="DOCX → linked ABox")
+    ap.add_argument("--full", action="store_true",
+                    help="ignore manifests and rebuild every ABox from scratch")
+    ap.add_argument("--metrics", metavar="PATH",
+                    help="record per-stage timings and counters; .prom/.txt = Prometheus text, else JSON "
+                         "(corpus mode also adds per-document metrics to summary.json)")
+    ap.add_argument("--memory", action="store_true", help="with --metrics: tracemalloc peak per stage")
+    ap.add_argument("--profile", choices=("cprofile", "pyinstrument"),
+                    help="profile every top-level stage into --profile-dir")
+    ap.add_argument("--profile-dir", default=os.path.join(ROOT, "output", "profiles"))
+    sub = ap.add_subparsers(dest="cmd")
+    c = sub.add_parser("corpus", help="process a folder or glob of .docx files in parallel")
+    c.add_argument("inputs", help="directory or glob, e.g. 'input/**/*.docx'")
+    c.add_argument("--out", default=os.path.join(ROOT, "output", "corpus"))
+    c.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    c.add_argument("--llm-concurrency", type=int, default=8)
+    c.add_argument("--merge", action="store_true", help="also write one merged N-Triples ABox")
+    c.add_argument("--store", metavar="PATH",
+                   help="also load every ABox into an indexed SQLite triple store (one graph per document)")
+    args = ap.parse_args()
+    if args.metrics or args.profile:
+        metrics.enable(memory=args.memory, profile=args.profile, profile_dir=args.profile_dir)
+
+    if args.cmd == "corpus":
+        run_corpus(args.inputs, args.out, workers=args.workers,
+                   llm_concurrency=args.llm_concurrency, merge=args.merge,
+                   incremental=not args.full, store=args.store)
+    elif not os.path.exists(DOCX):
         print(f"⚠️ DOCX missing at {DOCX}")
     else:
-        main(DOCX, subject_id="Building_X")
+        main(DOCX, subject_id="Building_X", incremental=not args.full)
         print(f"Done. ABox at: {OUT_TTL}")
+    if metrics.enabled():
+        metrics.report()
+        if args.metrics:
+            metrics.export(args.metrics)
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,40 @@
+# benchmarks/bench_ann.py
+# Exact vs IVF label search: build time, query latency and recall@k on
+# clustered unit vectors shaped like MiniLM embeddings.
+import sys, time, pathlib, argparse
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+from pipeline.ann_index import ExactIndex, IVFIndex
+
+def _unit(x):
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--labels", type=int, default=50_000)
+    ap.add_argument("--queries", type=int, default=1_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--n-probe", type=int, default=8)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    # labels cluster around topics (label variants, sibling classes)
+    topics = rng.standard_normal((max(1, args.labels // 50), args.dim))
+    emb = _unit(topics[rng.integers(0, topics.shape[0], args.labels)]
+                + 0.5 * rng.standard_normal((args.labels, args.dim)))
+    # queries near existing labels, like mentions close to an ontology term
+    q = _unit(emb[rng.choice(args.labels, args.queries)] + 0.3 * rng.standard_normal((args.queries, args.dim)) / np.sqrt(args.dim))
+
+    for name, make in [("exact", lambda: ExactIndex(emb)),
+                       ("ivf", lambda: IVFIndex(emb, n_probe=args.n_probe))]:
+        t0 = time.perf_counter(); idx = make(); t_build = time.perf_counter() - t0
+        t0 = time.perf_counter(); idx.search(q, args.k); t_query = time.perf_counter() - t0
+        print(f"{name:6s} build={t_build:7.3f}s  query={1e3 * t_query / args.queries:7.3f} ms/q  "
+              f"recall@{args.k}={idx.recall(q[:200], args.k):.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_docx.py
+# DOCX ingestion: python-docx (paragraphs only, and paragraphs + tables)
+# vs. the streaming reader in pipeline.docx_stream, on a large generated file.
+# Reports seconds and tracemalloc peak for each path (tracemalloc only sees
+# Python allocations, so lxml's C-side tree under python-docx is not counted).
+import os, sys, time, random, pathlib, argparse, tempfile, tracemalloc
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from docx import Document
+from pipeline.docx_stream import iter_blocks
+
+WORDS = ("fire hydrant pressure tunnel cross passage extinguisher weight sprinkler "
+         "evacuation path width risk level building exit door smoke detector pump "
+         "the a of and to in is for on with shall must according section").split()
+
+def make_docx(path: str, paragraphs: int, tables: int, rows: int, seed: int = 0):
+    rng = random.Random(seed)
+    doc = Document()
+    every = max(1, paragraphs // max(1, tables))
+    for i in range(paragraphs):
+        if i % 50 == 0:
+            doc.add_heading(f"Section {i // 50}", 1)
+        doc.add_paragraph(" ".join(rng.choice(WORDS) for _ in range(40)) + ".")
+        if tables and i % every == every - 1:
+            t = doc.add_table(rows=rows, cols=3)
+            for r in range(rows):
+                t.cell(r, 0).text = f"Item {r}"
+                t.cell(r, 1).text = f"{rng.uniform(0, 100):.1f}"
+                t.cell(r, 2).text = rng.choice(("m", "bar", "kg"))
+    doc.save(path)
+
+def docx_paragraphs(path: str) -> int:
+    # the original read_docx_text
+    doc = Document(path)
+    return len("\n".join(p.text for p in doc.paragraphs if p.text.strip()).strip())
+
+def docx_with_tables(path: str) -> int:
+    doc = Document(path)
+    n = sum(len(p.text) for p in doc.paragraphs)
+    for t in doc.tables:
+        for row in t.rows:
+            n += len(" | ".join(c.text for c in row.cells))
+    return n
+
+def stream(path: str) -> int:
+    return sum(len(b["text"]) for b in iter_blocks(path))
+
+def measure(fn, path):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    chars = fn(path)
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dt, peak, chars
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--paragraphs", type=int, default=20_000)
+    ap.add_argument("--tables", type=int, default=200)
+    ap.add_argument("--rows", type=int, default=20)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "big.docx")
+        t0 = time.perf_counter()
+        make_docx(path, args.paragraphs, args.tables, args.rows)
+        print(f"📄 {args.paragraphs} paragraphs, {args.tables}x{args.rows} table rows, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB zipped (built in {time.perf_counter() - t0:.1f}s)")
+
+        for name, fn in (("python-docx paragraphs", docx_paragraphs),
+                         ("python-docx + tables", docx_with_tables),
+                         ("docx_stream blocks", stream)):
+            dt, peak, chars = measure(fn, path)
+            print(f"  {name:24s} {dt:7.2f}s  peak={peak / 1e6:7.1f} MB  chars={chars}")
+
+if __name__ == "__main__":
+    main()
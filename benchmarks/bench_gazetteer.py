@@ -0,0 +1,58 @@
+# benchmarks/bench_gazetteer.py
+# Throughput (MB/s) of GazetteerMatcher.find on a large synthetic document
+# with a synthetic label set, plus build/save/load times.
+import os, sys, time, random, pathlib, argparse, tempfile
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from pipeline.gazetteer_matcher import GazetteerMatcher
+
+WORDS = ("fire hydrant pressure tunnel cross passage extinguisher weight sprinkler "
+         "evacuation path width risk level building factory viaduct exit door smoke "
+         "detector pump valve pipe shaft lining portal ventilation fan lighting").split()
+
+# running prose around the domain terms
+FILLER = ("the a of and to in is for on with as by at from that this be are was "
+          "shall must should according section table figure see required installed "
+          "provided located between each every per maximum minimum approx value").split()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--labels", type=int, default=20_000)
+    ap.add_argument("--mb", type=float, default=5.0)
+    args = ap.parse_args()
+    rng = random.Random(0)
+
+    m = GazetteerMatcher()
+    t0 = time.perf_counter()
+    for i in range(args.labels):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        m.add(" ".join(words) + (f" {i}" if i % 3 else ""), "class", f"C{i}", f"http://example.org/aec#C{i}")
+    m.build()
+    t_build = time.perf_counter() - t0
+
+    parts, size = [], 0
+    while size < args.mb * 1e6:
+        sent = " ".join(rng.choice(WORDS) if rng.random() < 0.15 else rng.choice(FILLER)
+                        for _ in range(16)) + f" {rng.randint(0, 99)}.\n"
+        parts.append(sent); size += len(sent)
+    text = "".join(parts)
+
+    t0 = time.perf_counter()
+    spans = m.find(text)
+    t_find = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "matcher.json")
+        t0 = time.perf_counter(); m.save(path); t_save = time.perf_counter() - t0
+        t0 = time.perf_counter(); GazetteerMatcher.load(path); t_load = time.perf_counter() - t0
+        size_mb = os.path.getsize(path) / 1e6
+
+    print(f"labels={len(m.patterns)} states={len(m.goto)} build={t_build:.2f}s "
+          f"save={t_save:.2f}s load={t_load:.2f}s ({size_mb:.1f} MB)")
+    print(f"doc={len(text) / 1e6:.1f} MB  spans={len(spans)}  find={t_find:.2f}s  "
+          f"throughput={len(text) / 1e6 / t_find:.2f} MB/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/bench_imports.py
+# Cold import time per entry point, from `python -X importtime`.
+# Prints a table; --json writes {module: {"cumulative_ms", "top": [...]}}.
+import sys, json, pathlib, argparse, subprocess
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+ENTRY_POINTS = [
+    "pipeline",
+    "pipeline.rules_ie",
+    "pipeline.abox_writer",
+    "pipeline.llm_ie",
+    "pipeline.emb_linker",
+    "pipeline.gazetteer",
+    "pipeline.linker",
+    "pipeline.ontology_vocab",
+    "pipeline.viz",
+    "pipeline.wikidata",
+    "Text_data_retreival.Text_data_retreival",
+]
+
+def _importtime(code: str):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=str(ROOT), capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cum_us, name = line.split(":", 1)[1].split("|")
+        rows.append((int(cum_us), name.strip()))
+    return rows
+
+def import_profile(module: str, baseline=frozenset()):
+    """Return (cumulative_us, [(cumulative_us, name), ...]) for one cold import."""
+    rows = [r for r in _importtime(f"import {module}") if r[1] not in baseline]
+    total = next((us for us, name in rows if name == module), 0)
+    return total, sorted(rows, reverse=True)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--top", type=int, default=5)
+    args = ap.parse_args()
+
+    # modules the interpreter imports anyway (site, encodings, ...)
+    baseline = frozenset(name for _, name in _importtime("pass"))
+    results = {}
+    for mod in ENTRY_POINTS:
+        try:
+            total, rows = import_profile(mod, baseline)
+        except RuntimeError as e:
+            print(f"{mod:28s}  failed: {e}")
+            results[mod] = {"error": str(e)}
+            continue
+        top = [name for _, name in rows if name != mod][:args.top]
+        print(f"{mod:28s} {total / 1000:9.1f} ms   heaviest: {', '.join(top)}")
+        results[mod] = {"cumulative_ms": total / 1000, "top": top}
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
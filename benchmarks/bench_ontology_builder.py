@@ -0,0 +1,119 @@
+# benchmarks/bench_ontology_builder.py
+# ontology/ontology_builder.py on synthetic TBoxes (CSV specs built from
+# synthetic.class_names) at each size in --sizes:
+#  1) build: the old way (owlready2 classes created in memory, whole ontology
+#     saved as RDF/XML) against the quadstore build, a no-op rebuild, a
+#     rebuild with --changed of the classes edited, and the optional export
+#  2) load: what consumers pay to get at the TBox, parsing the RDF/XML
+#     against opening the quadstore, plus a full compile_snapshot from each
+#
+#   python benchmarks/bench_ontology_builder.py --sizes 10000,100000
+import os, sys, csv, time, random, pathlib, argparse, tempfile
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+for p in (ROOT, ROOT / "benchmarks", ROOT / "ontology"):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+from synthetic import OBJ_PROPS, DATA_PROPS, class_names
+from ontology_builder import BASE_IRI, build, load_spec
+from pipeline.ontology_vocab import open_quadstore
+from pipeline.vocab_snapshot import compile_snapshot
+
+FIELDS = ["kind", "name", "parents", "domain", "range", "prefLabel", "altLabel"]
+
+def write_spec(path: str, classes, changed: int = 0, seed: int = 0):
+    """CSV spec for the synthetic classes; `changed` of them get an extra altLabel."""
+    edit = set(random.Random(seed).sample(range(len(classes)), changed)) if changed else set()
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, FIELDS)
+        w.writeheader()
+        for i, (name, parent, label) in enumerate(classes):
+            alt = label.replace(" ", "-") + (f"|{label} (rev)" if i in edit else "")
+            w.writerow({"kind": "class", "name": name, "parents": parent,
+                        "prefLabel": label, "altLabel": alt})
+        for name, label in OBJ_PROPS:
+            w.writerow({"kind": "object", "name": name, "domain": "Infrastructure",
+                        "range": "SafetyMeasure", "prefLabel": label})
+        for name, label, _unit in DATA_PROPS:
+            w.writerow({"kind": "data", "name": name, "range": "decimal", "prefLabel": label})
+
+def legacy_build(spec_path: str, out: str) -> float:
+    """The pre-spec builder: Python classes in an in-memory World, saved as RDF/XML."""
+    import types
+    from owlready2 import World, Thing, ObjectProperty, DataProperty, AnnotationProperty, locstr
+    t0 = time.perf_counter()
+    spec = load_spec(spec_path)
+    world = World()
+    onto = world.get_ontology(BASE_IRI)
+    with onto:
+        with onto.get_namespace("http://www.w3.org/2004/02/skos/core#"):
+            pref = types.new_class("prefLabel", (AnnotationProperty,))
+            alt = types.new_class("altLabel", (AnnotationProperty,))
+        made = {}
+        for name, e in spec["entities"].items():  # parents come first in class_names order
+            if e["kind"] == "class":
+                bases = tuple(made[p] for p in e["parents"]) or (Thing,)
+                made[name] = c = types.new_class(name, bases)
+            else:
+                c = types.new_class(name, (ObjectProperty if e["kind"] == "object" else DataProperty,))
+                c.domain = [made[d] for d in e["domain"]]
+                c.range = [made[r] for r in e["range"]] if e["kind"] == "object" else [float]
+            for lab in e["prefLabel"]:
+                pref[c].append(locstr(lab, "en"))
+            for lab in e["altLabel"]:
+                alt[c].append(locstr(lab, "en"))
+    onto.save(file=out, format="rdfxml")
+    return time.perf_counter() - t0
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+def run(n: int, changed: int, d: str):
+    spec, spec2 = os.path.join(d, f"spec{n}.csv"), os.path.join(d, f"spec{n}b.csv")
+    store, owl, legacy_owl = (os.path.join(d, f"{x}{n}.{ext}") for x, ext in
+                              (("tbox", "sqlite3"), ("export", "owl"), ("legacy", "owl")))
+    classes = class_names(n)
+    write_spec(spec, classes)
+    write_spec(spec2, classes, changed=changed)
+    print(f"📄 {n} classes ({os.path.getsize(spec) / 1e6:.1f} MB CSV)")
+
+    print("  1) build")
+    t_legacy = legacy_build(spec, legacy_owl)
+    print(f"    {'legacy (in-memory + RDF/XML)':<30} {t_legacy:7.2f}s")
+    st, t = _timed(lambda: build(spec, store, verbose=False))
+    print(f"    {'quadstore, cold':<30} {t:7.2f}s  ({st['upserted']} entities, {st['triples_written']} triples, "
+          f"{os.path.getsize(store) / 1e6:.1f} MB)")
+    st, t = _timed(lambda: build(spec, store, verbose=False))
+    print(f"    {'quadstore, unchanged spec':<30} {t:7.2f}s  (upserted={st['upserted']})")
+    st, t = _timed(lambda: build(spec2, store, verbose=False))
+    print(f"    {f'quadstore, {changed} changed':<30} {t:7.2f}s  (upserted={st['upserted']}, "
+          f"write {st['seconds']['write']:.2f}s)")
+    st, t = _timed(lambda: build(spec2, store, export=owl, verbose=False))
+    print(f"    {'RDF/XML export':<30} {st['seconds']['export']:7.2f}s  ({os.path.getsize(owl) / 1e6:.1f} MB)")
+
+    print("  2) load")
+    from owlready2 import World
+    onto, t_xml = _timed(lambda: World().get_ontology(f"file://{owl}").load())
+    onto_q, t_q = _timed(lambda: open_quadstore(store))
+    print(f"    {'parse RDF/XML':<30} {t_xml:7.2f}s")
+    print(f"    {'open quadstore':<30} {t_q:7.3f}s  ({t_xml / t_q:,.0f}x)")
+    _, t = _timed(lambda: onto_q.search_one(iri=f"{BASE_IRI}#{classes[-1][0]}").is_a)
+    print(f"    {'  + first entity lookup':<30} {t * 1e3:7.1f} ms")
+    _, t_sx = _timed(lambda: compile_snapshot(owl, os.path.join(d, "x.pkl")))
+    _, t_sq = _timed(lambda: compile_snapshot(store, os.path.join(d, "q.pkl")))
+    print(f"    {'compile_snapshot from RDF/XML':<30} {t_sx:7.2f}s")
+    print(f"    {'compile_snapshot from quadstore':<30} {t_sq:7.2f}s")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000")
+    ap.add_argument("--changed", type=float, default=0.01, help="fraction of classes edited for the incremental rebuild")
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as d:
+        for n in (int(x) for x in args.sizes.split(",") if x):
+            run(n, max(1, int(n * args.changed)), d)
+
+if __name__ == "__main__":
+    main()
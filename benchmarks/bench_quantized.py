@@ -0,0 +1,113 @@
+# benchmarks/bench_quantized.py
+# Quantized linking against the float32 path.
+#  1) label storage: float32 / float16 / int8 (per-row scales) label matrices,
+#     with bytes, search time, tracemalloc peak and top-1 / top-5 agreement
+#     with float32, plus the unblocked float32 search for the peak baseline.
+#  2) --real-model: encode latency (batch of --batch) and throughput per CPU
+#     inference backend (torch, int8, onnx, onnx-int8), with top-1 agreement
+#     and cosine to the float32 PyTorch embeddings. Backends whose packages
+#     are missing are skipped.
+#
+#   python benchmarks/bench_quantized.py --classes 50000 --queries 5000
+#   python benchmarks/bench_quantized.py --real-model --threads 4 --classes 5000
+import os, sys, time, pathlib, argparse, tempfile, tracemalloc
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+for p in (ROOT, ROOT / "benchmarks"):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+import numpy as np
+from synthetic import make_ontology, HashEncoder
+from bench_linking import make_mentions
+from pipeline.ann_index import ExactIndex, topk, LABEL_DTYPES
+from pipeline.emb_linker import OntologyLinker, BACKENDS, get_model, _l2norm
+from pipeline.vocab_snapshot import load_snapshot
+
+def _peak(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, dt, peak / 1e6
+
+def _agreement(emb, queries, ref_s, idx, eps: float = 1e-5):
+    """
+    Tie-aware agreement with the float32 result: a pick counts when its
+    float32 score equals the reference top-1 (top-1), or reaches the
+    reference k-th score (top-k overlap).
+    """
+    true = np.einsum("qd,qkd->qk", queries, emb[idx])
+    top1 = float(np.mean(true[:, 0] >= ref_s[:, 0] - eps))
+    overlap = float(np.mean(true >= ref_s[:, -1:] - eps))
+    return top1, overlap
+
+def label_storage(emb: np.ndarray, queries: np.ndarray):
+    print(f"  label rows={emb.shape[0]} dim={emb.shape[1]} queries={queries.shape[0]}")
+    (_, ref_s), dt, peak = _peak(lambda: topk(queries @ emb.T, 5))
+    print(f"    {'float32 unblocked':<18} {emb.nbytes / 1e6:8.1f} MB  search {dt:6.2f}s  peak {peak:8.1f} MB")
+    for dtype in LABEL_DTYPES:
+        index = ExactIndex(emb).quantize(dtype)
+        (i, s), dt, peak = _peak(lambda: index.search(queries, 5))
+        top1, top5 = _agreement(emb, queries, ref_s, i)
+        err = float(np.max(np.abs(s[:, 0] - ref_s[:, 0])))
+        size = index.emb.nbytes
+        print(f"    {dtype:<18} {size / 1e6:8.1f} MB  search {dt:6.2f}s  peak {peak:8.1f} MB  "
+              f"top-1={top1:.4f} top-5 overlap={top5:.4f} max score err={err:.4f}")
+
+def backends(vocab, texts, names, threads, batch):
+    ref_linker = OntologyLinker(*vocab, model=get_model(backend="torch", threads=threads))
+    ref = ref_linker._encode(texts)
+    labels = ref_linker.cls_emb
+    _, ref_s = ref_linker.cls_index.search(ref, 5)
+    for backend in names:
+        try:
+            model = get_model(backend=backend, threads=threads)
+        except Exception as e:  # missing onnxruntime/optimum, no int8 export, ...
+            print(f"    {backend:<10} skipped ({type(e).__name__}: {e})")
+            continue
+        model.encode(texts[:batch], show_progress_bar=False)  # warm-up
+        t0 = time.perf_counter()
+        for _ in range(5):
+            model.encode(texts[:batch], show_progress_bar=False)
+        latency = (time.perf_counter() - t0) / 5
+        t0 = time.perf_counter()
+        emb = _l2norm(model.encode(texts, batch_size=64, show_progress_bar=False))
+        dt = time.perf_counter() - t0
+        cos = float(np.mean(np.sum(emb * ref, axis=1)))
+        linker = OntologyLinker(*vocab, model=model, backend=backend)
+        i, _ = linker.cls_index.search(emb, 5)
+        top1, top5 = _agreement(labels, ref, ref_s, i)  # scored with the float32 PyTorch vectors
+        print(f"    {backend:<10} batch {batch} {latency * 1e3:7.1f} ms  {len(texts) / dt:8.0f} texts/s  "
+              f"cos={cos:.4f}  top-1={top1:.4f} top-5 overlap={top5:.4f}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--classes", type=int, default=20_000)
+    ap.add_argument("--queries", type=int, default=5_000)
+    ap.add_argument("--real-model", action="store_true",
+                    help="encode with sentence-transformers and compare inference backends")
+    ap.add_argument("--backends", default=",".join(BACKENDS))
+    ap.add_argument("--threads", type=int, default=None)
+    ap.add_argument("--batch", type=int, default=32)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        owl = os.path.join(d, "synth.owl")
+        classes = make_ontology(owl, args.classes)
+        vocab = load_snapshot(owl).vocab()
+    texts = list(dict.fromkeys(m for m, _, _ in make_mentions(classes, args.queries)))
+    print(f"📄 {args.classes} classes, {len(texts)} unique mentions, "
+          f"encoder={'sentence-transformers' if args.real_model else 'hash'}")
+
+    model = get_model(backend="torch", threads=args.threads) if args.real_model else HashEncoder()
+    linker = OntologyLinker(*vocab, model=model)
+    print("1) label storage")
+    label_storage(linker.cls_emb, linker._encode(texts))
+    if args.real_model:
+        print("2) inference backends")
+        backends(vocab, texts, [b for b in args.backends.split(",") if b], args.threads, args.batch)
+
+if __name__ == "__main__":
+    main()
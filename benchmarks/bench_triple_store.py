@@ -0,0 +1,108 @@
+# benchmarks/bench_triple_store.py
+# Load and query times of pipeline.triple_store against an in-memory rdflib
+# Graph on a synthetic corpus ABox: typed equipment nodes with object links
+# and numeric data values spread over --docs named graphs. Cold start is
+# what a later run pays: re-parsing the Turtle/N-Triples files vs opening
+# the SQLite file.
+#
+#   python benchmarks/bench_triple_store.py --triples 1000000 --docs 200
+import os, sys, time, random, pathlib, argparse, tempfile
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from rdflib import Graph, URIRef, RDF, XSD
+from pipeline.triple_store import TripleStore
+
+EX = "http://example.org/aec#"
+CLASSES = ["Hydrant", "FireExtinguisher", "Tunnel", "Sprinkler", "SmokeDetector", "EmergencyExit"]
+OBJ = ["hasSafetyMeasure", "locatedIn", "hasSpecification", "connectedTo"]
+DATA = ["pressure", "hasWeight", "tunnelLength", "riskScore"]
+
+def make_docs(d: str, n_triples: int, n_docs: int, seed: int = 0):
+    """One N-Triples file per document; returns their paths."""
+    rng = random.Random(seed)
+    per = max(1, n_triples // n_docs)
+    paths = []
+    for k in range(n_docs):
+        path = os.path.join(d, f"doc{k}.nt")
+        n_nodes = max(2, per // 4)
+        with open(path, "w", encoding="utf-8") as f:
+            written = 0
+            for i in range(n_nodes):
+                f.write(f"<{EX}d{k}_n{i}> <{RDF.type}> <{EX}{rng.choice(CLASSES)}> .\n")
+                written += 1
+            while written < per:
+                s = f"<{EX}d{k}_n{rng.randrange(n_nodes)}>"
+                if rng.random() < 0.5:
+                    f.write(f"{s} <{EX}{rng.choice(OBJ)}> <{EX}d{k}_n{rng.randrange(n_nodes)}> .\n")
+                else:
+                    f.write(f'{s} <{EX}{rng.choice(DATA)}> "{rng.uniform(0, 20):.2f}"^^<{XSD.float}> .\n')
+                written += 1
+        paths.append(path)
+    return paths
+
+def timed(fn, repeat: int = 1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - t0) / repeat, out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--triples", type=int, default=300_000)
+    ap.add_argument("--docs", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        paths = make_docs(d, args.triples, args.docs)
+        db = os.path.join(d, "abox.sqlite")
+
+        def load_rdflib():
+            g = Graph()
+            for p in paths:
+                g.parse(p, format="nt")
+            return g
+        def load_store():
+            with TripleStore(db) as ts:
+                for p in paths:
+                    ts.load_file(p)
+                return len(ts)
+        t_g, g = timed(load_rdflib)
+        t_s, n = timed(load_store)
+        print(f"📄 {len(g)} triples in {len(paths)} documents")
+        print(f"  load        rdflib {t_g:.2f}s ({len(g) / t_g:,.0f}/s)  store {t_s:.2f}s ({n / t_s:,.0f}/s)  "
+              f"file={os.path.getsize(db) / 1e6:.1f} MB")
+
+        t_open, ts = timed(lambda: TripleStore(db, readonly=True))
+        print(f"  cold start  rdflib re-parse {t_g:.2f}s  store open {t_open * 1e3:.1f} ms")
+
+        hydrant, located = URIRef(EX + "Hydrant"), URIRef(EX + "locatedIn")
+        node = URIRef(f"{EX}d0_n1")
+        queries = {
+            "s ? ?": (lambda: len(list(g.triples((node, None, None)))),
+                      lambda: len(list(ts.match(node)))),
+            "? p o": (lambda: len(list(g.triples((None, RDF.type, hydrant)))),
+                      lambda: len(list(ts.match(None, RDF.type, hydrant)))),
+            "? p ?": (lambda: len(list(g.triples((None, located, None)))),
+                      lambda: len(list(ts.match(None, located)))),
+            "hydrant pressure < 6": (
+                lambda: len(list(g.query(
+                    "PREFIX ex: <http://example.org/aec#> SELECT ?h ?p WHERE { "
+                    "?h a ex:Hydrant ; ex:pressure ?p . FILTER(?p < 6) }"))),
+                lambda: len(list(ts.sparql(
+                    "SELECT ?h ?p WHERE { ?h a ex:Hydrant ; ex:pressure ?p . FILTER(?p < 6) }")))),
+        }
+        for name, (q_g, q_s) in queries.items():
+            t1, r1 = timed(q_g, args.repeat)
+            t2, r2 = timed(q_s, args.repeat)
+            flag = "" if r1 == r2 else f"  ⚠️ rows differ ({r1} vs {r2})"
+            print(f"  {name:<22} rdflib {t1 * 1e3:9.2f} ms  store {t2 * 1e3:9.2f} ms  rows={r2}{flag}")
+
+        t_e, m = timed(lambda: ts.export(os.path.join(d, "export.ttl")))
+        print(f"  export      {m} triples to Turtle in {t_e:.2f}s")
+        ts.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# benchmarks/run_benchmarks.py
+# End-to-end pipeline benchmark on synthetic inputs (benchmarks/synthetic.py).
+# Each stage is timed on its own with its tracemalloc peak; the LLM is
+# stubbed and, unless --real-model is given, so is the sentence encoder.
+#
+#   python benchmarks/run_benchmarks.py --classes 10000 --paragraphs 2000 --json bench.json
+#   python benchmarks/run_benchmarks.py --compare bench.json   # diff against an earlier run
+import os, sys, json, time, pathlib, argparse, platform, tempfile, subprocess, tracemalloc
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+for p in (ROOT, ROOT / "benchmarks"):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+from synthetic import make_ontology, make_docx, StubClient, HashEncoder
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(ROOT),
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+class Stages:
+    """Runs stages in order and records seconds, peak traced MB and throughput."""
+
+    def __init__(self, memory: bool = True):
+        self.memory = memory
+        self.results = {}
+
+    def run(self, name: str, fn, items=None):
+        if self.memory:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        try:
+            out = fn()
+            err = None
+        except Exception as e:
+            out, err = None, f"{type(e).__name__}: {e}"
+        dt = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1] if self.memory else 0
+        if self.memory:
+            tracemalloc.stop()
+        row = {"seconds": dt, "peak_mb": peak / 1e6}
+        n = items(out) if (items and err is None) else None
+        if n is not None:
+            row.update(items=n, per_s=(n / dt) if dt else 0.0)
+        if err:
+            row["error"] = err
+        self.results[name] = row
+        extra = f"  {n} items, {row['per_s']:.0f}/s" if n is not None else ""
+        print(f"  {name:22s} {dt:8.3f}s  peak={peak / 1e6:8.1f} MB{extra}{'  ❌ ' + err if err else ''}")
+        return out
+
+def compare(old_path: str, new: dict, tolerance: float = 0.10):
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    print(f"\nvs {old_path} ({old['meta'].get('commit') or '?'}):")
+    if old["meta"].get("params") != new["meta"]["params"]:
+        print(f"  ⚠️ different inputs: {old['meta'].get('params')} vs {new['meta']['params']}")
+    for name, row in new["stages"].items():
+        prev = old["stages"].get(name)
+        if not prev or "error" in row or "error" in prev:
+            continue
+        dt = row["seconds"] / prev["seconds"] - 1 if prev["seconds"] else 0.0
+        dm = row["peak_mb"] / prev["peak_mb"] - 1 if prev["peak_mb"] else 0.0
+        flag = "⚠️" if dt > tolerance or dm > tolerance else "  "
+        print(f"  {flag} {name:22s} time {dt:+7.1%}  peak {dm:+7.1%}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--classes", type=int, default=10_000)
+    ap.add_argument("--paragraphs", type=int, default=2_000)
+    ap.add_argument("--tables", type=int, default=50)
+    ap.add_argument("--real-model", action="store_true",
+                    help="use sentence-transformers instead of the hashing encoder")
+    ap.add_argument("--no-memory", action="store_true", help="skip tracemalloc (faster, no peaks)")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", help="earlier --json output to diff against")
+    args = ap.parse_args()
+
+    from Text_data_retreival.Text_data_retreival import read_docx_text, link_triples
+    from pipeline.rules_ie import extract_with_rules
+    from pipeline.llm_ie import extract_triples_llm
+    from pipeline.vocab_snapshot import load_snapshot
+    from pipeline.emb_linker import OntologyLinker
+    from pipeline.lexical_index import LexicalIndex
+    from pipeline.abox_writer import write_abox, write_abox_stream
+    from pipeline.viz import visualize_abox
+
+    with tempfile.TemporaryDirectory() as d:
+        owl, docx = os.path.join(d, "synth.owl"), os.path.join(d, "synth.docx")
+        t0 = time.perf_counter()
+        classes = make_ontology(owl, args.classes)
+        make_docx(docx, classes, args.paragraphs, tables=args.tables)
+        print(f"📄 {args.classes} classes, {args.paragraphs} paragraphs "
+              f"(generated in {time.perf_counter() - t0:.1f}s)")
+
+        st = Stages(memory=not args.no_memory)
+        text = st.run("read_docx_text", lambda: read_docx_text(docx), len)
+        st.run("extract_with_rules", lambda: extract_with_rules(text, "Tunnel_X"),
+               lambda r: len(r[0]) + len(r[1]))
+        client = StubClient()
+        triples = st.run("extract_llm_stub", lambda: extract_triples_llm(text, client=client), len) or []
+        snap = st.run("vocab_snapshot", lambda: load_snapshot(owl), lambda s: len(s.classes))
+        model = None if args.real_model else HashEncoder()
+        linker = st.run("linker_build",
+                        lambda: OntologyLinker(*snap.vocab(), model=model,
+                                               lexical=LexicalIndex(*snap.vocab())),
+                        lambda l: len(l.cls_texts) + len(l.op_texts) + len(l.dp_texts))
+        linked = st.run("linking", lambda: link_triples(triples, linker, "Building_X"),
+                        lambda _: len(triples)) or []
+        ttl, nt = os.path.join(d, "abox.ttl"), os.path.join(d, "abox.nt")
+        st.run("write_abox", lambda: write_abox(linked, out_ttl=ttl), len)
+        st.run("write_abox_stream", lambda: write_abox_stream(linked, nt), lambda r: r["ok"])
+        st.run("viz", lambda: visualize_abox(ttl, os.path.join(d, "abox.html")))
+
+    report = {
+        "meta": {"commit": _git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "encoder": "sentence-transformers" if args.real_model else "hash",
+                 "tracemalloc": not args.no_memory, "llm_requests": client.requests,
+                 "params": {"classes": args.classes, "paragraphs": args.paragraphs,
+                            "tables": args.tables}},
+        "stages": st.results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+    if args.compare:
+        compare(args.compare, report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# benchmarks/synthetic.py
+# Synthetic inputs for the benchmarks: AEC-style ontologies scaled to any
+# number of classes (SKOS pref/alt labels), DOCX risk analyses that mention
+# those classes, a stub LLM client that "extracts" the generated sentences,
+# and a hashing encoder that stands in for sentence-transformers.
+import re, json, zlib, random
+from types import SimpleNamespace
+from typing import List, Tuple
+
+import numpy as np
+
+BASE_IRI = "http://example.org/synth.owl#"
+
+# top of the tree mirrors ontology/ontology_builder.py
+ROOTS = {
+    "Infrastructure": ["BuildingInfrastructure", "TrafficInfrastructure"],
+    "SafetyMeasure": ["FireSafetyMeasure", "SafetyInfrastructure"],
+    "Risk": ["FireRisk", "AccidentRisk"],
+    "Specification": ["BuildingSpecification", "TunnelSpecification"],
+    "Phase": [], "State": [], "Discipline": [],
+}
+HEADS = ("hydrant pump valve fan detector sprinkler door exit shaft portal tunnel "
+         "building viaduct corridor stair lift duct damper alarm lining barrier").split()
+MODS = ("fire smoke emergency main auxiliary upper lower north south east west "
+        "pressurised fixed mobile automatic manual primary secondary").split()
+OBJ_PROPS = [("hasSafetyMeasure", "has safety measure"), ("mitigates", "mitigates"),
+             ("consistsOf", "consists of"), ("hasRisk", "has risk")]
+DATA_PROPS = [("pressure", "pressure", "bar"), ("hasWeight", "weight", "kg"),
+              ("tunnelLength", "length", "m")]
+
+def _camel(words: List[str]) -> str:
+    return "".join(w[:1].upper() + w[1:] for w in words)
+
+def class_names(n_classes: int, seed: int = 0) -> List[Tuple[str, str, str]]:
+    """[(name, parent, pref_label)] for a tree of n_classes under ROOTS."""
+    rng = random.Random(seed)
+    out, parents = [], []
+    for root, subs in ROOTS.items():
+        out.append((root, "", " ".join(re.findall(r"[A-Z][a-z]*", root)).lower()))
+        parents.append(root)
+        for s in subs:
+            out.append((s, root, " ".join(re.findall(r"[A-Z][a-z]*", s)).lower()))
+            parents.append(s)
+    i = 0
+    while len(out) < n_classes:
+        words = [rng.choice(MODS), rng.choice(HEADS)]
+        if rng.random() < 0.4:
+            words.insert(0, rng.choice(MODS))
+        name = _camel(words) + str(i)
+        parent = rng.choice(parents[-200:] if rng.random() < 0.7 else parents)
+        out.append((name, parent, f"{' '.join(words)} {i}"))
+        parents.append(name)
+        i += 1
+    return out[:n_classes]
+
+def make_ontology(path: str, n_classes: int, seed: int = 0) -> List[Tuple[str, str, str]]:
+    """Write an RDF/XML ontology with n_classes classes; returns class_names()."""
+    from rdflib import Graph, Namespace, URIRef, Literal, RDF, RDFS, OWL, XSD
+    SKOS = Namespace("http://www.w3.org/2004/02/skos/core#")
+    EX = Namespace(BASE_IRI)
+    g = Graph()
+    g.bind("skos", SKOS); g.bind("owl", OWL)
+    g.add((URIRef(BASE_IRI.rstrip("#")), RDF.type, OWL.Ontology))
+    g.add((SKOS.prefLabel, RDF.type, OWL.AnnotationProperty))
+    g.add((SKOS.altLabel, RDF.type, OWL.AnnotationProperty))
+    classes = class_names(n_classes, seed)
+    for name, parent, label in classes:
+        c = EX[name]
+        g.add((c, RDF.type, OWL.Class))
+        if parent:
+            g.add((c, RDFS.subClassOf, EX[parent]))
+        g.add((c, SKOS.prefLabel, Literal(label, lang="en")))
+        g.add((c, SKOS.altLabel, Literal(label.replace(" ", "-"), lang="en")))
+    for name, label in OBJ_PROPS:
+        g.add((EX[name], RDF.type, OWL.ObjectProperty))
+        g.add((EX[name], RDFS.label, Literal(label)))
+        g.add((EX[name], RDFS.domain, EX.Infrastructure))
+        g.add((EX[name], RDFS.range, EX.SafetyMeasure))
+    for name, label, _unit in DATA_PROPS:
+        g.add((EX[name], RDF.type, OWL.DatatypeProperty))
+        g.add((EX[name], RDFS.label, Literal(label)))
+        g.add((EX[name], RDFS.range, XSD.decimal))
+    g.serialize(path, format="xml")
+    return classes
+
+def make_docx(path: str, classes: List[Tuple[str, str, str]], paragraphs: int,
+              tables: int = 0, seed: int = 0):
+    """
+    Risk-analysis-like DOCX: headings every 25 paragraphs, sentences that
+    relate class labels (see StubClient), rule-triggering spec lines
+    (pipeline.rules_ie.TUNNEL_RULES) and optional spec tables.
+    """
+    from docx import Document
+    rng = random.Random(seed)
+    labels = [c[2] for c in classes]
+    doc = Document()
+    doc.add_heading("Risk Analysis (synthetic)", 0)
+    every = max(1, paragraphs // tables) if tables else 0
+    for i in range(paragraphs):
+        if i % 25 == 0:
+            doc.add_heading(f"Section {i // 25 + 1}", 1)
+        a, b = rng.choice(labels), rng.choice(labels)
+        _, verb = rng.choice(OBJ_PROPS)
+        _, dp, unit = rng.choice(DATA_PROPS)
+        sents = [f"The {a} {verb} the {b}.",
+                 f"The {b} has {dp} of {rng.uniform(1, 900):.1f} {unit}."]
+        r = rng.random()
+        if r < 0.1:
+            sents.append(f"Tunnel length: {rng.randint(100, 9000)} m")
+        elif r < 0.2:
+            sents.append(f"Cross passages: {rng.randint(1, 60)}")
+        elif r < 0.3:
+            sents.append(f"The fire hydrant network pressure: {rng.uniform(4, 12):.1f} bar")
+        doc.add_paragraph(" ".join(sents))
+        if every and i % every == every - 1:
+            t = doc.add_table(rows=5, cols=3)
+            for row in range(5):
+                t.cell(row, 0).text = rng.choice(labels)
+                t.cell(row, 1).text = f"{rng.uniform(0, 100):.1f}"
+                t.cell(row, 2).text = rng.choice(("m", "bar", "kg"))
+    doc.save(path)
+
+# ---------- stubs ----------
+_REL = re.compile(r"The ([a-z0-9 \-]+?) (" + "|".join(v for _, v in OBJ_PROPS) + r") the ([a-z0-9 \-]+?)\.")
+_VAL = re.compile(r"The ([a-z0-9 \-]+?) has (" + "|".join(d for _, d, _ in DATA_PROPS) + r") of ([\d.]+)")
+
+class StubClient:
+    """
+    Offline stand-in for the OpenAI client (.chat.completions.create): turns
+    the sentences written by make_docx back into triples, without latency.
+    """
+    def __init__(self):
+        self.requests = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kw):
+        self.requests += 1
+        text = messages[-1]["content"]
+        triples = [{"subject": s, "predicate": p, "object": o, "object_is_literal": False,
+                    "confidence": 0.9} for s, p, o in _REL.findall(text)]
+        triples += [{"subject": s, "predicate": p, "object": float(v), "object_is_literal": True,
+                     "confidence": 0.9} for s, p, v in _VAL.findall(text)]
+        msg = SimpleNamespace(content=json.dumps(triples))
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+class HashEncoder:
+    """
+    Character-trigram hashing encoder with the SentenceTransformer surface
+    OntologyLinker uses (encode, get_sentence_embedding_dimension). Similar
+    spellings get similar vectors; meant for timing, not accuracy.
+    """
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts, show_progress_bar=False, **kw) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for r, t in enumerate(texts):
+            t = f" {t.lower()} "
+            for i in range(len(t) - 2):
+                out[r, zlib.crc32(t[i:i + 3].encode("utf-8")) % self.dim] += 1.0
+        return out
@@ -1,104 +1,234 @@
 # ontology/ontology_builder.py
-import os
-from owlready2 import *
+# Builds the AEC TBox from a declarative spec (general_aec.yaml, or a CSV
+# with the same fields) into an owlready2 SQLite quadstore. Every entity's
+# triples are hashed and the hashes kept in the quadstore, so a rebuild
+# only rewrites entities whose spec changed and drops the ones removed from
+# the spec. Consumers open the quadstore instead of parsing RDF/XML; the
+# RDF/XML export is optional.
+#
+#   python ontology/ontology_builder.py                          # spec → quadstore + general_aec.owl
+#   python ontology/ontology_builder.py big.csv --store big.sqlite3 --no-export
+import os, re, csv, time, hashlib, argparse
+from typing import Any, Dict, List, Optional, Tuple
 
 BASE_IRI = "http://example.org/aec.owl"
-OUT_PATH = os.path.join(os.path.dirname(__file__), "general_aec.owl")
+HERE = os.path.dirname(os.path.abspath(__file__))
+SPEC_PATH = os.path.join(HERE, "general_aec.yaml")
+STORE_PATH = os.path.join(HERE, "general_aec.sqlite3")
+OUT_PATH = os.path.join(HERE, "general_aec.owl")
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+RDFS = "http://www.w3.org/2000/01/rdf-schema#"
+OWL = "http://www.w3.org/2002/07/owl#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+SKOS = "http://www.w3.org/2004/02/skos/core#"
+KINDS = {"class": OWL + "Class", "object": OWL + "ObjectProperty", "data": OWL + "DatatypeProperty"}
+LABELS = {"prefLabel": SKOS + "prefLabel", "altLabel": SKOS + "altLabel", "label": RDFS + "label"}
+# Python-ish names the old builder used for data ranges
+_XSD_ALIASES = {"float": "decimal", "int": "integer", "str": "string", "bool": "boolean"}
+_LANG = re.compile(r"^(.*)@([a-zA-Z]{2,3}(?:-[\w]+)?)$")
+# per-entity triple hashes and the last build's spec hash, kept in the quadstore
+HASH_TABLE, META_TABLE = "builder_hashes", "builder_meta"
+FORMAT = 1  # bump when entity_triples changes, so a rebuild re-reads unchanged spec files
+
+# (predicate IRI, object IRI or literal, None for IRIs / "@lang" / datatype IRI)
+Triple = Tuple[str, str, Optional[str]]
+
+# ---------- spec ----------
+def _list(v) -> List[str]:
+    if not v:
+        return []
+    if isinstance(v, str):
+        if "|" not in v:
+            return [v.strip()] if v.strip() else []
+        return [x.strip() for x in v.split("|") if x.strip()]
+    return [str(x) for x in v]
+
+def _entity(kind: str, v) -> Dict[str, Any]:
+    if not isinstance(v, dict):
+        v = {"parents": v} if kind == "class" else {}
+    e = {"kind": kind, "parents": _list(v.get("parents", v.get("parent")))}
+    if kind != "class":
+        e["domain"], e["range"] = _list(v.get("domain")), _list(v.get("range"))
+    for key in LABELS:
+        e[key] = _list(v.get(key))
+    return e
+
+def _read_yaml(path: str) -> Dict[str, Any]:
+    import yaml
+    with open(path, encoding="utf-8") as f:
+        doc = yaml.safe_load(f) or {}
+    ents = {}
+    for section, kind in (("classes", "class"), ("object_properties", "object"), ("data_properties", "data")):
+        for name, v in (doc.get(section) or {}).items():
+            ents[str(name)] = _entity(kind, v)
+    return {"iri": doc.get("iri", BASE_IRI), "lang": doc.get("lang", "en"), "entities": ents}
+
+def _read_csv(path: str) -> Dict[str, Any]:
+    """Columns kind (class|object|data), name, parents, domain, range, prefLabel, altLabel, label; "|" separates values."""
+    ents = {}
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            name = (row.get("name") or "").strip()
+            if name:
+                ents[name] = _entity((row.get("kind") or "class").strip(), row)
+    return {"iri": BASE_IRI, "lang": "en", "entities": ents}
+
+def load_spec(path: str) -> Dict[str, Any]:
+    """{"iri", "lang", "entities": {name: {"kind", "parents", "domain", "range", <label kinds>}}}."""
+    spec = _read_csv(path) if path.lower().endswith(".csv") else _read_yaml(path)
+    for name, e in spec["entities"].items():
+        if e["kind"] not in KINDS:
+            raise ValueError(f"{path}: {name}: unknown kind {e['kind']!r}")
+    return spec
+
+def _ref(name: str, ns: str) -> str:
+    if name == "Thing":
+        return OWL + "Thing"
+    return name if ":" in name else ns + name
+
+def entity_triples(e: Dict[str, Any], ns: str, lang: str) -> List[Triple]:
+    """The entity's triples, in the form the quadstore gets them (and they are hashed in)."""
+    out: List[Triple] = [(RDF_TYPE, KINDS[e["kind"]], None)]
+    if e["kind"] == "class":
+        for p in e["parents"] or ["Thing"]:
+            out.append((RDFS + "subClassOf", _ref(p, ns), None))
+    else:
+        for p in e["parents"]:
+            out.append((RDFS + "subPropertyOf", _ref(p, ns), None))
+        for d in e["domain"]:
+            out.append((RDFS + "domain", _ref(d, ns), None))
+        for r in e["range"]:
+            if e["kind"] == "data":
+                out.append((RDFS + "range", r if ":" in r else XSD + _XSD_ALIASES.get(r, r), None))
+            else:
+                out.append((RDFS + "range", _ref(r, ns), None))
+    for key, pred in LABELS.items():
+        for lab in e[key]:
+            m = _LANG.match(lab)
+            text, lg = (m.group(1), m.group(2)) if m else (lab, lang)
+            out.append((pred, text, "@" + lg))
+    return out
+
+def _digest(triples: List[Triple]) -> str:
+    return hashlib.sha1("\n".join(sorted(f"{p}\t{o}\t{d or ''}" for p, o, d in triples))
+                        .encode("utf-8")).hexdigest()
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha1(f"{FORMAT}\n".encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def compile_spec(spec: Dict[str, Any]) -> Dict[str, Tuple[List[Triple], str]]:
+    """{entity IRI: (triples, hash)}, including the SKOS annotation property declarations."""
+    ns = spec["iri"] + "#"
+    out = {}
+    for name, e in spec["entities"].items():
+        t = entity_triples(e, ns, spec["lang"])
+        out[ns + name] = (t, _digest(t))
+    for pred in (SKOS + "prefLabel", SKOS + "altLabel"):
+        t = [(RDF_TYPE, OWL + "AnnotationProperty", None)]
+        out[pred] = (t, _digest(t))
+    return out
+
+# ---------- quadstore ----------
+def open_world(store: str = STORE_PATH):
+    """owlready2 World backed by the SQLite quadstore at store (read it with pipeline.ontology_vocab.open_quadstore)."""
+    from owlready2 import World
+    world = World()
+    world.set_backend(filename=store)
+    return world
+
+def build(spec_path: str = SPEC_PATH, store: str = STORE_PATH, export: Optional[str] = None,
+          verbose: bool = True) -> Dict[str, Any]:
+    """
+    Upsert the spec into the quadstore: entities whose triple hash differs
+    from the stored one are deleted and rewritten, entities missing from the
+    spec are deleted, unchanged ones are not touched (a spec file identical
+    to the last build's is not parsed at all). export: optional RDF/XML
+    path. Returns counts and timings.
+    """
+    t0 = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(store)), exist_ok=True)
+    world = open_world(store)
+    db = world.graph.db
+    db.execute(f"CREATE TABLE IF NOT EXISTS {HASH_TABLE} (iri TEXT PRIMARY KEY, hash TEXT NOT NULL)")
+    db.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+    meta = dict(db.execute(f"SELECT key, value FROM {META_TABLE}"))
+    spec_hash = _file_digest(spec_path)
+    if meta.get("spec") == spec_hash:
+        iri, wanted, stored, changed, removed = meta["iri"], {}, {}, [], []
+        n_entities = db.execute(f"SELECT COUNT(*) FROM {HASH_TABLE}").fetchone()[0]
+    else:
+        spec = load_spec(spec_path)
+        iri, wanted = spec["iri"], compile_spec(spec)
+        stored = dict(db.execute(f"SELECT iri, hash FROM {HASH_TABLE}"))
+        changed = [e for e, (_, h) in wanted.items() if stored.get(e) != h]
+        removed = [e for e in stored if e not in wanted]
+        n_entities = len(wanted)
+    onto = world.get_ontology(iri)
+    t_spec = time.perf_counter() - t0
+
+    t1 = time.perf_counter()
+    abbrev, storids = world._abbreviate, {}
+    def sid(x: str) -> int:  # predicates and parents repeat across entities
+        v = storids.get(x)
+        if v is None:
+            v = storids[x] = abbrev(x)
+        return v
+    for e in changed + removed:
+        if e in stored:
+            s = sid(e)
+            onto._del_obj_triple_spo(s, None, None)
+            onto._del_data_triple_spod(s, None, None, None)
+    n_triples = 0
+    for e in changed:
+        s = sid(e)
+        for p, o, d in wanted[e][0]:
+            if d is None:
+                onto._add_obj_triple_spo(s, sid(p), sid(o))
+            else:
+                onto._add_data_triple_spod(s, sid(p), o, d)
+            n_triples += 1
+    # nothing is written for an unchanged TBox: consumers key caches on the file's hash
+    if changed or removed or meta.get("spec") != spec_hash:
+        db.executemany(f"INSERT OR REPLACE INTO {HASH_TABLE} VALUES (?, ?)", [(e, wanted[e][1]) for e in changed])
+        db.executemany(f"DELETE FROM {HASH_TABLE} WHERE iri=?", [(e,) for e in removed])
+        db.executemany(f"INSERT OR REPLACE INTO {META_TABLE} VALUES (?, ?)", [("spec", spec_hash), ("iri", iri)])
+        world.save()
+    t_write = time.perf_counter() - t1
+
+    t_export = 0.0
+    if export:
+        t2 = time.perf_counter()
+        os.makedirs(os.path.dirname(os.path.abspath(export)), exist_ok=True)
+        onto.save(file=export, format="rdfxml")
+        t_export = time.perf_counter() - t2
+    world.close()
+    stats = {"entities": n_entities, "upserted": len(changed), "removed": len(removed),
+             "unchanged": n_entities - len(changed), "triples_written": n_triples,
+             "seconds": {"spec": t_spec, "write": t_write, "export": t_export}}
+    if verbose:
+        print(f"✅ Ontology quadstore {store}: {stats['upserted']} upserted, {stats['removed']} removed, "
+              f"{stats['unchanged']} unchanged ({t_spec + t_write:.2f}s)")
+        if export:
+            print(f"✅ Ontology saved to {export}")
+    return stats
 
 def build_and_save():
-    onto = get_ontology(BASE_IRI)
-
-    with onto:
-        # ----- Upper -----
-        class AEC(Thing): pass
-        class State(AEC): pass
-        class Phase(AEC): pass
-        class Discipline(AEC): pass
-        class Infrastructure(AEC): pass
-        class Specification(AEC): pass
-        class Risk(AEC): pass
-        class SafetyMeasure(AEC): pass
-        class SafetyInfrastructure(SafetyMeasure): pass
-
-        # States & phases
-        class Normal(State): pass
-        class Emergency(State): pass
-        class Design(Phase): pass
-        class Construction(Phase): pass
-        class Operation(Phase): pass
-        class Refurbishment(Phase): pass
-        class Removal(Phase): pass
-
-        # Disciplines
-        class Architecture(Discipline): pass
-        class Engineering(Discipline): pass
-        class ConstructionDiscipline(Discipline): pass
-
-        # Infrastructure
-        class BuildingInfrastructure(Infrastructure): pass
-        class HighriseBuilding(BuildingInfrastructure): pass
-        class House(BuildingInfrastructure): pass
-        class TechnicalBuilding(BuildingInfrastructure): pass
-        class Factory(BuildingInfrastructure): pass
-
-        class TrafficInfrastructure(Infrastructure): pass
-        class Tunnel(TrafficInfrastructure): pass
-        class Viaduct(TrafficInfrastructure): pass
-        class OpenRoad(TrafficInfrastructure): pass
-
-        # Specifications / docs
-        class BuildingSpecification(Specification): pass
-        class TunnelSpecification(Specification): pass
-        class TunnelStructureSpec(TunnelSpecification): pass
-        class TunnelSafetyDoc(TunnelSpecification): pass
-        class TunnelGeologyDoc(TunnelSpecification): pass
-
-        # Risks
-        class FireRisk(Risk): pass
-        class AccidentRisk(Risk): pass
-        class RiskLevel(Risk): pass
-
-        # Fire safety measures
-        class FireSafetyMeasure(SafetyMeasure): pass
-        class FireDetectionSystem(FireSafetyMeasure): pass
-        class FireExtinguisher(FireSafetyMeasure): pass
-        class Hydrant(FireSafetyMeasure): pass
-        class Sprinkler(FireSafetyMeasure): pass
-        class EvacuationPath(SafetyInfrastructure): pass
-        class InterventionPath(SafetyInfrastructure): pass
-
-        # Object properties
-        class hasSpecification(Infrastructure >> Specification): pass
-        class inPhase(Infrastructure >> Phase): pass
-        class hasSafetyMeasure(Infrastructure >> SafetyMeasure): pass
-        class hasSafetyInfrastructure(Infrastructure >> SafetyInfrastructure): pass
-        class hasRisk(Infrastructure >> Risk): pass
-        class hasRiskLevel(FireRisk >> RiskLevel): pass
-        class mitigates(SafetyMeasure >> FireRisk): pass
-        class consistsOf(SafetyInfrastructure >> SafetyMeasure): pass
-
-        # Data properties
-        class tunnelLength(TunnelStructureSpec >> float): pass
-        class numberOfCrossPassages(TunnelStructureSpec >> int): pass
-        class pressure(Hydrant >> float): pass
-        class hasWeight(FireExtinguisher >> float): pass
-        class riskScore(RiskLevel >> float): pass
-        class evacPathWidth(EvacuationPath >> float): pass
-        class intervPathWidth(InterventionPath >> float): pass
-
-        # SKOS labels (minimal demo)
-        skos = onto.get_namespace("http://www.w3.org/2004/02/skos/core#")
-        class prefLabel(AnnotationProperty): namespace = skos
-        class altLabel(AnnotationProperty):  namespace = skos
-        from owlready2 import locstr
-        Tunnel.prefLabel.append(locstr("Tunnel", "en"))
-        HighriseBuilding.prefLabel.append(locstr("High-rise building", "en"))
-        Hydrant.altLabel.append(locstr("fire plug", "en"))
-        FireExtinguisher.altLabel.append(locstr("portable extinguisher", "en"))
-
-    os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-    onto.save(file=OUT_PATH, format="rdfxml")
-    print(f"✅ Ontology saved to {OUT_PATH}")
+    """The bundled TBox: general_aec.yaml → general_aec.sqlite3 + general_aec.owl."""
+    return build(SPEC_PATH, STORE_PATH, export=OUT_PATH)
+
+def _cli():
+    ap = argparse.ArgumentParser(description="Build the TBox quadstore from a YAML/CSV spec.")
+    ap.add_argument("spec", nargs="?", default=SPEC_PATH)
+    ap.add_argument("--store", default=STORE_PATH, help="owlready2 SQLite quadstore to upsert into")
+    ap.add_argument("--export", default=OUT_PATH, help="RDF/XML output path")
+    ap.add_argument("--no-export", action="store_true", help="skip the RDF/XML export")
+    args = ap.parse_args()
+    build(args.spec, args.store, export=None if args.no_export else args.export)
 
 if __name__ == "__main__":
-    build_and_save()
+    _cli()
@@ -0,0 +1,62 @@
+# pipeline/__init__.py
+# Public names resolve lazily (PEP 562): "from pipeline import write_abox"
+# only imports abox_writer, never torch/openai/owlready2 unless needed.
+import importlib
+
+_LAZY = {
+    "OntologyLinker": "emb_linker",
+    "LexicalIndex": "lexical_index",
+    "get_model": "emb_linker",
+    "EmbeddingCache": "emb_cache",
+    "extract_triples_llm": "llm_ie",
+    "extract_chunks_llm": "llm_ie",
+    "chunk_text": "llm_ie",
+    "chunk_blocks": "llm_ie",
+    "iter_blocks": "docx_stream",
+    "read_text": "docx_stream",
+    "LLMCache": "llm_cache",
+    "write_abox": "abox_writer",
+    "write_abox_stream": "abox_writer",
+    "merge_aboxes": "abox_writer",
+    "patch_abox": "abox_writer",
+    "export_turtle": "abox_writer",
+    "Manifest": "manifest",
+    "update_document": "manifest",
+    "document_lines": "manifest",
+    "extract_with_rules": "rules_ie",
+    "TripleFusion": "fusion",
+    "fuse": "fusion",
+    "rules_as_triples": "fusion",
+    "Validator": "validator",
+    "validate_abox": "validator",
+    "TripleStore": "triple_store",
+    "Reasoner": "reasoner",
+    "reason_abox": "reasoner",
+    "build_gazetteer": "gazetteer",
+    "GazetteerMatcher": "gazetteer_matcher",
+    "normalize_entities": "linker",
+    "load_ontology": "ontology_vocab",
+    "extract_vocab": "ontology_vocab",
+    "load_vocab": "ontology_vocab",
+    "load_snapshot": "vocab_snapshot",
+    "invalidate_snapshot": "vocab_snapshot",
+    "visualize_abox": "viz",
+    "visualize_tbox_abox": "viz",
+    "write_large_view": "viz",
+    "ego_graph": "viz",
+    "wikidata_search": "wikidata",
+    "WikidataLinker": "wikidata",
+}
+
+__all__ = sorted(_LAZY)
+
+def __getattr__(name):
+    mod = _LAZY.get(name)
+    if mod is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{mod}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
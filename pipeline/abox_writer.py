@@ -1,14 +1,15 @@
 # pipeline/abox_writer.py
 import os
 from rdflib import Graph, Namespace, RDF, Literal, XSD
-from owlready2 import get_ontology, ThingClass, ObjectPropertyClass, DataPropertyClass
 
 EX_IRI = "http://example.org/aec#"
 
 # pipeline/abox_writer.py
 from rdflib import Graph, Namespace, URIRef, Literal, RDF, XSD
-import re
+import re, hashlib
+from collections import Counter
 from typing import Any, Dict, Iterable, List, Tuple, Optional
+from . import metrics
 
 
 
@@ -24,6 +25,8 @@ def _get(d: Dict[str, Any], *names):
 
 def _norm_label(x: Any) -> str:
     # Keep qnames like ex:Hydrant if already present; else sanitize to Camel-ish id
+    if isinstance(x, dict):  # linked form, {"name": ..., "class": ...}
+        x = x.get("name", "")
     if isinstance(x, str):
         return x.strip()
     return str(x)
@@ -66,6 +69,8 @@ def _normalize_triple(t: Any) -> Optional[Dict[str, Any]]:
     Returns dict {subject, predicate, object, ptype?, confidence?} or None if unusable.
     Supports:
       - dicts with various key aliases
+      - linked dicts (Text_data_retreival.link_triples: {"name": ...} parts,
+        data values under "object_literal")
       - tuples/lists (s,p,o[,ptype])
     """
     if isinstance(t, (tuple, list)):
@@ -84,14 +89,18 @@ def _normalize_triple(t: Any) -> Optional[Dict[str, Any]]:
         s = _get(t, "subject", "subj", "s", "source")
         p = _get(t, "predicate", "pred", "p", "relation", "property")
         o = _get(t, "object", "obj", "o", "target")
-        if not (s and p and o):
+        pt = _get(t, "ptype", "type")
+        if o is None and isinstance(t.get("object_literal"), dict):
+            o, pt = t["object_literal"].get("value"), "data"
+        if isinstance(p, dict):
+            pt = pt or p.get("kind")
+        if not (s and p and o is not None and o != ""):
             return None
         out = {
             "subject": _norm_label(s),
             "predicate": _norm_label(p),
             "object": _norm_label(o),
         }
-        pt = _get(t, "ptype", "type")
         if pt: out["ptype"] = pt
         cf = _get(t, "confidence", "score")
         if cf: out["confidence"] = cf
@@ -100,7 +109,34 @@ def _normalize_triple(t: Any) -> Optional[Dict[str, Any]]:
     # unknown shape
     return None
 
-def write_abox(triples: Iterable[Any], out_ttl: str = "Tests/auto_abox.ttl") -> Graph:
+def _to_terms(t: Dict[str, Any]):
+    """(subject, predicate, object) rdflib terms for a normalized triple."""
+    s, p, o = t["subject"], t["predicate"], t["object"]
+
+    # subjects/predicates are resources
+    s_term = URIRef(s) if _looks_iri(s) else EX[_safe_id(s)]
+    p_term = URIRef(p) if _looks_iri(p) else EX[_safe_id(p)]
+
+    # object may be literal or resource
+    if isinstance(o, (int, float)):
+        o_term = Literal(o, datatype=XSD.float if isinstance(o, float) else XSD.integer)
+    elif isinstance(o, str) and t.get("ptype") == "data":
+        o_term = _as_literal_or_uri(o)
+        if not isinstance(o_term, Literal):
+            o_term = Literal(o)  # data property: a string value, not a resource
+    elif isinstance(o, str):
+        o_term = _as_literal_or_uri(o)
+    else:
+        o_term = Literal(str(o))
+    return s_term, p_term, o_term
+
+@metrics.timed("abox.write")
+def write_abox(triples: Iterable[Any], out_ttl: str = "Tests/auto_abox.ttl",
+               store: Any = None, graph: Any = None) -> Graph:
+    """
+    Serialize to out_ttl; store (a TripleStore or its path) also receives the
+    triples, replacing graph's previous contents when graph is given.
+    """
     g = Graph()
     g.bind("ex", EX)
 
@@ -115,30 +151,24 @@ def write_abox(triples: Iterable[Any], out_ttl: str = "Tests/auto_abox.ttl") ->
             skipped.append({"reason": "unusable triple shape", "raw": raw})
             continue
 
-        s = _safe_id(t["subject"])
-        p = _safe_id(t["predicate"])
-        o = t["object"]
-
-        # subjects/predicates are resources
-        s_term = EX[s] if not _looks_iri(s) else URIRef(s)
-        p_term = EX[p] if not _looks_iri(p) else URIRef(p)
-
-        # object may be literal or resource
-        if isinstance(o, (int, float)):
-            o_term = Literal(o, datatype=XSD.float if isinstance(o, float) else XSD.integer)
-        elif isinstance(o, str):
-            o_term = _as_literal_or_uri(o)
-        else:
-            o_term = Literal(str(o))
-
         try:
-            g.add((s_term, p_term, o_term))
+            g.add(_to_terms(t))
             ok += 1
         except Exception as e:
             skipped.append({"reason": f"rdflib add failed: {e}", "triple": t})
 
-    g.serialize(out_ttl, format="turtle")
+    metrics.incr("abox.triples_in", total)
+    metrics.incr("abox.triples_out", ok)
+    metrics.incr("abox.skipped", len(skipped))
+    with metrics.span("abox.serialize", triples=len(g)):
+        g.serialize(out_ttl, format="turtle")
     print(f"✅ ABox written: {out_ttl}  (ok={ok}, total={total}, skipped={len(skipped)})")
+    if store is not None:
+        from .triple_store import TripleStore
+        ts = store if isinstance(store, TripleStore) else TripleStore(store)
+        ts.bulk_load(g, graph=graph, replace=graph is not None)
+        if ts is not store:
+            ts.close()
 
     if skipped:
         print("⚠️ Skipped triples (showing up to 10):")
@@ -146,3 +176,207 @@ def write_abox(triples: Iterable[Any], out_ttl: str = "Tests/auto_abox.ttl") ->
             print("  -", row)
 
     return g
+
+# ---------- streaming writer ----------
+_XSD = str(XSD)
+_LOCAL_OK = re.compile(r"^[A-Za-z_][A-Za-z0-9_-]*$")
+
+def _escape(s: str) -> str:
+    return (s.replace("\\", "\\\\").replace('"', '\\"')
+             .replace("\n", "\\n").replace("\r", "\\r"))
+
+def _nt_term(term) -> str:
+    if isinstance(term, Literal):
+        out = f'"{_escape(str(term))}"'
+        if term.language:
+            return f"{out}@{term.language}"
+        if term.datatype:
+            return f"{out}^^<{term.datatype}>"
+        return out
+    return f"<{term}>"
+
+def _ttl_term(term) -> str:
+    if isinstance(term, Literal):
+        out = _nt_term(term)
+        if term.datatype and str(term.datatype).startswith(_XSD):
+            out = out.replace(f"^^<{term.datatype}>", f"^^xsd:{str(term.datatype)[len(_XSD):]}")
+        return out
+    iri = str(term)
+    if iri.startswith(str(EX)) and _LOCAL_OK.match(iri[len(str(EX)):]):
+        return f"ex:{iri[len(str(EX)):]}"
+    return f"<{iri}>"
+
+def _digest(line: str) -> int:
+    return int.from_bytes(hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest(), "little")
+
+@metrics.timed("abox.stream")
+def write_abox_stream(triples: Iterable[Any], out_path: str, fmt: str = "nt",
+                      dedupe: bool = True) -> Dict[str, Any]:
+    """
+    Bounded-memory alternative to write_abox for large corpora: triples are
+    written as they arrive, as N-Triples (fmt="nt") or prefix-compressed
+    Turtle (fmt="ttl", consecutive triples sharing a subject use ";").
+    Duplicates are dropped through a set of 64-bit digests instead of a
+    Graph, and skipped rows are only counted by reason. Returns the counts.
+    """
+    if fmt not in ("nt", "ttl"):
+        raise ValueError(f"fmt must be 'nt' or 'ttl', got {fmt!r}")
+    seen = set()
+    reasons: Counter = Counter()
+    total = ok = dups = 0
+    last_s = None
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        if fmt == "ttl":
+            f.write(f"@prefix ex: <{EX}> .\n@prefix xsd: <{_XSD}> .\n\n")
+        for raw in triples:
+            total += 1
+            t = _normalize_triple(raw)
+            if not t:
+                reasons["unusable triple shape"] += 1
+                continue
+            try:
+                terms = _to_terms(t)
+            except Exception as e:
+                reasons[f"term conversion failed: {type(e).__name__}"] += 1
+                continue
+
+            nt = " ".join(_nt_term(x) for x in terms)
+            if dedupe:
+                h = _digest(nt)
+                if h in seen:
+                    dups += 1
+                    continue
+                seen.add(h)
+            ok += 1
+
+            if fmt == "nt":
+                f.write(nt + " .\n")
+                continue
+            s, p, o = (_ttl_term(x) for x in terms)
+            if terms[1] == RDF.type:
+                p = "a"
+            if s == last_s:
+                f.write(f" ;\n    {p} {o}")
+            else:
+                if last_s is not None:
+                    f.write(" .\n")
+                f.write(f"{s} {p} {o}")
+                last_s = s
+        if fmt == "ttl" and last_s is not None:
+            f.write(" .\n")
+
+    skipped = sum(reasons.values())
+    metrics.incr("abox.triples_in", total)
+    metrics.incr("abox.triples_out", ok)
+    metrics.incr("abox.skipped", skipped)
+    print(f"✅ ABox streamed: {out_path}  (ok={ok}, total={total}, duplicates={dups}, skipped={skipped})")
+    for reason, n in reasons.most_common():
+        print(f"  - {reason}: {n}")
+    return {"ok": ok, "total": total, "duplicates": dups, "skipped": dict(reasons)}
+
+def merge_aboxes(paths: Iterable[str], out_path: str, fmt: str = "turtle") -> Dict[str, Any]:
+    """
+    Merge several ABox files into one N-Triples file, one input at a time
+    (only the current input is held as a Graph); duplicates across inputs
+    are dropped via 64-bit digests.
+    """
+    seen = set()
+    files = written = 0
+    with open(out_path, "w", encoding="utf-8") as f:
+        for path in paths:
+            g = Graph(); g.parse(path, format=fmt)
+            files += 1
+            for triple in g:
+                line = " ".join(_nt_term(x) for x in triple)
+                h = _digest(line)
+                if h in seen:
+                    continue
+                seen.add(h)
+                f.write(line + " .\n")
+                written += 1
+    print(f"✅ Merged ABox: {out_path}  (files={files}, triples={written})")
+    return {"files": files, "triples": written}
+
+# ---------- incremental patching ----------
+def triple_lines(triples: Iterable[Any]) -> List[str]:
+    """N-Triples lines (without the trailing " .") for the usable triples."""
+    lines = []
+    for raw in triples:
+        t = _normalize_triple(raw)
+        if not t:
+            continue
+        try:
+            lines.append(" ".join(_nt_term(x) for x in _to_terms(t)))
+        except Exception:
+            continue
+    return lines
+
+def _nt_graph(lines: Iterable[str]) -> Graph:
+    g = Graph()
+    data = "".join(f"{line} .\n" for line in lines)
+    if data:
+        g.parse(data=data, format="nt")
+    return g
+
+@metrics.timed("abox.patch")
+def patch_abox(path: str, retract: Iterable[str], add: Iterable[str],
+               reset: bool = False) -> Dict[str, Any]:
+    """
+    Apply a delta of N-Triples lines (as from triple_lines) to an ABox file
+    instead of rebuilding it. ".nt" files are filtered and appended line by
+    line; anything else is treated as Turtle and patched through a Graph,
+    which re-parses and re-serializes the whole ABox on every call, so keep
+    the patched ABox in N-Triples and export Turtle once at the end
+    (export_turtle). reset=True starts from an empty ABox.
+    """
+    retract, add = set(retract), list(dict.fromkeys(add))
+    exists = os.path.exists(path) and not reset
+    removed = added = 0
+    if path.endswith(".nt"):
+        present = set()
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as out:
+            if exists:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        key = line.rstrip().removesuffix(" .")
+                        if not key:
+                            continue
+                        if key in retract:
+                            removed += 1
+                            continue
+                        present.add(key)
+                        out.write(key + " .\n")
+            for key in add:
+                if key not in present:
+                    present.add(key)
+                    out.write(key + " .\n")
+                    added += 1
+        os.replace(tmp, path)
+        total = len(present)
+    else:
+        g = Graph()
+        if exists:
+            g.parse(path, format="turtle")
+        g.bind("ex", EX)
+        before = len(g)
+        g -= _nt_graph(retract)
+        removed = before - len(g)
+        kept = len(g)
+        g += _nt_graph(add)
+        added = len(g) - kept
+        total = len(g)
+        g.serialize(path, format="turtle")
+    print(f"✅ ABox patched: {path}  (+{added}, -{removed}, total={total})")
+    return {"added": added, "removed": removed, "total": total}
+
+@metrics.timed("abox.export")
+def export_turtle(nt_path: str, out_ttl: str) -> int:
+    """Turtle copy of an N-Triples ABox (e.g. the one patch_abox maintains); returns the triple count."""
+    g = Graph()
+    g.parse(nt_path, format="nt")
+    g.bind("ex", EX)
+    g.serialize(out_ttl, format="turtle")
+    print(f"✅ ABox exported: {out_ttl}  ({len(g)} triples)")
+    return len(g)
@@ -0,0 +1,274 @@
+# pipeline/ann_index.py
+import os
+from typing import Tuple, Optional
+import numpy as np
+
+def topk(sims: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top-k of a (n_queries, n_items) score matrix, best first."""
+    n = sims.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        empty = np.empty((sims.shape[0], 0))
+        return empty.astype(int), empty
+    if k < n:
+        idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.tile(np.arange(n), (sims.shape[0], 1))
+    part = np.take_along_axis(sims, idx, axis=1)
+    order = np.argsort(-part, axis=1)
+    idx = np.take_along_axis(idx, order, axis=1)
+    return idx, np.take_along_axis(sims, idx, axis=1)
+
+LABEL_DTYPES = ("float32", "float16", "int8")
+# search works on blocks of at most QUERY_BLOCK x ROW_BLOCK scores (32 MB)
+QUERY_BLOCK, ROW_BLOCK = 1024, 8192
+
+class QuantMatrix:
+    """
+    Label rows stored as float16, or as int8 with one float32 scale per row
+    (row ≈ data * scale, scale = max|row| / 127). Products are taken block by
+    block in float32, so only one block is ever dequantized.
+    """
+
+    def __init__(self, data: np.ndarray, scale: Optional[np.ndarray] = None):
+        self.data, self.scale = data, scale
+
+    @classmethod
+    def quantize(cls, emb: np.ndarray, dtype: str) -> "QuantMatrix":
+        emb = np.asarray(emb, dtype=np.float32)
+        if dtype == "float16":
+            return cls(emb.astype(np.float16))
+        if dtype != "int8":
+            raise ValueError(f"Unknown label dtype {dtype!r}; expected one of {LABEL_DTYPES}")
+        scale = np.abs(emb).max(axis=1) / 127.0 if len(emb) else np.zeros(0, dtype=np.float32)
+        scale[scale == 0] = 1.0
+        data = np.rint(emb / scale[:, None]).astype(np.int8)
+        return cls(data, scale.astype(np.float32))
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def dtype(self) -> str:
+        return str(self.data.dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, rows) -> "QuantMatrix":
+        return QuantMatrix(self.data[rows], None if self.scale is None else self.scale[rows])
+
+    def rows(self, a: int, b: int) -> np.ndarray:
+        """Rows a:b as float32."""
+        x = self.data[a:b].astype(np.float32)
+        if self.scale is not None:
+            x *= self.scale[a:b, None]
+        return x
+
+def _rows(emb, a: int, b: int) -> np.ndarray:
+    return emb.rows(a, b) if isinstance(emb, QuantMatrix) else emb[a:b]
+
+def blocked_topk(queries: np.ndarray, emb, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    topk(queries @ emb.T, k) for float32 rows or a QuantMatrix, without the
+    full (n_queries, n_rows) score matrix: per block, keep the best k and
+    merge them with the best so far.
+    """
+    n = len(emb)
+    nq = queries.shape[0]
+    k = min(k, n)
+    if nq <= QUERY_BLOCK and n <= ROW_BLOCK:
+        return topk(queries @ _rows(emb, 0, n).T, k)
+    idx = np.empty((nq, max(k, 0)), dtype=np.int64)
+    scores = np.empty((nq, max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return idx, scores
+    for qa in range(0, nq, QUERY_BLOCK):
+        q = queries[qa:qa + QUERY_BLOCK]
+        best_i = best_s = None
+        for a in range(0, n, ROW_BLOCK):
+            i, s = topk(q @ _rows(emb, a, a + ROW_BLOCK).T, k)
+            i = i + a
+            if best_i is None:
+                best_i, best_s = i, s
+                continue
+            cat_i, cat_s = np.concatenate([best_i, i], axis=1), np.concatenate([best_s, s], axis=1)
+            j, best_s = topk(cat_s, k)
+            best_i = np.take_along_axis(cat_i, j, axis=1)
+        idx[qa:qa + len(q)], scores[qa:qa + len(q)] = best_i, best_s
+    return idx, scores
+
+class ExactIndex:
+    """Brute-force inner product over unit-normalized rows (float32 or a QuantMatrix)."""
+    kind = "exact"
+
+    def __init__(self, emb):
+        self.emb = emb if isinstance(emb, QuantMatrix) else np.asarray(emb, dtype=np.float32)
+
+    def __len__(self):
+        return self.emb.shape[0]
+
+    def quantize(self, dtype: str) -> "ExactIndex":
+        if dtype != "float32":
+            self.emb = QuantMatrix.quantize(self.emb, dtype)
+        return self
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return blocked_topk(queries, self.emb, k)
+
+    def recall(self, queries: np.ndarray, k: int = 10) -> float:
+        return 1.0
+
+    def save(self, path: str, key: str = ""):
+        pass  # nothing to build; rows come from the linker
+
+class IVFIndex:
+    """
+    Inverted-file index: spherical k-means partitions the rows into n_lists
+    cells; a query scores the n_probe closest centroids and then only the
+    rows in those cells. Rows are stored grouped by cell.
+    """
+    kind = "ivf"
+
+    def __init__(self, emb: np.ndarray, n_lists: Optional[int] = None, n_probe: int = 8,
+                 iters: int = 10, seed: int = 0, _built: Optional[dict] = None):
+        self.emb = np.asarray(emb, dtype=np.float32)
+        self.n_probe = n_probe
+        if _built is not None:
+            self.centroids = _built["centroids"]
+            self.order = _built["order"]
+            self.offsets = _built["offsets"]
+        else:
+            n = self.emb.shape[0]
+            self.n_lists = n_lists or max(1, int(np.sqrt(n)))
+            self._build(iters, seed)
+        self.n_lists = self.centroids.shape[0]
+        self.sorted_emb = self.emb[self.order]
+
+    def __len__(self):
+        return self.emb.shape[0]
+
+    def quantize(self, dtype: str) -> "IVFIndex":
+        """Store the rows as float16/int8 (QuantMatrix); centroids stay float32."""
+        if dtype != "float32":
+            self.emb = QuantMatrix.quantize(self.emb, dtype)
+            self.sorted_emb = self.emb[self.order]
+        return self
+
+    def _build(self, iters: int, seed: int):
+        x = self.emb
+        n = x.shape[0]
+        n_lists = min(self.n_lists, max(n, 1))
+        rng = np.random.default_rng(seed)
+        if n == 0:
+            self.centroids = np.zeros((1, x.shape[1]), dtype=np.float32)
+            assign = np.zeros(0, dtype=np.int64)
+        else:
+            cent = x[rng.choice(n, n_lists, replace=False)].copy()
+            for _ in range(iters):
+                assign = np.argmax(x @ cent.T, axis=1)
+                sums = np.zeros_like(cent)
+                np.add.at(sums, assign, x)
+                counts = np.bincount(assign, minlength=n_lists)
+                empty = counts == 0
+                if empty.any():
+                    # re-seed empty cells with random rows
+                    sums[empty] = x[rng.choice(n, int(empty.sum()))]
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                cent = (sums / norms).astype(np.float32)
+            assign = np.argmax(x @ cent.T, axis=1)
+            self.centroids = cent
+        self.order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=self.centroids.shape[0])
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        nq = queries.shape[0]
+        k = min(k, len(self))
+        idx = np.full((nq, k), -1, dtype=np.int64)
+        scores = np.full((nq, k), -np.inf, dtype=np.float32)
+        if k <= 0:
+            return idx, scores
+        probe, _ = topk(queries @ self.centroids.T, min(self.n_probe, self.n_lists))
+        # group queries by probed cell so each cell is one contiguous matmul
+        by_cell = {}
+        for q in range(nq):
+            for c in probe[q]:
+                by_cell.setdefault(int(c), []).append(q)
+        cand_rows = [[] for _ in range(nq)]
+        cand_sims = [[] for _ in range(nq)]
+        for c, qs in by_cell.items():
+            a, b = self.offsets[c], self.offsets[c + 1]
+            if a == b:
+                continue
+            block = queries[qs] @ _rows(self.sorted_emb, a, b).T
+            rows = np.arange(a, b)
+            for j, q in enumerate(qs):
+                cand_rows[q].append(rows)
+                cand_sims[q].append(block[j])
+        for q in range(nq):
+            if not cand_rows[q]:
+                continue
+            rows = np.concatenate(cand_rows[q])
+            i, s = topk(np.concatenate(cand_sims[q]).reshape(1, -1), k)
+            idx[q, :i.shape[1]] = self.order[rows[i[0]]]
+            scores[q, :s.shape[1]] = s[0]
+        return idx, scores
+
+    def recall(self, queries: np.ndarray, k: int = 10) -> float:
+        """Mean fraction of the exact top-k that this index also returns."""
+        if len(self) == 0 or queries.shape[0] == 0:
+            return 1.0
+        exact, _ = ExactIndex(self.emb).search(queries, k)
+        approx, _ = self.search(queries, k)
+        hit = [len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact)]
+        return float(np.mean(hit))
+
+    def save(self, path: str, key: str = ""):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, centroids=self.centroids, order=self.order, offsets=self.offsets,
+                     n=np.int64(len(self)), key=np.array(key))
+
+    @classmethod
+    def load(cls, path: str, emb: np.ndarray, key: str = "", n_probe: int = 8):
+        """Return the saved index, or None if it was built for other rows."""
+        try:
+            z = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        if str(z["key"]) != key or int(z["n"]) != emb.shape[0]:
+            return None
+        built = {"centroids": z["centroids"], "order": z["order"], "offsets": z["offsets"]}
+        return cls(emb, n_probe=n_probe, _built=built)
+
+INDEX_KINDS = {"exact": ExactIndex, "ivf": IVFIndex}
+
+def load_or_build(emb: np.ndarray, kind: str = "exact", path: Optional[str] = None,
+                  key: str = "", dtype: str = "float32", **params):
+    """
+    Build an index of the given kind over emb. For ANN kinds with a path,
+    reuse the saved index when its key matches, else build and save it.
+    dtype ("float32" | "float16" | "int8") is how the rows are kept once built.
+    """
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind {kind!r}; expected one of {sorted(INDEX_KINDS)}")
+    if dtype not in LABEL_DTYPES:
+        raise ValueError(f"Unknown label dtype {dtype!r}; expected one of {LABEL_DTYPES}")
+    if kind == "exact":
+        return ExactIndex(emb).quantize(dtype)
+    cls = INDEX_KINDS[kind]
+    if path and os.path.exists(path):
+        idx = cls.load(path, emb, key=key, n_probe=params.get("n_probe", 8))
+        if idx is not None:
+            return idx.quantize(dtype)
+    idx = cls(emb, **params)
+    if path:
+        idx.save(path, key=key)
+    return idx.quantize(dtype)
@@ -0,0 +1,133 @@
+# pipeline/docx_stream.py
+import re, zipfile
+import xml.etree.ElementTree as ET
+from typing import List, Dict, Any, Iterator, Optional
+from . import metrics
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_P, _TBL, _TR, _TC, _BODY = W + "p", W + "tbl", W + "tr", W + "tc", W + "body"
+_HEADING_NAME = re.compile(r"^(?:heading\s*(\d)|title)$", re.I)
+
+def _heading_levels(zf: zipfile.ZipFile) -> Dict[str, int]:
+    """styleId -> outline level (1-based) for heading-like paragraph styles."""
+    try:
+        root = ET.fromstring(zf.read("word/styles.xml"))
+    except KeyError:
+        return {}
+    levels = {}
+    for st in root.iter(W + "style"):
+        sid = st.get(W + "styleId")
+        name = st.find(W + "name")
+        m = _HEADING_NAME.match(name.get(W + "val", "")) if name is not None else None
+        lvl = st.find(f"{W}pPr/{W}outlineLvl")
+        if m:
+            levels[sid] = int(m.group(1) or 0) or 1
+        elif lvl is not None:
+            levels[sid] = int(lvl.get(W + "val", "0")) + 1
+    return levels
+
+def _para_text(p: ET.Element) -> str:
+    parts = []
+    for el in p.iter():
+        tag = el.tag
+        if tag == W + "t":
+            parts.append(el.text or "")
+        elif tag in (W + "tab", W + "br", W + "cr"):
+            parts.append(" ")
+        elif tag == W + "noBreakHyphen":
+            parts.append("-")
+    return " ".join("".join(parts).split())
+
+def _para_level(p: ET.Element, levels: Dict[str, int]) -> Optional[int]:
+    ppr = p.find(W + "pPr")
+    if ppr is None:
+        return None
+    lvl = ppr.find(W + "outlineLvl")
+    if lvl is not None:
+        return int(lvl.get(W + "val", "0")) + 1
+    style = ppr.find(W + "pStyle")
+    return levels.get(style.get(W + "val")) if style is not None else None
+
+def iter_blocks(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a .docx body as blocks, parsing word/document.xml with iterparse
+    and dropping each top-level paragraph/table once it has been yielded.
+
+    Blocks: {"kind": "heading"|"paragraph"|"table_row", "text", "start",
+    "end", "path"} where path is the list of enclosing heading titles and
+    start/end are offsets into read_text(path) (block texts joined by
+    "\\n"). Headings add "level"; table rows add "table", "row" and "cells",
+    with text = cells joined by " | ". Empty paragraphs and rows are skipped.
+    """
+    with zipfile.ZipFile(path) as zf:
+        levels = _heading_levels(zf)
+        with zf.open("word/document.xml") as f:
+            pos = 0
+            heads: List[tuple] = []  # (level, title)
+            body = None
+            tbl_depth = 0
+            n_tables = -1
+            row_no = 0
+
+            def block(kind, text, **extra):
+                nonlocal pos
+                b = {"kind": kind, "text": text, "start": pos, "end": pos + len(text),
+                     "path": [t for _, t in heads], **extra}
+                pos += len(text) + 1
+                return b
+
+            for event, el in ET.iterparse(f, events=("start", "end")):
+                tag = el.tag
+                if event == "start":
+                    if tag == _BODY:
+                        body = el
+                    elif tag == _TBL:
+                        tbl_depth += 1
+                        if tbl_depth == 1:
+                            n_tables += 1
+                            row_no = 0
+                    continue
+
+                if tag == _P and tbl_depth == 0:
+                    text = _para_text(el)
+                    if text:
+                        lvl = _para_level(el, levels)
+                        if lvl is not None:
+                            while heads and heads[-1][0] >= lvl:
+                                heads.pop()
+                            yield block("heading", text, level=lvl)
+                            heads.append((lvl, text))
+                        else:
+                            yield block("paragraph", text)
+                elif tag == _TR and tbl_depth == 1:
+                    # nested tables stay inside their outer cell's text
+                    cells = [" ".join(filter(None, (_para_text(p) for p in tc.iter(_P))))
+                             for tc in el.findall(_TC)]
+                    if any(cells):
+                        yield block("table_row", " | ".join(cells), table=n_tables, row=row_no,
+                                    cells=cells)
+                    row_no += 1
+                elif tag == _TBL:
+                    tbl_depth -= 1
+                else:
+                    continue
+
+                # bounded memory: drop finished top-level content from the tree
+                if body is not None and tbl_depth == 0 and tag in (_P, _TBL):
+                    el.clear()
+                    try:
+                        body.remove(el)
+                    except ValueError:
+                        pass
+
+def iter_texts(path: str) -> Iterator[str]:
+    """Block texts only, e.g. RuleEngine.extract(iter_texts(path), tunnel_id)."""
+    for b in iter_blocks(path):
+        yield b["text"]
+
+def read_text(path: str) -> str:
+    """Whole document as text, one block per line (tables included)."""
+    with metrics.span("docx.read"):
+        texts = list(iter_texts(path))
+    metrics.incr("docx.blocks", len(texts))
+    return "\n".join(texts)
@@ -0,0 +1,202 @@
+# pipeline/emb_cache.py
+import os, re, json, hashlib
+from collections import OrderedDict
+from typing import Callable, List, Dict, Any
+import numpy as np
+from . import metrics
+from .gazetteer import _norm
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store keyed by (model_name, normalized text).
+
+    Vectors live in a memory-mapped float32 matrix (<slug>.f32); the index
+    file (<slug>.index.json) maps keys to rows in LRU order. Once max_items
+    rows are in use, the least recently used row is overwritten; an evicted
+    row is only reused after the index no longer maps its old key to it, so
+    a crash cannot leave the on-disk index pointing at another text's vector.
+    Call flush() to persist the index after a run.
+
+    readonly=True maps the files read-only and keeps new entries in memory
+    only, so several processes can share one cache directory.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, max_items: int = 200_000,
+                 readonly: bool = False):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.max_items = int(max_items)
+        self.readonly = readonly
+        self._extra: Dict[str, np.ndarray] = {}  # readonly mode: misses seen this run
+        slug = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.mat_path = os.path.join(cache_dir, f"{slug}.f32")
+        self.idx_path = os.path.join(cache_dir, f"{slug}.index.json")
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.dim = None
+        self.capacity = 0
+        self.slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free: List[int] = []
+        self._stale: List[int] = []  # evicted rows the on-disk index may still map
+        self._mat = None
+        self._load()
+
+    # ---------- persistence ----------
+    def _load(self):
+        if not (os.path.exists(self.idx_path) and os.path.exists(self.mat_path)):
+            return
+        try:
+            with open(self.idx_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("model") != self.model_name:
+            return
+        self.dim = int(meta["dim"])
+        self.capacity = int(meta["capacity"])
+        self._mat = np.memmap(self.mat_path, dtype=np.float32, mode="r" if self.readonly else "r+",
+                              shape=(self.capacity, self.dim))
+        self.slots = OrderedDict((k, int(v)) for k, v in meta["slots"])
+        used = set(self.slots.values())
+        self._free = [i for i in range(self.capacity - 1, -1, -1) if i not in used]
+        while len(self.slots) > self.max_items:
+            self._evict()
+
+    def flush(self):
+        if self._mat is None or self.readonly:
+            return
+        self._mat.flush()
+        meta = {"model": self.model_name, "dim": self.dim, "capacity": self.capacity,
+                "slots": list(self.slots.items())}
+        tmp = self.idx_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.idx_path)
+        # the index on disk no longer maps evicted keys: their rows can be reused
+        self._free.extend(self._stale)
+        self._stale.clear()
+
+    def _grow(self, needed: int):
+        new_cap = min(self.max_items, max(needed, 2 * self.capacity, 1024))
+        if new_cap <= self.capacity:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if self._mat is not None:
+            self._mat.flush()
+            del self._mat
+        with open(self.mat_path, "ab") as f:
+            f.truncate(new_cap * self.dim * 4)
+        self._mat = np.memmap(self.mat_path, dtype=np.float32, mode="r+",
+                              shape=(new_cap, self.dim))
+        self._free.extend(range(new_cap - 1, self.capacity - 1, -1))
+        self.capacity = new_cap
+
+    def _evict(self):
+        _, slot = self.slots.popitem(last=False)
+        self._stale.append(slot)
+        self.evictions += 1
+
+    # ---------- lookup ----------
+    def key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\x00{_norm(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str):
+        k = self.key(text)
+        slot = self.slots.get(k)
+        if slot is None:
+            return self._extra.get(k)
+        self.slots.move_to_end(k)
+        return np.array(self._mat[slot])
+
+    def put(self, text: str, vec):
+        self.put_many([text], np.asarray(vec, dtype=np.float32).reshape(1, -1))
+
+    def put_many(self, texts: List[str], vecs: np.ndarray):
+        vecs = np.asarray(vecs, dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(vecs.shape[1])
+        if vecs.shape[1] != self.dim:
+            raise ValueError(f"Embedding dim {vecs.shape[1]} != cache dim {self.dim}")
+        if self.readonly:
+            for text, vec in zip(texts, vecs):
+                self._extra[self.key(text)] = vec
+            return
+        new: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        for text, vec in zip(texts, vecs):
+            k = self.key(text)
+            if k in self.slots:
+                self.slots.move_to_end(k)
+                self._mat[self.slots[k]] = vec
+            else:
+                new.pop(k, None)
+                new[k] = vec
+        if not new:
+            return
+        # only the last max_items new keys would survive their own batch
+        items = list(new.items())[-self.max_items:]
+        short = len(items) - len(self._free)
+        if short > 0 and self.capacity < self.max_items:
+            self._grow(self.capacity + short)
+            short = len(items) - len(self._free)
+        if short > 0:
+            for _ in range(min(short - len(self._stale), len(self.slots))):
+                self._evict()
+            # persist the index without the evicted keys before their rows are overwritten
+            self.flush()
+        for k, vec in items:
+            slot = self._free.pop()
+            self._mat[slot] = vec
+            self.slots[k] = slot
+
+    def encode(self, texts: List[str], encoder: Callable[[List[str]], Any]) -> np.ndarray:
+        """
+        Return embeddings for texts (row-aligned), calling encoder(list) once
+        for the missing ones only.
+        """
+        hit_rows, hit_slots = [], []
+        extra_rows, extra_vecs = [], []
+        missing: Dict[str, List[int]] = {}
+        for i, t in enumerate(texts):
+            k = self.key(t)
+            slot = self.slots.get(k)
+            if slot is not None:
+                self.slots.move_to_end(k)
+                hit_rows.append(i); hit_slots.append(slot)
+            elif k in self._extra:
+                extra_rows.append(i); extra_vecs.append(self._extra[k])
+            else:
+                missing.setdefault(k, []).append(i)
+        self.hits += len(hit_rows) + len(extra_rows)
+        metrics.incr("emb_cache.hits", len(hit_rows) + len(extra_rows))
+
+        vecs = None
+        if missing:
+            todo = [texts[rows[0]] for rows in missing.values()]
+            self.misses += len(todo)
+            metrics.incr("emb_cache.misses", len(todo))
+            vecs = np.asarray(encoder(todo), dtype=np.float32)
+            if self.dim is None:
+                self.dim = int(vecs.shape[1])
+
+        out = np.empty((len(texts), self.dim or 0), dtype=np.float32)
+        if hit_rows:
+            # copy hits out before put_many can evict and overwrite their rows
+            out[hit_rows] = self._mat[hit_slots]
+        if extra_rows:
+            out[extra_rows] = np.vstack(extra_vecs)
+        if vecs is not None:
+            for rows, vec in zip(missing.values(), vecs):
+                out[rows] = vec
+            self.put_many(todo, vecs)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "size": len(self.slots), "hit_ratio": (self.hits / total) if total else 0.0}
+
+    def __len__(self):
+        return len(self.slots)
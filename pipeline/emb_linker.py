@@ -1,8 +1,60 @@
 # pipeline/emb_linker.py
-from typing import List, Dict, Any, Tuple
+import hashlib, threading
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Optional
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
+from .ann_index import load_or_build
+from . import metrics
+
+_MODELS: Dict[tuple, Any] = {}
+_MODELS_LOCK = threading.Lock()
+
+# "torch": float32 PyTorch; "int8": PyTorch with dynamically quantized Linear
+# layers; "onnx" / "onnx-int8": ONNX Runtime (sentence-transformers' onnx
+# backend, needs optimum + onnxruntime), the latter with the int8 export
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+ONNX_INT8_FILE = "onnx/model_qint8_avx2.onnx"
+
+def _load_model(model_name: str, backend: str, threads: Optional[int]):
+    from sentence_transformers import SentenceTransformer
+    if backend == "torch" and not threads:
+        return SentenceTransformer(model_name)
+    if backend in ("torch", "int8"):
+        import torch
+        if threads:
+            torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device="cpu")
+        if backend == "int8":
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+    import onnxruntime as ort
+    opts = ort.SessionOptions()
+    if threads:
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+    kwargs = {"provider": "CPUExecutionProvider", "session_options": opts}
+    if backend == "onnx-int8":
+        kwargs["file_name"] = ONNX_INT8_FILE
+    return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=kwargs)
+
+def get_model(model_name: str = "all-MiniLM-L6-v2", backend: str = "torch", threads: Optional[int] = None):
+    """
+    Process-wide SentenceTransformer, imported and loaded on first use; one
+    per (model, backend, threads). threads sets intra-op threads (torch
+    set_num_threads / the ONNX Runtime session).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    key = (model_name, backend, threads)
+    with _MODELS_LOCK:
+        model = _MODELS.get(key)
+        if model is None:
+            model = _MODELS[key] = _load_model(model_name, backend, threads)
+        return model
+
+def model_id(model_name: str, backend: str = "torch") -> str:
+    """Cache/index key of a model's embeddings: quantized backends give (slightly) different vectors."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
 
 def _flatten_vocab(vocab):
     texts, meta = [], []
@@ -12,42 +64,174 @@ def _flatten_vocab(vocab):
             meta.append(item)
     return texts, meta
 
+def _l2norm(emb) -> np.ndarray:
+    emb = np.asarray(emb, dtype=np.float32)
+    if emb.ndim == 1:
+        emb = emb.reshape(1, -1)
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return emb / norms
+
+def _unique(mentions: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(mentions))
+
 class OntologyLinker:
-    def __init__(self, classes, obj_props, data_props, model_name="all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, classes, obj_props, data_props, model_name="all-MiniLM-L6-v2", cache=None,
+                 index="exact", index_path: Optional[str] = None, index_params: Optional[dict] = None,
+                 model=None, lexical=None, backend: str = "torch", threads: Optional[int] = None,
+                 label_dtype: str = "float32"):
+        """
+        The model is loaded lazily (get_model, shared per process) unless
+        one is passed in; with a warm cache it may never load at all.
+        cache: optional EmbeddingCache (pipeline.emb_cache) for label and
+        mention embeddings; only cache misses reach the model.
+        index: "exact" (brute force) or "ivf" (approximate, pipeline.ann_index).
+        index_path: prefix for saved ANN indexes, e.g. the ontology path;
+        files are written as <prefix>.<cls|op|dp>.<index>.npz.
+        lexical: optional LexicalIndex (pipeline.lexical_index) tried before
+        the embeddings; only mentions it cannot answer are encoded. Every
+        candidate records its "tier" (exact | fuzzy | embedding), counted in
+        self.tiers.
+        backend / threads: CPU inference backend for get_model (BACKENDS);
+        the cache should be keyed by model_id(model_name, backend).
+        label_dtype: "float32", "float16" or "int8" (per-row scales) storage
+        of the label matrices; the float32 rows are dropped after indexing.
+        """
+        self._model = model
+        self.model_name = model_name
+        self.backend, self.threads = backend, threads
+        self.label_dtype = label_dtype
+        self.cache = cache
+        self.lexical = lexical
+        self.tiers = Counter()
+        with metrics.span("link.build", index=index):
+            self._build(classes, obj_props, data_props, model_name, index, index_path, index_params)
 
+    def _build(self, classes, obj_props, data_props, model_name, index, index_path, index_params):
         self.cls_texts, self.cls_meta  = _flatten_vocab(classes)
         self.op_texts,  self.op_meta   = _flatten_vocab(obj_props)
         self.dp_texts,  self.dp_meta   = _flatten_vocab(data_props)
 
-        self.cls_emb = self.model.encode(self.cls_texts, show_progress_bar=False)
-        self.op_emb  = self.model.encode(self.op_texts,  show_progress_bar=False)
-        self.dp_emb  = self.model.encode(self.dp_texts,  show_progress_bar=False)
+        # unit-normalized once, so cosine similarity is a plain dot product
+        self.cls_emb = self._encode(self.cls_texts)
+        self.op_emb  = self._encode(self.op_texts)
+        self.dp_emb  = self._encode(self.dp_texts)
 
-    def link_entity(self, mention: str, top_k=1, threshold=0.55) -> List[Dict[str,Any]]:
-        v = self.model.encode([mention])
-        sims = cosine_similarity(v, self.cls_emb)[0]
-        idx = sims.argsort()[::-1][:top_k]
-        out = []
-        for i in idx:
-            if sims[i] >= threshold:
-                out.append({"score": float(sims[i]), **self.cls_meta[i]})
+        params = index_params or {}
+        mid = model_id(model_name, self.backend)
+        def build(name, texts, emb):
+            path = f"{index_path}.{name}.{index}.npz" if index_path else None
+            key = hashlib.sha1("\n".join([mid, *texts]).encode("utf-8")).hexdigest()
+            return load_or_build(emb, kind=index, path=path, key=key, dtype=self.label_dtype, **params)
+        self.cls_index = build("cls", self.cls_texts, self.cls_emb)
+        self.op_index  = build("op",  self.op_texts,  self.op_emb)
+        self.dp_index  = build("dp",  self.dp_texts,  self.dp_emb)
+        # the indexes hold the (possibly quantized) rows; don't keep a float32 copy
+        self.cls_emb, self.op_emb, self.dp_emb = self.cls_index.emb, self.op_index.emb, self.dp_index.emb
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_model(self.model_name, self.backend, self.threads)
+        return self._model
+
+    def _dim(self) -> int:
+        if self.cache is not None and self.cache.dim:
+            return self.cache.dim
+        return self.model.get_sentence_embedding_dimension() or 0
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self._dim()), dtype=np.float32)
+        metrics.incr("embed.texts", len(texts))
+        with metrics.span("embed.encode", n=len(texts)):
+            return self._encode_all(texts)
+
+    def _encode_all(self, texts: List[str]) -> np.ndarray:
+        if self.cache is not None:
+            return _l2norm(self.cache.encode(texts, self._model_encode))
+        return _l2norm(self._model_encode(texts))
+
+    def _model_encode(self, texts: List[str]):
+        return self.model.encode(texts, show_progress_bar=False)
+
+    def _lexical(self, uniq: List[str], kind: str, top_k: int, threshold: float):
+        """(answered {mention: candidates}, residue for the embeddings)."""
+        if self.lexical is None:
+            return {}, uniq
+        out, rest = {}, []
+        for m in uniq:
+            cand = [c for c in self.lexical.lookup(m, kind, top_k) if c["score"] >= threshold]
+            if cand:
+                out[m] = cand
+                self.tiers[cand[0]["tier"]] += 1
+                metrics.incr(f"link.tier.{cand[0]['tier']}")
+            else:
+                rest.append(m)
+        return out, rest
+
+    def _count_embedded(self, n: int):
+        self.tiers["embedding"] += n
+        metrics.incr("link.tier.embedding", n)
+
+    def link_entities(self, mentions: Iterable[str], top_k=1, threshold=0.55) -> Dict[str, List[Dict[str,Any]]]:
+        """
+        Batch version of link_entity: returns {mention: [candidates]}.
+        Mentions are deduplicated; those the lexical tiers cannot answer are
+        encoded in a single call.
+        """
+        uniq = _unique(mentions)
+        if not uniq:
+            return {}
+        out, rest = self._lexical(uniq, "cls", top_k, threshold)
+        if not rest:
+            return out
+        self._count_embedded(len(rest))
+        v = self._encode(rest)
+        with metrics.span("link.search", kind="cls", n=len(rest)):
+            idx, scores = self.cls_index.search(v, top_k)
+        for row, m in enumerate(rest):
+            out[m] = [{"score": float(s), "tier": "embedding", **self.cls_meta[i]}
+                      for i, s in zip(idx[row], scores[row]) if s >= threshold]
         return out
 
+    def link_properties(self, mentions: Iterable[str], top_k=1, threshold=0.55) -> Dict[str, List[Dict[str,Any]]]:
+        """
+        Batch version of link_property: returns {mention: [candidates]} with
+        object and data properties ranked together by score.
+        """
+        uniq = _unique(mentions)
+        if not uniq:
+            return {}
+        out, rest = self._lexical(uniq, "prop", top_k, threshold)
+        if not rest:
+            return out
+        self._count_embedded(len(rest))
+        v = self._encode(rest)
+        with metrics.span("link.search", kind="prop", n=len(rest)):
+            i1, s1 = self.op_index.search(v, top_k)
+            i2, s2 = self.dp_index.search(v, top_k)
+        for row, m in enumerate(rest):
+            cand = []
+            for i, s in zip(i1[row], s1[row]):
+                if s >= threshold:
+                    cand.append({"score": float(s), "tier": "embedding", "kind":"object", **self.op_meta[i]})
+            for i, s in zip(i2[row], s2[row]):
+                if s >= threshold:
+                    cand.append({"score": float(s), "tier": "embedding", "kind":"data", **self.dp_meta[i]})
+            cand.sort(key=lambda x: -x["score"])
+            out[m] = cand[:top_k]
+        return out
+
+    def link_entity(self, mention: str, top_k=1, threshold=0.55) -> List[Dict[str,Any]]:
+        return self.link_entities([mention], top_k=top_k, threshold=threshold)[mention]
+
     def link_property(self, mention: str, top_k=1, threshold=0.55) -> List[Dict[str,Any]]:
-        v = self.model.encode([mention])
-        sims_op = cosine_similarity(v, self.op_emb)[0]
-        sims_dp = cosine_similarity(v, self.dp_emb)[0]
-
-        i1 = sims_op.argsort()[::-1][:top_k]
-        i2 = sims_dp.argsort()[::-1][:top_k]
-
-        cand = []
-        for i in i1:
-            if sims_op[i] >= threshold:
-                cand.append({"score": float(sims_op[i]), "kind":"object", **self.op_meta[i]})
-        for i in i2:
-            if sims_dp[i] >= threshold:
-                cand.append({"score": float(sims_dp[i]), "kind":"data", **self.dp_meta[i]})
-        cand.sort(key=lambda x: -x["score"])
-        return cand[:top_k]
+        return self.link_properties([mention], top_k=top_k, threshold=threshold)[mention]
+
+    def index_recall(self, mentions: Iterable[str], k=10) -> Dict[str, float]:
+        """Recall@k of each label index against exact search, for sample mentions."""
+        v = self._encode(_unique(mentions))
+        return {"cls": self.cls_index.recall(v, k),
+                "op":  self.op_index.recall(v, k),
+                "dp":  self.dp_index.recall(v, k)}
@@ -0,0 +1,283 @@
+# pipeline/fusion.py
+# Step 6 of the README: merge rule and LLM triples, deduplicate, score and
+# resolve conflicts. Candidates are interned to integer ids and kept in
+# flat typed columns; dedupe and conflict resolution are numpy sorts over
+# those columns, so millions of candidates cost a few arrays, not a dict each.
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+
+ACCEPTED, ALTERNATE, LOW = 0, 1, 2
+STATUS = ("accepted", "alternate", "low")
+
+def _entity_key(name: str) -> str:
+    return "_".join(str(name).split()).casefold()
+
+def _literal_key(value: Any):
+    if isinstance(value, bool):
+        return ("s", str(value).lower())
+    try:
+        return ("n", float(value))  # 12, 12.0 and "12" are one value
+    except (TypeError, ValueError):
+        return ("s", " ".join(str(value).split()))
+
+def rules_as_triples(facts: Iterable[Tuple[str, str, Any]], datas: Iterable[Tuple[str, str, Any]],
+                     confidence: float = 0.95) -> List[Dict[str, Any]]:
+    """
+    extract_with_rules output as fusion candidates. A fact whose predicate
+    the rules also emit as a data property is taken as a literal, so its
+    string copy of the value merges with the typed one.
+    """
+    datas = list(datas)
+    data_preds = {dp for _, dp, _ in datas}
+    out = [{"subject": s, "predicate": p, "object": o, "object_is_literal": p in data_preds,
+            "confidence": confidence, "source": "rule"} for s, p, o in facts]
+    out += [{"subject": s, "predicate": dp, "object": v, "object_is_literal": True,
+             "confidence": confidence, "source": "rule"} for s, dp, v in datas]
+    return out
+
+class _Interner:
+    __slots__ = ("ids", "values")
+
+    def __init__(self):
+        self.ids: Dict[Any, int] = {}
+        self.values: List[Any] = []  # first surface form seen per id
+
+    def __call__(self, key, value) -> int:
+        i = self.ids.get(key)
+        if i is None:
+            i = self.ids[key] = len(self.values)
+            self.values.append(value)
+        return i
+
+class TripleFusion:
+    """
+    Accumulates candidate triples from any number of sources, then
+    resolve() merges them:
+
+    - identical (subject, predicate, object) candidates collapse into one,
+      with combined confidence 1 - prod(1 - c_i), the sources that agreed,
+      the support count and the earliest chunk/offset as provenance;
+    - for functional predicates (data properties by default, rdf:type,
+      and any name in functional) only the best object per subject is
+      accepted; the others are kept as alternates;
+    - candidates below min_confidence are kept with status "low".
+
+    Entities are matched case- and whitespace-insensitively; rdf:type
+    classes by exact name; literals by value (numbers numerically).
+    """
+
+    def __init__(self, functional: Iterable[str] = (), data_functional: bool = True,
+                 type_functional: bool = True, llm_confidence: float = 0.7,
+                 rule_confidence: float = 0.95):
+        self.functional = set(functional)
+        self.data_functional = data_functional
+        self.type_functional = type_functional
+        self.llm_confidence = llm_confidence
+        self.rule_confidence = rule_confidence
+        # entities ("e", key), classes ("c", name) and literals ("l", key); rdf:type
+        # objects are classes, kept apart so "Hydrant" never merges with instance "hydrant"
+        self.terms = _Interner()
+        self._ent_ids: Dict[str, int] = {}  # surface form → id, skips re-normalizing repeats
+        self.preds = _Interner()
+        self.pred_kind: List[str] = []
+        self.sources: Dict[str, int] = {}
+        self._s, self._p, self._o = array("i"), array("i"), array("i")
+        self._conf = array("f")
+        self._src = array("B")
+        self._chunk, self._start, self._end = array("i"), array("i"), array("i")
+
+    def __len__(self):
+        return len(self._s)
+
+    # ---------- input ----------
+    def _source(self, name: str) -> int:
+        i = self.sources.get(name)
+        if i is None:
+            if len(self.sources) == 8:
+                raise ValueError("at most 8 distinct sources")
+            i = self.sources[name] = len(self.sources)
+        return i
+
+    def _pred(self, name: str, kind: Optional[str]) -> int:
+        i = self.preds(name, name)
+        if i == len(self.pred_kind):
+            self.pred_kind.append(kind or "object")
+        elif kind == "data":
+            self.pred_kind[i] = "data"
+        return i
+
+    def _entity(self, name: str) -> int:
+        i = self._ent_ids.get(name)
+        if i is None:
+            i = self._ent_ids[name] = self.terms(("e", _entity_key(name)), name)
+        return i
+
+    def add(self, subject: str, predicate: str, obj: Any, literal: bool = False,
+            confidence: Optional[float] = None, source: str = "llm", chunk: int = -1,
+            offset: Optional[Iterable[int]] = None, kind: Optional[str] = None):
+        """One candidate. kind: "object" | "data" (defaults from literal)."""
+        if subject is None or predicate is None or obj is None:
+            return
+        s = self._entity(subject)
+        if literal:
+            o = self.terms(("l", _literal_key(obj)), obj)
+        elif predicate == RDF_TYPE:
+            o = self.terms(("c", str(obj)), obj)
+        else:
+            o = self._entity(obj)
+        p = self._pred(predicate, kind or ("data" if literal else "object"))
+        try:
+            confidence = float(confidence)
+        except (TypeError, ValueError):  # missing, or an LLM's "high"
+            confidence = self.rule_confidence if source == "rule" else self.llm_confidence
+        start, end = offset if offset else (-1, -1)
+        self._s.append(s); self._p.append(p); self._o.append(o)
+        self._conf.append(min(1.0, max(0.0, confidence)))
+        self._src.append(1 << self._source(source))
+        self._chunk.append(-1 if chunk is None else int(chunk))
+        self._start.append(int(start)); self._end.append(int(end))
+
+    def add_raw(self, triples: Iterable[Dict[str, Any]], source: Optional[str] = None):
+        """Flat {"subject","predicate","object","object_is_literal",...} dicts (e.g. rules_as_triples)."""
+        for t in triples:
+            self.add(t.get("subject"), t.get("predicate"), t.get("object"),
+                     literal=bool(t.get("object_is_literal")), confidence=t.get("confidence"),
+                     source=source or t.get("source", "llm"), chunk=t.get("chunk", -1),
+                     offset=t.get("offset"))
+
+    def add_linked(self, linked: Iterable[Dict[str, Any]], source: str = "llm"):
+        """
+        link_triples output ({"subject": {"name","class"}, "predicate": {"name","kind"},
+        "object" | "object_literal"}). Linked classes become rdf:type candidates.
+        """
+        for t in linked:
+            subj, pred = t["subject"], t["predicate"]
+            conf = t.get("confidence")
+            prov = {"source": source, "chunk": t.get("chunk", -1), "offset": t.get("offset")}
+            if "object_literal" in t:
+                self.add(subj["name"], pred["name"], t["object_literal"].get("value"), literal=True,
+                         confidence=conf, kind="data", **prov)
+            else:
+                obj = t["object"]
+                self.add(subj["name"], pred["name"], obj["name"], confidence=conf,
+                         kind=pred.get("kind"), **prov)
+                if obj.get("class"):
+                    self.add(obj["name"], RDF_TYPE, obj["class"], confidence=obj.get("score", conf), **prov)
+            if subj.get("class"):
+                self.add(subj["name"], RDF_TYPE, subj["class"], confidence=subj.get("score", conf), **prov)
+
+    # ---------- resolution ----------
+    def _functional_mask(self) -> np.ndarray:
+        mask = np.zeros(len(self.preds.values), dtype=bool)
+        for i, (name, kind) in enumerate(zip(self.preds.values, self.pred_kind)):
+            mask[i] = (name in self.functional
+                       or (kind == "data" and self.data_functional)
+                       or (name == RDF_TYPE and self.type_functional))
+        return mask
+
+    def resolve(self, min_confidence: float = 0.0) -> "FusionResult":
+        n = len(self._s)
+        s = np.frombuffer(self._s, dtype=np.int32)
+        p = np.frombuffer(self._p, dtype=np.int32)
+        o = np.frombuffer(self._o, dtype=np.int32)
+        start = np.frombuffer(self._start, dtype=np.int32)
+        if n == 0:
+            return FusionResult(self, *(np.zeros(0, dtype=t) for t in
+                                        ("i4", "i4", "i4", "f4", "u1", "i4", "i4", "i4", "i4", "i1")), 0)
+
+        # 1) dedupe: sort by (s, p, o, offset) and collapse runs
+        order = np.lexsort((start, o, p, s))
+        ss, pp, oo = s[order], p[order], o[order]
+        new = np.ones(n, dtype=bool)
+        new[1:] = (ss[1:] != ss[:-1]) | (pp[1:] != pp[:-1]) | (oo[1:] != oo[:-1])
+        starts = np.flatnonzero(new)
+        conf = np.frombuffer(self._conf, dtype=np.float32)[order]
+        # noisy-or; clipped so a single 1.0 does not turn into log(0)
+        comb = (1.0 - np.exp(np.add.reduceat(np.log1p(-np.minimum(conf, 0.999999)), starts))).astype(np.float32)
+        src = np.bitwise_or.reduceat(np.frombuffer(self._src, dtype=np.uint8)[order], starts)
+        support = np.diff(np.append(starts, n)).astype(np.int32)
+        first = order[starts]
+        gs, gp, go = s[first], p[first], o[first]
+
+        # 2) conflicts: best object per (s, p) for functional predicates
+        status = np.zeros(len(starts), dtype=np.int8)
+        status[comb < min_confidence] = LOW
+        idx = np.flatnonzero(self._functional_mask()[gp] & (status == ACCEPTED))
+        if len(idx):
+            k = idx[np.lexsort((-support[idx], -comb[idx], gp[idx], gs[idx]))]
+            lead = np.ones(len(k), dtype=bool)
+            lead[1:] = (gs[k][1:] != gs[k][:-1]) | (gp[k][1:] != gp[k][:-1])
+            status[k[~lead]] = ALTERNATE
+
+        return FusionResult(self, gs, gp, go, comb, src, support,
+                            np.frombuffer(self._chunk, dtype=np.int32)[first], start[first],
+                            np.frombuffer(self._end, dtype=np.int32)[first], status, n)
+
+class FusionResult:
+    """Columnar fused triples; one row per distinct (subject, predicate, object)."""
+
+    def __init__(self, fusion: TripleFusion, s, p, o, confidence, sources, support,
+                 chunk, start, end, status, candidates: int):
+        self.terms, self.preds = fusion.terms.values, fusion.preds.values
+        self.pred_kind = fusion.pred_kind
+        self.source_names = sorted(fusion.sources, key=fusion.sources.get)
+        self._lit = np.array([k[0] == "l" for k in fusion.terms.ids], dtype=bool)
+        self.s, self.p, self.o = s, p, o
+        self.confidence, self.sources, self.support = confidence, sources, support
+        self.chunk, self.start, self.end, self.status = chunk, start, end, status
+        self.stats = {"candidates": candidates, "fused": len(s),
+                      "duplicates": candidates - len(s),
+                      **{name: int((status == i).sum()) for i, name in enumerate(STATUS)}}
+        for bit, name in enumerate(self.source_names):
+            self.stats[f"from_{name}"] = int(((sources >> bit) & 1).sum())
+        if len(self.source_names) > 1:
+            self.stats["agreed"] = int((sources & (sources - 1) != 0).sum())  # 2+ sources
+
+    def __len__(self):
+        return self.stats["accepted"]
+
+    def _rows(self, status: Optional[str]) -> np.ndarray:
+        if status is None:
+            return np.arange(len(self.s))
+        return np.flatnonzero(self.status == STATUS.index(status))
+
+    def triples(self, status: Optional[str] = "accepted") -> List[Tuple[str, str, Any, str]]:
+        """(subject, predicate, object, ptype) tuples for write_abox / write_abox_stream."""
+        out = []
+        for r in self._rows(status):
+            o = self.o[r]
+            out.append((self.terms[self.s[r]], self.preds[self.p[r]], self.terms[o],
+                        "data" if self._lit[o] else "object"))
+        return out
+
+    def records(self, status: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Rows with confidence and provenance, e.g. for an extraction report."""
+        for r in self._rows(status):
+            bits = int(self.sources[r])
+            rec = {"subject": self.terms[self.s[r]], "predicate": self.preds[self.p[r]],
+                   "object": self.terms[self.o[r]], "object_is_literal": bool(self._lit[self.o[r]]),
+                   "confidence": round(float(self.confidence[r]), 4), "support": int(self.support[r]),
+                   "sources": [n for b, n in enumerate(self.source_names) if bits >> b & 1],
+                   "status": STATUS[self.status[r]]}
+            if self.chunk[r] >= 0:
+                rec["chunk"] = int(self.chunk[r])
+            if self.start[r] >= 0:
+                rec["offset"] = [int(self.start[r]), int(self.end[r])]
+            yield rec
+
+    def report(self):
+        st = self.stats
+        src = ", ".join(f"{k[5:]}={v}" for k, v in st.items() if k.startswith("from_"))
+        print(f"🔗 Fusion: {st['candidates']} candidates → {st['fused']} distinct "
+              f"(accepted={st['accepted']}, alternates={st['alternate']}, low={st['low']}; {src})")
+
+def fuse(linked: Iterable[Dict[str, Any]] = (), rule_triples: Iterable[Dict[str, Any]] = (),
+         min_confidence: float = 0.0, **kw) -> FusionResult:
+    """One-shot: link_triples output + rules_as_triples output → FusionResult."""
+    f = TripleFusion(**kw)
+    f.add_raw(rule_triples, source="rule")
+    f.add_linked(linked)
+    return f.resolve(min_confidence=min_confidence)
@@ -0,0 +1,179 @@
+# pipeline/gazetteer_matcher.py
+import re, json, unicodedata
+from collections import deque
+from typing import List, Dict, Any, Iterable, Tuple
+from .gazetteer import _norm
+
+# words and single punctuation marks; matching runs over these tokens, so
+# every hit starts and ends on a word boundary
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+def _fold(tok: str) -> str:
+    return unicodedata.normalize("NFKC", tok.lower())
+
+class GazetteerMatcher:
+    """
+    Aho-Corasick automaton over normalized ontology labels (names,
+    rdfs:label, SKOS pref/altLabel). find() scans a document once and
+    returns leftmost-longest, non-overlapping, whole-word matches with the
+    class/property IRIs behind each label. Case, Unicode compatibility
+    forms and whitespace runs are folded the same way as gazetteer._norm.
+
+    Transitions are on word/punctuation tokens rather than characters;
+    a token-level hit is accepted only if the span's normalized text equals
+    the label ("high-rise" does not match "high - rise").
+    """
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[int] = [-1]        # pattern ending exactly at this state
+        self.dict_link: List[int] = [-1]  # nearest fail-ancestor with an output
+        self.patterns: List[Dict[str, Any]] = []
+        self._by_label: Dict[str, int] = {}
+        self.maxlen = 0
+        self._built = False
+
+    # ---------- construction ----------
+    def add(self, label: str, kind: str, name: str, iri: str):
+        key = _norm(label)
+        if not key:
+            return
+        pid = self._by_label.get(key)
+        if pid is None:
+            pid = self._by_label[key] = len(self.patterns)
+            self.patterns.append({"label": key, "entries": []})
+            state = 0
+            for c in _TOKEN.findall(key):
+                nxt = self.goto[state].get(c)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][c] = nxt
+                    self.goto.append({}); self.fail.append(0)
+                    self.out.append(-1); self.dict_link.append(-1)
+                state = nxt
+            self.out[state] = pid
+            self.maxlen = max(self.maxlen, len(_TOKEN.findall(key)))
+            self._built = False
+        entry = {"kind": kind, "name": name, "iri": iri}
+        if entry not in self.patterns[pid]["entries"]:
+            self.patterns[pid]["entries"].append(entry)
+
+    def build(self) -> "GazetteerMatcher":
+        queue = deque(self.goto[0].values())
+        for s in queue:
+            self.fail[s] = 0
+            self.dict_link[s] = -1
+        while queue:
+            r = queue.popleft()
+            for c, s in self.goto[r].items():
+                queue.append(s)
+                f = self.fail[r]
+                while f and c not in self.goto[f]:
+                    f = self.fail[f]
+                nxt = self.goto[f].get(c, 0)
+                self.fail[s] = nxt if nxt != s else 0
+                fs = self.fail[s]
+                self.dict_link[s] = fs if self.out[fs] >= 0 else self.dict_link[fs]
+        self._built = True
+        return self
+
+    @classmethod
+    def from_vocab(cls, classes, obj_props, data_props) -> "GazetteerMatcher":
+        """From ontology_vocab.extract_vocab output (labels include the entity name)."""
+        m = cls()
+        for kind, vocab in (("class", classes), ("object", obj_props), ("data", data_props)):
+            for item in vocab:
+                for lab in item["labels"]:
+                    m.add(lab, kind, item["name"], item["iri"])
+        return m.build()
+
+    @classmethod
+    def from_gazetteer(cls, label_to_class: Dict[str, str], label_to_prop: Dict[str, str],
+                       base_iri: str) -> "GazetteerMatcher":
+        """From gazetteer.build_gazetteer maps; IRIs are base_iri + name."""
+        m = cls()
+        for lab, name in label_to_class.items():
+            m.add(lab, "class", name, base_iri + name)
+        for lab, name in label_to_prop.items():
+            m.add(lab, "property", name, base_iri + name)
+        return m.build()
+
+    # ---------- matching ----------
+    def _candidates(self, text: str) -> List[Tuple[int, int, int]]:
+        """All label occurrences as (start, end, pattern id)."""
+        if not self._built:
+            self.build()
+        goto, fail, out, dlink = self.goto, self.fail, self.out, self.dict_link
+        patterns = self.patterns
+        ntok = [len(_TOKEN.findall(p["label"])) for p in patterns]
+        ascii_only = text.isascii()
+        src = text.lower() if ascii_only else text
+        starts = deque(maxlen=max(self.maxlen, 1))  # start offsets of recent tokens
+        cands = []
+        state = 0
+        for m in _TOKEN.finditer(src):
+            tok = m.group() if ascii_only else _fold(m.group())
+            starts.append(m.start())
+            nxt = goto[state].get(tok)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(tok)
+            state = nxt or 0
+            s = state if out[state] >= 0 else dlink[state]
+            while s > 0:
+                pid = out[s]
+                start, end = starts[-ntok[pid]], m.end()
+                # single-token labels need no spacing check
+                if ntok[pid] == 1 or " ".join(_fold(src[start:end]).split()) == patterns[pid]["label"]:
+                    cands.append((start, end, pid))
+                s = dlink[s]
+        return cands
+
+    def find(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Spans [{"start","end","text","label","entries":[{kind,name,iri}]}]
+        with offsets into text.
+        """
+        spans = []
+        last_end = -1
+        # leftmost-longest: by start, then longest first
+        for start, end, pid in sorted(self._candidates(text), key=lambda x: (x[0], -x[1])):
+            if start < last_end:
+                continue
+            p = self.patterns[pid]
+            spans.append({"start": start, "end": end, "text": text[start:end],
+                          "label": p["label"], "entries": p["entries"]})
+            last_end = end
+        return spans
+
+    def find_iter(self, blocks: Iterable[str]):
+        """find() over a stream of text blocks; yields (block_no, span)."""
+        for k, block in enumerate(blocks):
+            for span in self.find(block):
+                yield k, span
+
+    # ---------- persistence ----------
+    def save(self, path: str):
+        if not self._built:
+            self.build()
+        data = {"goto": self.goto, "fail": self.fail, "out": self.out,
+                "dict_link": self.dict_link, "patterns": self.patterns}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "GazetteerMatcher":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        m = cls()
+        m.goto, m.fail, m.out = data["goto"], data["fail"], data["out"]
+        m.dict_link, m.patterns = data["dict_link"], data["patterns"]
+        m._by_label = {p["label"]: i for i, p in enumerate(m.patterns)}
+        m.maxlen = max((len(_TOKEN.findall(p["label"])) for p in m.patterns), default=0)
+        m._built = True
+        return m
+
+def build_matcher(onto_path: str) -> GazetteerMatcher:
+    from .vocab_snapshot import load_snapshot
+    return GazetteerMatcher.from_vocab(*load_snapshot(onto_path).vocab())
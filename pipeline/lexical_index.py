@@ -0,0 +1,234 @@
+# pipeline/lexical_index.py
+import re, itertools
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .gazetteer import _norm
+
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_SEP = re.compile(r"[_\-./]+")
+# property names carry verb prefixes the text rarely repeats ("hasWeight" ↔ "weight")
+_PROP_PREFIXES = ("has ", "is ", "have ")
+
+def norm_label(s: str) -> str:
+    """gazetteer._norm after splitting camelCase and _-./ separators: "tunnelLength" → "tunnel length"."""
+    return _norm(_SEP.sub(" ", _CAMEL.sub(" ", str(s))))
+
+def _strip_prefix(key: str) -> str:
+    for pre in _PROP_PREFIXES:
+        if key.startswith(pre) and len(key) > len(pre) + 2:
+            return key[len(pre):]
+    return key
+
+def _deletes(s: str, depth: int) -> set:
+    """Every string reachable from s by deleting up to depth characters (SymSpell)."""
+    out, frontier = {s}, {s}
+    for _ in range(depth):
+        nxt = set()
+        for w in frontier:
+            if len(w) > 1:
+                nxt.update(w[:i] + w[i + 1:] for i in range(len(w)))
+        out |= nxt
+        frontier = nxt
+    return out
+
+def _distance(a: str, b: str, limit: int) -> int:
+    """Optimal-string-alignment distance, or limit + 1 once it exceeds limit (banded)."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+    big = limit + 1
+    n = len(b)
+    prev2, prev = None, list(range(n + 1))
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        lo, hi = max(1, i - limit), min(n, i + limit)
+        cur = [big] * (n + 1)
+        cur[0] = i
+        best = big if lo > 1 else i
+        for j in range(lo, hi + 1):
+            cb = b[j - 1]
+            d = prev[j - 1] if ca == cb else prev[j - 1] + 1
+            if prev[j] + 1 < d:
+                d = prev[j] + 1
+            if cur[j - 1] + 1 < d:
+                d = cur[j - 1] + 1
+            if prev2 is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb and prev2[j - 2] + 1 < d:
+                d = prev2[j - 2] + 1
+            cur[j] = d
+            if d < best:
+                best = d
+        if best > limit:
+            return big
+        prev2, prev = prev, cur
+    return min(prev[n], big)
+
+def _trigrams(s: str) -> set:
+    s = f"  {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+class _Tier:
+    """
+    Exact hash, word-level SymSpell and trigram lookups over one set of
+    normalized labels. Spelling is corrected per word against the label
+    vocabulary (short words are left alone), then the corrected phrase is
+    looked up exactly; labels out of edit range fall back to trigram Dice.
+    """
+
+    def __init__(self, max_edit: int, trigram_sim: float):
+        self.max_edit, self.trigram_sim = max_edit, trigram_sim
+        self.keys: List[str] = []
+        self.entries: List[List[Dict[str, Any]]] = []
+        self.exact: Dict[str, int] = {}
+        self.words: set = set()
+        self.deletes: Dict[str, List[str]] = defaultdict(list)
+        self.grams: Dict[str, List[int]] = defaultdict(list)
+        self.ngrams: List[int] = []
+        self._frozen = None  # trigram postings as arrays, built on first use
+        self._fixes: Dict[str, List[Tuple[str, int]]] = {}
+
+    def _edits(self, word: str) -> int:
+        # no corrections for numbers and short words, where one edit is another word
+        if len(word) < 4 or word.isdigit():
+            return 0
+        return min(self.max_edit, 1 if len(word) < 8 else 2)
+
+    def add(self, key: str, entry: Dict[str, Any]):
+        if not key:
+            return
+        k = self.exact.get(key)
+        if k is None:
+            k = self.exact[key] = len(self.keys)
+            self.keys.append(key)
+            self.entries.append([])
+            for w in key.split():
+                if w not in self.words:
+                    self.words.add(w)
+                    for d in _deletes(w, self._edits(w)):
+                        self.deletes[d].append(w)
+            grams = _trigrams(key)
+            for g in grams:
+                self.grams[g].append(k)
+            self.ngrams.append(len(grams))
+            self._frozen = None
+            self._fixes.clear()
+        if entry not in self.entries[k]:
+            self.entries[k].append(entry)
+
+    def _correct(self, word: str) -> List[Tuple[str, int]]:
+        """Closest vocabulary words to word (ties kept), with their distance."""
+        if word in self.words:
+            return [(word, 0)]
+        fixes = self._fixes.get(word)
+        if fixes is not None:
+            return fixes
+        limit = self._edits(word)
+        best, found, seen = limit + 1, [], set()
+        for d in _deletes(word, limit) if limit else ():
+            for w in self.deletes.get(d, ()):
+                if w in seen:
+                    continue
+                seen.add(w)
+                dist = _distance(word, w, limit)
+                if dist < best:
+                    best, found = dist, [w]
+                elif dist == best:
+                    found.append(w)
+        fixes = self._fixes[word] = [(w, best) for w in found] if best <= limit else []
+        return fixes
+
+    def fuzzy(self, key: str, min_sim: float) -> Tuple[Optional[int], float]:
+        """Best label after per-word correction, else best trigram Dice match; (id, similarity)."""
+        options = [self._correct(w)[:4] for w in key.split()]
+        if options and all(options):
+            best, best_dist = None, None
+            for combo in itertools.islice(itertools.product(*options), 64):
+                k = self.exact.get(" ".join(w for w, _ in combo))
+                dist = sum(d for _, d in combo)
+                if k is not None and (best_dist is None or dist < best_dist):
+                    best, best_dist = k, dist
+            if best is not None:
+                sim = 1.0 - best_dist / max(len(key), len(self.keys[best]))
+                if sim >= min_sim:
+                    return best, sim
+        return self._trigram(key)
+
+    def _trigram(self, key: str) -> Tuple[Optional[int], float]:
+        # merged/split words and reorderings that are out of word-level reach
+        if self._frozen is None:
+            self._frozen = ({g: np.asarray(ids, dtype=np.int32) for g, ids in self.grams.items()},
+                            np.asarray(self.ngrams, dtype=np.float32))
+        postings, sizes = self._frozen
+        grams = _trigrams(key)
+        hits = [postings[g] for g in grams if g in postings]
+        if not hits:
+            return None, 0.0
+        shared = np.bincount(np.concatenate(hits), minlength=len(sizes))
+        dice = 2.0 * shared / (len(grams) + sizes)
+        k = int(np.argmax(dice))
+        sim = float(dice[k])
+        return (k, sim) if sim >= self.trigram_sim else (None, 0.0)
+
+class LexicalIndex:
+    """
+    Lexical tiers in front of the embedding linker: an exact hash on
+    normalized labels (gazetteer._norm plus camelCase/underscore splitting,
+    so "tunnelLength", "tunnel_length" and "Tunnel length" are one key), then
+    per-word SymSpell correction (delete index plus edit-distance check)
+    followed by the exact hash, then character trigram Dice. Only mentions
+    no tier answers need the
+    sentence encoder. Candidates have the OntologyLinker shape plus
+    "tier" ("exact" | "fuzzy"); score is 1.0 for exact hits and the string
+    similarity for fuzzy ones.
+    """
+
+    def __init__(self, classes, obj_props, data_props, fuzzy: bool = True, max_edit: int = 2,
+                 min_sim: float = 0.8, trigram_sim: float = 0.85):
+        self.fuzzy_on, self.min_sim = fuzzy, min_sim
+        self.cls = _Tier(max_edit, trigram_sim)
+        self.prop = _Tier(max_edit, trigram_sim)
+        for item in classes:
+            for lab in item["labels"]:
+                self.cls.add(norm_label(lab), dict(item))
+        for kind, vocab in (("object", obj_props), ("data", data_props)):
+            for item in vocab:
+                entry = {"kind": kind, **item}
+                for lab in item["labels"]:
+                    key = norm_label(lab)
+                    self.prop.add(key, entry)
+                    self.prop.add(_strip_prefix(key), entry)
+        self._memo: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+
+    @classmethod
+    def from_snapshot(cls, onto_path: str, **kw) -> "LexicalIndex":
+        from .vocab_snapshot import load_snapshot
+        return cls(*load_snapshot(onto_path).vocab(), **kw)
+
+    def _lookup(self, tier: _Tier, mention: str, prop: bool) -> List[Dict[str, Any]]:
+        key = norm_label(mention)
+        if not key:
+            return []
+        keys = [key, _strip_prefix(key)] if prop else [key]
+        for k in keys:
+            i = tier.exact.get(k)
+            if i is not None:
+                return [{"score": 1.0, "tier": "exact", **e} for e in tier.entries[i]]
+        if not self.fuzzy_on:
+            return []
+        i, sim = tier.fuzzy(keys[-1], self.min_sim)
+        if i is None:
+            return []
+        return [{"score": sim, "tier": "fuzzy", **e} for e in tier.entries[i]]
+
+    def lookup(self, mention: str, kind: str = "cls", top_k: int = 1) -> List[Dict[str, Any]]:
+        """Candidates for one mention; kind "cls" or "prop". [] = leave it to the embeddings."""
+        memo_key = (kind, mention)
+        hit = self._memo.get(memo_key)
+        if hit is None:
+            tier, prop = (self.prop, True) if kind == "prop" else (self.cls, False)
+            hit = self._lookup(tier, mention, prop)
+            if len(self._memo) > 200_000:
+                self._memo.clear()
+            self._memo[memo_key] = hit
+        return hit[:top_k]
@@ -1,13 +1,16 @@
 # pipeline/linker.py
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 from .gazetteer import build_gazetteer
 
-def normalize_entities(facts: List[tuple], datas: List[tuple], onto_path: str) -> Tuple[List[tuple], List[tuple]]:
+def normalize_entities(facts: List[tuple], datas: List[tuple], onto_path: Optional[str] = None,
+                       gazetteer: Optional[Tuple[dict, dict]] = None) -> Tuple[List[tuple], List[tuple]]:
     """
     Map surface labels (predicates & class-like objects) to canonical ontology names.
     Only predicate mapping is applied here; subjects/objects (IDs) we keep as-is.
+    Pass a prebuilt gazetteer to skip the lookup; otherwise the one from
+    onto_path's memoized vocabulary snapshot is used (gazetteer.build_gazetteer).
     """
-    _, label_to_prop = build_gazetteer(onto_path)
+    _, label_to_prop = gazetteer if gazetteer is not None else build_gazetteer(onto_path)
 
     def norm_pred(p):
         key = p.strip().lower()
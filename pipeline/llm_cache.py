@@ -0,0 +1,70 @@
+# pipeline/llm_cache.py
+import os, json, time, sqlite3, hashlib, threading
+from typing import List, Dict, Any, Optional, Tuple
+
+class CacheMiss(RuntimeError):
+    """Raised in replay-only mode when a request is not in the cache."""
+
+class LLMCache:
+    """
+    Persistent SQLite cache of LLM extraction calls, keyed by a hash of
+    (model, temperature, system prompt, chunk text). Stores the raw
+    response, the parsed triples and the original call latency.
+
+    replay=True never lets a request through: a miss raises CacheMiss, so
+    CI can run the pipeline offline against a recorded cache.
+    """
+
+    def __init__(self, path: str, replay: bool = False):
+        self.path = path
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # timeout: corpus workers in other processes may hold the write lock
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY, model TEXT, raw TEXT, triples TEXT,
+            latency REAL, created REAL)""")
+        self._db.commit()
+
+    @staticmethod
+    def key(model: str, temperature: float, system: str, text: str) -> str:
+        blob = json.dumps([model, float(temperature), system, text], ensure_ascii=False)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT raw, triples, latency FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                if self.replay:
+                    raise CacheMiss(f"LLM cache miss in replay mode (key={key[:12]}…)")
+                return None
+            self.hits += 1
+            self.saved_seconds += row[2] or 0.0
+        return row[0], json.loads(row[1])
+
+    def put(self, key: str, model: str, raw: str, triples: List[Dict[str, Any]], latency: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, raw, json.dumps(triples, ensure_ascii=False), latency, time.time()))
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "saved_seconds": self.saved_seconds}
+
+    def report(self):
+        st = self.stats()
+        print(f"💾 LLM cache: hits={st['hits']} misses={st['misses']} "
+              f"hit_ratio={st['hit_ratio']:.0%} saved≈{st['saved_seconds']:.1f}s")
+
+    def close(self):
+        self._db.close()
@@ -1,14 +1,8 @@
 # pipeline/llm_ie.py
-import os, json
-from typing import List, Dict, Any
-from openai import OpenAI
-
-from dotenv import load_dotenv
-
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise RuntimeError("OPENAI_API_KEY missing in env")
+import os, re, json, time, random, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Union
+from . import metrics
 
 SYSTEM = """Extract factual triples from the text as JSON.
 - Use keys: subject, predicate, object, object_is_literal (bool), datatype (optional), confidence (0..1)
@@ -16,21 +10,148 @@ SYSTEM = """Extract factual triples from the text as JSON.
 - Predicates should be verbs or ontology-like properties (e.g., hasHeight, hasRiskLevel).
 - Prefer canonical spellings (singular)."""
 
-def extract_triples_llm(text: str, model: str = "gpt-4o-mini") -> List[Dict[str, Any]]:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key: raise RuntimeError("OPENAI_API_KEY missing in env")
-    client = OpenAI(api_key=api_key)
+TEMPERATURE = 0.2
 
-    prompt = f"Text:\n{text}\n\nReturn a JSON array of triples."
-    r = client.chat.completions.create(
-        model=model,
-        temperature=0.2,
-        messages=[
-            {"role":"system", "content": SYSTEM},
-            {"role":"user", "content": prompt}
-        ]
-    )
-    content = r.choices[0].message.content.strip()
+# ---------- chunking ----------
+def _split_long(start: int, end: int, text: str, max_chars: int):
+    """Split one oversized paragraph at sentence ends (hard cut as last resort)."""
+    while end - start > max_chars:
+        cut = -1
+        for m in re.finditer(r"[.!?;]\s+", text[start:start + max_chars]):
+            cut = start + m.end()
+        if cut <= start:
+            cut = start + max_chars
+        yield start, cut
+        start = cut
+    if end > start:
+        yield start, end
+
+def chunk_text(text: str, max_chars: int = 6000, overlap: int = 400) -> List[Dict[str, Any]]:
+    """
+    Split text on paragraph (line) boundaries into chunks of at most
+    max_chars. Each chunk repeats trailing paragraphs of the previous one,
+    up to overlap chars. Returns [{"index","start","end","text"}] with
+    character offsets into text.
+    """
+    paras = []
+    for m in re.finditer(r"[^\n]+", text):
+        if m.group().strip():
+            paras.extend(_split_long(m.start(), m.end(), text, max_chars))
+
+    chunks, cur = [], []
+    def flush():
+        s, e = cur[0][0], cur[-1][1]
+        chunks.append({"index": len(chunks), "start": s, "end": e, "text": text[s:e]})
+
+    for span in paras:
+        if cur and span[1] - cur[0][0] > max_chars:
+            flush()
+            # carry over tail paragraphs as overlap
+            tail = []
+            for p in reversed(cur):
+                if span[1] - p[0] > max_chars or cur[-1][1] - p[0] > overlap:
+                    break
+                tail.insert(0, p)
+            cur = tail
+        cur.append(span)
+    if cur:
+        flush()
+    return chunks
+
+def chunk_blocks(blocks: Iterable[Dict[str, Any]], max_chars: int = 6000,
+                 overlap: int = 400) -> Iterator[Dict[str, Any]]:
+    """
+    chunk_text over a stream of blocks (pipeline.docx_stream.iter_blocks
+    or any {"text","start","end"} dicts whose offsets refer to the texts
+    joined by "\n"). Yields chunks as they fill, so the document is never
+    held in memory; each chunk also carries the heading "path" of its
+    first block when blocks have one.
+    """
+    cur: List[tuple] = []  # (start, end, text, path)
+    index = 0
+    def make():
+        parts, prev = [], cur[0][0]
+        for s, e, t, _ in cur:
+            parts.append("\n" * (s > prev) + t)  # pieces of one split block are contiguous
+            prev = e
+        text = "".join(parts)
+        return {"index": index, "start": cur[0][0], "end": cur[0][0] + len(text), "text": text,
+                "path": cur[0][3]}
+
+    for b in blocks:
+        spans = ((b["start"] + s, b["start"] + e, b["text"][s:e])
+                 for s, e in _split_long(0, len(b["text"]), b["text"], max_chars))
+        for s, e, t in spans:
+            if cur and e - cur[0][0] > max_chars:
+                yield make()
+                index += 1
+                # carry over tail blocks as overlap
+                tail = []
+                for p in reversed(cur):
+                    if e - p[0] > max_chars or cur[-1][1] - p[0] > overlap:
+                        break
+                    tail.insert(0, p)
+                cur = tail
+            cur.append((s, e, t, b.get("path", [])))
+    if cur:
+        yield make()
+
+# ---------- request pool ----------
+def _status(e: Exception) -> Optional[int]:
+    code = getattr(e, "status_code", None)
+    if code is None:
+        code = getattr(getattr(e, "response", None), "status_code", None)
+    return code
+
+def _retry_after(e: Exception) -> Optional[float]:
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+_TRANSIENT: Optional[tuple] = None
+
+def _transient_errors() -> tuple:
+    # timeouts / dropped connections of the openai client and requests, if installed
+    global _TRANSIENT
+    if _TRANSIENT is None:
+        types = [TimeoutError, ConnectionError]
+        try:
+            import openai
+            types += [openai.APITimeoutError, openai.APIConnectionError]
+        except ImportError:
+            pass
+        try:
+            import requests
+            types += [requests.Timeout, requests.ConnectionError]
+        except ImportError:
+            pass
+        _TRANSIENT = tuple(types)
+    return _TRANSIENT
+
+def _retryable(e: Exception) -> bool:
+    code = _status(e)
+    if code is None:
+        return isinstance(e, _transient_errors())
+    return code in (408, 409, 429) or code >= 500
+
+class _RateGate:
+    """Shared pause: after a 429, every worker waits until the window passes."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._until = 0.0
+
+    def wait(self):
+        delay = self._until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._until = max(self._until, time.monotonic() + seconds)
+
+def _parse_triples(content: str) -> List[Dict[str, Any]]:
     # be tolerant: find first JSON array
     start = content.find("[")
     end   = content.rfind("]")
@@ -42,3 +163,151 @@ def extract_triples_llm(text: str, model: str = "gpt-4o-mini") -> List[Dict[str,
         return [t for t in triples if isinstance(t, dict)]
     except Exception:
         return []
+
+def _complete(client, model: str, text: str, temperature: float = TEMPERATURE) -> str:
+    prompt = f"Text:\n{text}\n\nReturn a JSON array of triples."
+    r = client.chat.completions.create(
+        model=model,
+        temperature=temperature,
+        messages=[
+            {"role":"system", "content": SYSTEM},
+            {"role":"user", "content": prompt}
+        ]
+    )
+    usage = getattr(r, "usage", None)
+    if usage is not None:
+        metrics.incr("llm.tokens", getattr(usage, "total_tokens", 0) or 0)
+    return r.choices[0].message.content.strip()
+
+def _default_client():
+    # deferred: openai/dotenv are only needed once a request actually goes out
+    from openai import OpenAI
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key: raise RuntimeError("OPENAI_API_KEY missing in env")
+    return OpenAI(api_key=api_key)
+
+def _triple_key(t: Dict[str, Any]):
+    return tuple(str(t.get(k, "")).strip().lower() for k in ("subject", "predicate", "object"))
+
+def extract_chunks_llm(chunks: Iterable[Dict[str, Any]], model: str = "gpt-4o-mini", client=None,
+                       max_concurrency: int = 4, max_retries: int = 5, base_delay: float = 1.0,
+                       temperature: float = TEMPERATURE, cache=None, limiter=None,
+                       stats: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Triples for already-split chunks ({"index","text",...}), one list per
+    chunk in input order (None where the request failed for good). Same
+    request pool, retries and cache handling as extract_triples_llm,
+    without merging.
+    """
+    chunks = list(chunks)
+    lock = threading.Lock()
+    holder = {"client": client}
+    def get_client():
+        # created on first cache miss, so a fully cached run needs no key
+        with lock:
+            if holder["client"] is None:
+                holder["client"] = _default_client()
+            return holder["client"]
+
+    gate = _RateGate()
+    counters = {"requests": 0, "retries": 0, "failed": 0}
+
+    def run(chunk):
+        key = None
+        if cache is not None:
+            key = cache.key(model, temperature, SYSTEM, chunk["text"])
+            hit = cache.get(key)
+            if hit is not None:
+                metrics.incr("llm.cache_hits")
+                return hit[1]
+        cl = get_client()
+        for attempt in range(max_retries + 1):
+            gate.wait()
+            with lock:
+                counters["requests"] += 1
+            metrics.incr("llm.requests")
+            try:
+                t_req = time.perf_counter()
+                with metrics.span("llm.request", chunk=chunk["index"], attempt=attempt):
+                    if limiter is not None:
+                        with limiter:
+                            raw = _complete(cl, model, chunk["text"], temperature)
+                    else:
+                        raw = _complete(cl, model, chunk["text"], temperature)
+                elapsed = time.perf_counter() - t_req
+            except Exception as e:
+                if attempt == max_retries or not _retryable(e):
+                    with lock:
+                        counters["failed"] += 1
+                    metrics.incr("llm.failed")
+                    print(f"⚠️ LLM chunk {chunk['index']} failed: {e}")
+                    return None
+                delay = _retry_after(e) or min(60.0, base_delay * 2 ** attempt)
+                delay += random.uniform(0, base_delay)
+                if _status(e) == 429:
+                    gate.pause(delay)
+                with lock:
+                    counters["retries"] += 1
+                metrics.incr("llm.retries")
+                time.sleep(delay)
+                continue
+            # outside the try: a failing cache write must not be retried as a request
+            triples = _parse_triples(raw)
+            if cache is not None:
+                cache.put(key, model, raw, triples, elapsed)
+            return triples
+
+    t0 = time.perf_counter()
+    with metrics.span("llm.extract", chunks=len(chunks)), \
+            ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        results = list(pool.map(run, chunks))
+    elapsed = time.perf_counter() - t0
+
+    if stats is not None:
+        stats.update(counters)
+        stats.update({"chunks": len(chunks), "seconds": elapsed,
+                      "chunks_per_s": (len(chunks) / elapsed) if elapsed else 0.0})
+    return results
+
+def extract_triples_llm(text: Union[str, Iterable[Dict[str, Any]]], model: str = "gpt-4o-mini", client=None,
+                        max_chars: int = 6000, overlap: int = 400, max_concurrency: int = 4,
+                        max_retries: int = 5, base_delay: float = 1.0, temperature: float = TEMPERATURE,
+                        cache=None, limiter=None,
+                        stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Chunk text (a string, or a stream of blocks from
+    pipeline.docx_stream.iter_blocks), extract triples per chunk with at
+    most max_concurrency requests in flight, and merge. Each triple gets "chunk" and "offset"
+    ([start, end] in text) as provenance; duplicates from overlapping
+    chunks keep the first occurrence.
+
+    client: anything with .chat.completions.create (defaults to OpenAI);
+    pass a fake to run offline. cache: optional LLMCache (pipeline.llm_cache);
+    hits skip the API, and a replay-only cache raises CacheMiss on a miss.
+    limiter: optional context manager (e.g. a multiprocessing semaphore)
+    held around every API request, to cap concurrency across processes.
+    stats, if given, is filled with counts and timings for the run.
+    """
+    if isinstance(text, str):
+        chunks = chunk_text(text, max_chars=max_chars, overlap=overlap)
+    else:
+        chunks = list(chunk_blocks(text, max_chars=max_chars, overlap=overlap))
+    results = extract_chunks_llm(chunks, model=model, client=client, max_concurrency=max_concurrency,
+                                 max_retries=max_retries, base_delay=base_delay,
+                                 temperature=temperature, cache=cache, limiter=limiter, stats=stats)
+
+    merged, seen = [], set()
+    for chunk, triples in zip(chunks, results):
+        for t in triples or []:
+            key = _triple_key(t)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append({**t, "chunk": chunk["index"], "offset": [chunk["start"], chunk["end"]]})
+
+    if stats is not None:
+        stats["triples"] = len(merged)
+    return merged
@@ -0,0 +1,175 @@
+# pipeline/manifest.py
+import os, re, json, hashlib
+from collections import Counter
+from typing import List, Dict, Any, Callable, Optional
+
+from .llm_ie import SYSTEM, TEMPERATURE, _split_long
+from .abox_writer import triple_lines
+from . import metrics
+
+MANIFEST_VERSION = 2  # 2: ABox lines come from fused triples (pipeline.fusion)
+
+def _sha(*parts) -> str:
+    blob = json.dumps(parts, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+# ---------- stage keys ----------
+def extraction_key(model: str, temperature: float = TEMPERATURE, *extra) -> str:
+    """Everything extraction output depends on besides the chunk text (+ caller extras such as the rule set)."""
+    return _sha("extract", model, float(temperature), SYSTEM, *extra)
+
+def linking_key(onto_path: str, emb_model: str, *extra) -> str:
+    """Ontology content + embedding model (+ caller extras such as the subject id)."""
+    from .vocab_snapshot import load_snapshot
+    onto_sha = load_snapshot(onto_path).data["source"]["sha256"]
+    return _sha("link", onto_sha, emb_model, *extra)
+
+# ---------- content-defined chunks ----------
+def stable_chunks(text: str, max_chars: int = 6000, avg_paras: int = 4) -> List[Dict[str, Any]]:
+    """
+    Group paragraphs into chunks whose boundaries depend on paragraph
+    content, not position: a chunk ends after a paragraph whose hash is
+    0 mod avg_paras (or when max_chars is reached). Editing one paragraph
+    then changes one or two chunks instead of shifting every later one.
+    No overlap, so a chunk's hash covers exactly its own text.
+    Returns [{"index","start","end","text","hash"}].
+    """
+    chunks, cur = [], []
+    def flush():
+        s, e = cur[0][0], cur[-1][1]
+        body = text[s:e]
+        chunks.append({"index": len(chunks), "start": s, "end": e, "text": body,
+                       "hash": hashlib.sha256(body.encode("utf-8")).hexdigest()})
+        cur.clear()
+
+    for m in re.finditer(r"[^\n]+", text):
+        if not m.group().strip():
+            continue
+        for span in _split_long(m.start(), m.end(), text, max_chars):
+            if cur and span[1] - cur[0][0] > max_chars:
+                flush()
+            cur.append(span)
+            h = hashlib.blake2b(text[span[0]:span[1]].encode("utf-8"), digest_size=4).digest()
+            if int.from_bytes(h, "little") % max(1, avg_paras) == 0:
+                flush()
+    if cur:
+        flush()
+    return chunks
+
+# ---------- manifest ----------
+class Manifest:
+    """
+    Per-output JSON manifest: for each document, the stage keys it was
+    built with and, per chunk hash, the raw LLM triples, the linked triples
+    and the N-Triples lines they contributed to the ABox.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data: Dict[str, Any] = {"version": MANIFEST_VERSION, "docs": {}}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.data = data
+        except (OSError, ValueError):
+            pass
+
+    def doc(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return self.data["docs"].get(doc_id)
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+def _line_counts(entry: Optional[Dict[str, Any]]) -> Counter:
+    counts: Counter = Counter()
+    if entry:
+        for h in entry["order"]:
+            counts.update(set(entry["chunks"][h]["lines"]))
+    return counts
+
+def document_lines(manifest: Manifest, doc_id: str) -> List[str]:
+    """Every N-Triples line doc_id's linked chunks contribute (to rebuild a lost ABox)."""
+    return list(_line_counts(manifest.doc(doc_id)))
+
+def _count(stats: Dict[str, int]):
+    for k, v in stats.items():
+        metrics.incr(f"manifest.{k}", v)
+
+def update_document(manifest: Manifest, doc_id: str, text: str, keys: Dict[str, str],
+                    extract: Callable[[List[Dict[str, Any]]], List[Optional[List[Dict[str, Any]]]]],
+                    link: Callable[[List[List[Dict[str, Any]]]], List[List[Dict[str, Any]]]],
+                    max_chars: int = 6000) -> Dict[str, Any]:
+    """
+    Re-extract and re-link only what changed since the last run of doc_id.
+
+    keys: {"extract": extraction_key(...), "link": linking_key(...)}. A
+    changed extraction key invalidates every chunk's triples (and so their
+    linking); a changed linking key only re-links the stored raw triples.
+    extract maps chunks to per-chunk raw triples (None = failed, retried
+    next run); link maps per-chunk raw triples to linked triples.
+
+    Returns the ABox delta as N-Triples lines: {"retract","add","fresh",
+    "stats"}. Lines are reference-counted over chunks, so a triple is only
+    retracted once no remaining chunk produces it. The manifest is updated
+    in memory; call manifest.save() after the ABox is patched.
+    """
+    old = manifest.doc(doc_id)
+    doc_sha = _sha(text)
+    stats = {"chunks": 0, "reused": 0, "extracted": 0, "linked": 0, "failed": 0}
+    if old and old["doc_sha"] == doc_sha and old["stages"] == keys:
+        stats["chunks"] = stats["reused"] = len(old["order"])
+        _count(stats)
+        return {"retract": [], "add": [], "fresh": False, "stats": stats}
+
+    prev = old["chunks"] if old else {}
+    extract_ok = bool(old) and old["stages"].get("extract") == keys.get("extract")
+    link_ok = extract_ok and old["stages"].get("link") == keys.get("link")
+
+    chunks = stable_chunks(text, max_chars=max_chars)
+    stats["chunks"] = len(chunks)
+    entries: Dict[str, Dict[str, Any]] = {}
+    to_extract, to_link, seen = [], [], set()
+    for c in chunks:
+        h = c["hash"]
+        if h in seen:
+            continue
+        seen.add(h)
+        p = prev.get(h)
+        if p is not None and extract_ok and link_ok:
+            entries[h] = p
+            stats["reused"] += 1
+        elif p is not None and extract_ok:
+            to_link.append((h, p["raw"]))
+        else:
+            to_extract.append(c)
+
+    if to_extract:
+        for c, raw in zip(to_extract, extract(to_extract)):
+            if raw is None:
+                stats["failed"] += 1
+                continue
+            to_link.append((c["hash"], raw))
+            stats["extracted"] += 1
+    if to_link:
+        stats["linked"] = len(to_link)
+        for (h, raw), linked in zip(to_link, link([raw for _, raw in to_link])):
+            entries[h] = {"raw": raw, "linked": linked, "lines": triple_lines(linked)}
+
+    order = [c["hash"] for c in chunks if c["hash"] in entries]
+    new = {"doc_sha": doc_sha, "stages": dict(keys), "order": order,
+           "chunks": {h: entries[h] for h in order}}
+    if stats["failed"]:
+        new["doc_sha"] = None  # never short-circuit while chunks are missing
+
+    before, after = _line_counts(old), _line_counts(new)
+    delta = {"retract": [l for l in before if l not in after],
+             "add": [l for l in after if l not in before],
+             "fresh": old is None, "stats": stats}
+    manifest.data["docs"][doc_id] = new
+    _count(stats)
+    return delta
@@ -0,0 +1,243 @@
+# pipeline/metrics.py
+# Opt-in instrumentation: spans (timers), counters and peak memory for the
+# pipeline stages. Disabled by default; span()/incr() then cost one global
+# check and return a shared no-op. Enable with metrics.enable() or
+# PIPELINE_METRICS=1.
+import os, sys, json, time, threading, functools
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+_ENABLED = os.getenv("PIPELINE_METRICS", "") not in ("", "0")
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+_spans: Dict[str, Dict[str, float]] = {}
+_counters: Dict[str, float] = {}
+_events: deque = deque(maxlen=10_000)
+_config: Dict[str, Any] = {"memory": False, "profile": None, "profile_dir": ".", "stages": None}
+
+class _NullSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def set(self, **attrs): pass
+
+_NULL = _NullSpan()
+
+def enabled() -> bool:
+    return _ENABLED
+
+def enable(memory: bool = False, profile: Optional[str] = None, profile_dir: str = ".",
+           stages: Optional[Iterable[str]] = None):
+    """
+    Turn instrumentation on. memory=True traces Python allocations
+    (tracemalloc) and records the peak of every top-level span.
+    profile="cprofile"|"pyinstrument" profiles the spans named in stages
+    (all top-level spans if None) into profile_dir.
+    """
+    global _ENABLED
+    if profile not in (None, "cprofile", "pyinstrument"):
+        raise ValueError(f"profile must be 'cprofile' or 'pyinstrument', got {profile!r}")
+    _config.update(memory=memory, profile=profile, profile_dir=profile_dir,
+                   stages=set(stages) if stages is not None else None)
+    if memory:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    if profile:
+        os.makedirs(profile_dir, exist_ok=True)
+    _ENABLED = True
+
+def disable():
+    global _ENABLED
+    _ENABLED = False
+    if _config["memory"]:
+        import tracemalloc
+        tracemalloc.stop()
+        _config["memory"] = False
+
+def reset():
+    with _LOCK:
+        _spans.clear(); _counters.clear(); _events.clear()
+
+# ---------- recording ----------
+def incr(name: str, n: float = 1):
+    if not _ENABLED:
+        return
+    with _LOCK:
+        _counters[name] = _counters.get(name, 0) + n
+
+class _Span:
+    __slots__ = ("name", "attrs", "t0", "depth", "prof")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name, self.attrs, self.prof = name, attrs, None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_LOCAL, "stack", None)
+        if stack is None:
+            stack = _LOCAL.stack = []
+        self.depth = len(stack)
+        stack.append(self.name)
+        # memory peaks and profiles belong to the main thread's stages; a span
+        # opened in a worker thread must not reset the peak under them
+        if self.depth == 0 and threading.current_thread() is threading.main_thread():
+            if _config["memory"]:
+                import tracemalloc
+                tracemalloc.reset_peak()
+            stages = _config["stages"]
+            if _config["profile"] and (stages is None or self.name in stages):
+                self.prof = _start_profiler(_config["profile"])
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        stack = _LOCAL.stack
+        stack.pop()
+        peak = None
+        if self.depth == 0 and _config["memory"] and threading.current_thread() is threading.main_thread():
+            import tracemalloc
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+        if self.prof is not None:
+            _stop_profiler(self.prof, self.name)
+        with _LOCK:
+            st = _spans.get(self.name)
+            if st is None:
+                st = _spans[self.name] = {"count": 0, "seconds": 0.0, "max_seconds": 0.0}
+            st["count"] += 1
+            st["seconds"] += dt
+            st["max_seconds"] = max(st["max_seconds"], dt)
+            if peak is not None:
+                st["peak_mb"] = max(st.get("peak_mb", 0.0), peak)
+            ev = {"span": self.name, "parent": stack[-1] if stack else None,
+                  "end": time.time(), "seconds": dt}
+            if peak is not None:
+                ev["peak_mb"] = peak
+            if self.attrs:
+                ev.update(self.attrs)
+            if exc[0] is not None:
+                ev["error"] = exc[0].__name__
+            _events.append(ev)
+        return False
+
+def span(name: str, **attrs):
+    """with metrics.span("link.search", n=len(q)): ..."""
+    if not _ENABLED:
+        return _NULL
+    return _Span(name, attrs)
+
+def timed(name: str):
+    """Decorator form of span()."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if not _ENABLED:
+                return fn(*a, **kw)
+            with _Span(name, {}):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+# ---------- profilers ----------
+def _start_profiler(kind: str):
+    if getattr(_LOCAL, "profiling", False):
+        return None  # cProfile cannot nest
+    if kind == "pyinstrument":
+        from pyinstrument import Profiler
+        prof = Profiler()
+    else:
+        import cProfile
+        prof = cProfile.Profile()
+    _LOCAL.profiling = True
+    prof.start() if kind == "pyinstrument" else prof.enable()
+    return (kind, prof)
+
+def _stop_profiler(handle, name: str):
+    kind, prof = handle
+    _LOCAL.profiling = False
+    stem = os.path.join(_config["profile_dir"], f"{name.replace('/', '_')}.{int(time.time() * 1000)}")
+    if kind == "pyinstrument":
+        prof.stop()
+        with open(stem + ".html", "w", encoding="utf-8") as f:
+            f.write(prof.output_html())
+    else:
+        prof.disable()
+        prof.dump_stats(stem + ".prof")
+
+# ---------- export ----------
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1e3  # bytes on macOS, KiB on Linux
+
+def snapshot() -> Dict[str, Any]:
+    with _LOCK:
+        out = {"spans": {k: dict(v) for k, v in _spans.items()},
+               "counters": dict(_counters),
+               "peak_rss_mb": _peak_rss_mb()}
+    if _config["memory"]:
+        import tracemalloc
+        out["traced_mb"] = tracemalloc.get_traced_memory()[0] / 1e6
+    return out
+
+def write_json(path: str, events: bool = True):
+    """Snapshot (+ the last span events) as one JSON document."""
+    data = snapshot()
+    if events:
+        with _LOCK:
+            data["events"] = list(_events)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+def to_prometheus(prefix: str = "pipeline") -> str:
+    """Prometheus text exposition format of the current snapshot."""
+    snap = snapshot()
+    seconds, calls, peak = [], [], []
+    for name, st in sorted(snap["spans"].items()):
+        label = f'{{span="{name}"}}'
+        seconds.append(f'{prefix}_span_seconds_total{label} {st["seconds"]:.6f}')
+        calls.append(f'{prefix}_span_calls_total{label} {st["count"]}')
+        if "peak_mb" in st:
+            peak.append(f'{prefix}_span_peak_bytes{label} {int(st["peak_mb"] * 1e6)}')
+    lines = []
+    # a family's samples must be contiguous, after its TYPE line
+    for metric, kind, rows in (("span_seconds_total", "counter", seconds),
+                               ("span_calls_total", "counter", calls),
+                               ("span_peak_bytes", "gauge", peak)):
+        if rows:
+            lines += [f"# TYPE {prefix}_{metric} {kind}"] + rows
+    for name, v in sorted(snap["counters"].items()):
+        metric = f"{prefix}_{_metric_name(name)}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {v:g}"]
+    if snap["peak_rss_mb"] is not None:
+        lines += [f"# TYPE {prefix}_peak_rss_bytes gauge",
+                  f"{prefix}_peak_rss_bytes {int(snap['peak_rss_mb'] * 1e6)}"]
+    return "\n".join(lines) + "\n"
+
+def export(path: str):
+    """Write metrics to path: Prometheus text for .prom/.txt, JSON otherwise."""
+    if path.endswith((".prom", ".txt")):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(to_prometheus())
+    else:
+        write_json(path)
+    print(f"📈 Metrics written to {path}")
+
+def report(top: int = 15):
+    snap = snapshot()
+    print("📈 Stages:")
+    for name, st in sorted(snap["spans"].items(), key=lambda kv: -kv[1]["seconds"])[:top]:
+        peak = f"  peak={st['peak_mb']:.1f} MB" if "peak_mb" in st else ""
+        print(f"  - {name}: {st['seconds']:.3f}s over {st['count']} call(s){peak}")
+    if snap["counters"]:
+        print("  " + ", ".join(f"{k}={v:g}" for k, v in sorted(snap["counters"].items())))
@@ -1,8 +1,31 @@
 # pipeline/ontology_vocab.py
-from owlready2 import get_ontology, ThingClass, AnnotationProperty
-from rdflib import Namespace
+# owlready2 is imported inside the functions: load_vocab serves the
+# compiled snapshot and never needs it.
+import os
+
+# owlready2 SQLite quadstores, as written by ontology/ontology_builder.py
+QUADSTORE_EXTS = (".sqlite3", ".sqlite", ".db")
+
+def is_quadstore(path: str) -> bool:
+    return path.lower().endswith(QUADSTORE_EXTS)
+
+def open_quadstore(path: str):
+    """
+    The ontology stored in an owlready2 quadstore, opened read-only in a
+    private World: nothing is parsed, entities are loaded on access.
+    """
+    from owlready2 import World
+    world = World()
+    world.set_backend(filename=os.path.abspath(path), exclusive=False, read_only=True)
+    for iri, onto in world.ontologies.items():
+        if iri != "http://anonymous/":
+            return onto
+    raise ValueError(f"{path}: no ontology in the quadstore")
 
 def load_ontology(owl_path: str):
+    if is_quadstore(owl_path):
+        return open_quadstore(owl_path)
+    from owlready2 import get_ontology
     return get_ontology(f"file://{owl_path}").load()
 
 def extract_vocab(onto):
@@ -12,6 +35,8 @@ def extract_vocab(onto):
       obj_props: list of {"iri","name","labels":[...]}
       data_props:list of {"iri","name","labels":[...]}
     """
+    from owlready2 import AnnotationPropertyClass
+
     # Try to access SKOS annotation properties if present
     skos = onto.get_namespace("http://www.w3.org/2004/02/skos/core#")
     prefLabel = getattr(skos, "prefLabel", None)
@@ -23,11 +48,11 @@ def extract_vocab(onto):
         for v in getattr(ent, "label", []):
             labs.add(str(v))
         # SKOS preferred / alt labels if bound
-        if isinstance(prefLabel, AnnotationProperty):
-            for v in ent.get_property_value(prefLabel) or []:
+        if isinstance(prefLabel, AnnotationPropertyClass):
+            for v in prefLabel[ent] or []:
                 labs.add(str(v))
-        if isinstance(altLabel, AnnotationProperty):
-            for v in ent.get_property_value(altLabel) or []:
+        if isinstance(altLabel, AnnotationPropertyClass):
+            for v in altLabel[ent] or []:
                 labs.add(str(v))
         # Always include the Python name
         labs.add(ent.name)
@@ -54,3 +79,8 @@ def extract_vocab(onto):
         })
 
     return classes, obj_props, data_props
+
+def load_vocab(owl_path: str):
+    """extract_vocab(load_ontology(owl_path)), served from the compiled snapshot."""
+    from .vocab_snapshot import load_snapshot
+    return load_snapshot(owl_path).vocab()
@@ -0,0 +1,551 @@
+# pipeline/reasoner.py
+# README step 9. Native forward chaining over the ABox: the TBox from the
+# vocab snapshot (subClassOf closure, rdfs:domain/range typing,
+# subPropertyOf) plus Datalog-style or Python rules, evaluated semi-naively
+# over dictionary-encoded triples. Only the triples derived in the previous
+# round (the delta) are joined against the indexes, so add() after a full
+# run costs work proportional to what the new triples derive.
+import re, time, pickle, operator
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from . import metrics
+from .validator import RDF_TYPE, Triple, iter_abox, iter_nt_lines, local
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+PREFIXES = {"ex": "http://example.org/aec#", "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+            "rdfs": "http://www.w3.org/2000/01/rdf-schema#", "xsd": XSD,
+            "owl": "http://www.w3.org/2002/07/owl#"}
+_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+        "=": operator.eq, "!=": operator.ne}
+_ROOTS = {"Thing", "Nothing"}
+
+Atom = Tuple[Any, Any, Any]
+
+class Rule:
+    """
+    body: atoms (s, p, o) with "?var" variables and constants ("<iri>",
+    "prefix:local", a full IRI or "a"); where: (var, op, value) comparisons
+    (numbers compare numerically) or callables taking the bindings
+    ({var: IRI str | number | str}) and returning bool. head: atoms in the
+    same form, or a callable returning (s, p, o) tuples of such terms
+    (literals as ("lex", datatype) pairs).
+    """
+
+    def __init__(self, head: Union[Sequence[Atom], Callable], body: Sequence[Atom],
+                 where: Sequence[Any] = (), name: Optional[str] = None):
+        if not body:
+            raise ValueError("a rule needs at least one body atom")
+        self.head, self.body, self.where = head, list(body), list(where)
+        self.name = name or " , ".join(" ".join(map(str, a)) for a in self.body)
+
+    def __repr__(self):
+        return f"Rule({self.name})"
+
+def _is_var(x) -> bool:
+    return isinstance(x, str) and x.startswith("?")
+
+def _expand(x: str, prefixes: Dict[str, str]) -> str:
+    if x == "a":
+        return RDF_TYPE
+    if x.startswith("<") and x.endswith(">"):
+        return x[1:-1]
+    pref, sep, rest = x.partition(":")
+    if sep and pref in prefixes and not rest.startswith("//"):
+        return prefixes[pref] + rest
+    return x
+
+# ---------- Datalog-style rule files ----------
+_ATOM = re.compile(r"\[([^\]]*)\]")
+_TERM = re.compile(r'<[^>]*>|"[^"]*"(?:\^\^\S+)?|[^\s\]]+')
+_FILTER = re.compile(r"^(\?\w+)\s*(<=|>=|!=|=|<|>)\s*(.+)$")
+
+def _value(tok: str, prefixes: Dict[str, str]):
+    try:
+        return float(tok)
+    except ValueError:
+        pass
+    if tok.startswith('"'):
+        return tok[1:tok.rindex('"')]
+    return _expand(tok, prefixes)
+
+def _literal(tok: str, prefixes: Dict[str, str]):
+    lex, _, dt = tok[1:].partition('"')
+    return (lex, _expand(dt[2:], prefixes) if dt.startswith("^^") else None)
+
+def parse_rules(text: str, prefixes: Optional[Dict[str, str]] = None) -> List[Rule]:
+    """
+    One rule per statement, ended by " ." at the end of a line:
+
+        @prefix ex: <http://example.org/aec#> .
+        [?t ex:hasSafetyMeasure ?m] :- [?t ex:hasSafetyInfrastructure ?i], [?i ex:consistsOf ?m] .
+        [?h ex:hasRisk ex:LowPressure] :- [?h a ex:Hydrant], [?h ex:pressure ?p], ?p < 5 .
+
+    Head atoms may hold literals as "lex"^^xsd:type.
+    """
+    prefixes = dict(PREFIXES, **(prefixes or {}))
+    rules = []
+    body_text = re.sub(r"(?m)^\s*#.*$", "", text)
+    for stmt in re.split(r"\s\.\s*(?:\n|$)", body_text):
+        stmt = " ".join(stmt.split())
+        if not stmt:
+            continue
+        m = re.match(r"@prefix\s+(\w*):\s*<([^>]*)>$", stmt)
+        if m:
+            prefixes[m.group(1)] = m.group(2)
+            continue
+        head_s, sep, body_s = stmt.partition(":-")
+        if not sep:
+            raise ValueError(f"rule without ':-': {stmt!r}")
+        def atoms(s: str, head: bool) -> List[Atom]:
+            out = []
+            for a in _ATOM.findall(s):
+                toks = _TERM.findall(a)
+                if len(toks) != 3:
+                    raise ValueError(f"atom needs 3 terms: [{a}]")
+                out.append(tuple(_literal(t, prefixes) if head and t.startswith('"')
+                                 else t if _is_var(t) else _expand(t, prefixes) for t in toks))
+            return out
+        where = []
+        for part in _ATOM.sub("", body_s).split(","):
+            part = part.strip()
+            if not part:
+                continue
+            f = _FILTER.match(part)
+            if f is None:
+                raise ValueError(f"cannot parse condition {part!r}")
+            where.append((f.group(1), f.group(2), _value(f.group(3).strip(), prefixes)))
+        rules.append(Rule(atoms(head_s, True), atoms(body_s, False), where, name=stmt))
+    return rules
+
+def load_rules(path: str) -> List[Rule]:
+    with open(path, encoding="utf-8") as f:
+        return parse_rules(f.read())
+
+# ---------- compiled rules ----------
+class _Compiled:
+    __slots__ = ("rule", "body", "head", "where", "plans", "fires")
+
+    def __init__(self, rule: Rule, body, head, where, plans):
+        self.rule, self.body, self.head, self.where, self.plans = rule, body, head, where, plans
+        self.fires = 0
+
+def _plan(body: List[Atom], first: int) -> List[int]:
+    """Join order starting at the delta atom: next the atom sharing most bound variables."""
+    bound = {x for x in body[first] if _is_var(x)}
+    order, rest = [first], [i for i in range(len(body)) if i != first]
+    while rest:
+        def score(i):
+            return sum(1 for x in body[i] if not _is_var(x) or x in bound)
+        nxt = max(rest, key=score)
+        order.append(nxt)
+        rest.remove(nxt)
+        bound |= {x for x in body[nxt] if _is_var(x)}
+    return order
+
+class Reasoner:
+    """
+    Materializes rdfs-style entailments and user rules over one ABox.
+
+        r = Reasoner(load_snapshot("ontology/general_aec.owl"), rules=load_rules("abox/derived_rules.dl"))
+        r.add(iter_abox("input/llm_linked_abox.ttl"))   # asserted triples, then run to fixpoint
+        r.add(more_triples)                              # incremental: only their consequences
+        r.write("input/llm_linked_abox.inferred.nt")
+
+    Classes and properties are matched to the TBox by local name (the ABox
+    and ontology namespaces differ); derived class/property IRIs reuse the
+    namespace of the triggering term.
+    """
+
+    def __init__(self, snap=None, rules: Sequence[Rule] = (), rdfs: bool = True):
+        self.terms: List[Any] = []  # id -> IRI str | (lex, datatype)
+        self.ids: Dict[Any, int] = {}
+        self.facts: Set[Tuple[int, int, int]] = set()
+        self.inferred: Set[Tuple[int, int, int]] = set()
+        self.ps: Dict[int, Dict[int, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self.po: Dict[int, Dict[int, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self.type = self._id(RDF_TYPE)
+        self.rdfs = rdfs and snap is not None
+        self._class_sup: Dict[str, List[str]] = {}
+        self._prop: Dict[str, Tuple[List[str], List[str], List[str]]] = {}
+        if snap is not None:
+            self._compile_tbox(snap)
+        self._sup_cache: Dict[int, List[int]] = {}
+        self._pinfo: Dict[int, Tuple[List[int], List[int], List[int]]] = {}
+        self.rules: List[_Compiled] = []
+        for r in rules:
+            self.add_rule(r)
+        self.stats = {"asserted": 0, "inferred": 0, "rounds": 0, "seconds": 0.0}
+
+    # ---------- TBox ----------
+    def _compile_tbox(self, snap):
+        def closure(parents: Dict[str, List[str]]) -> Dict[str, List[str]]:
+            out: Dict[str, List[str]] = {}
+            def up(n: str, seen: Set[str]) -> List[str]:
+                if n in out:
+                    return out[n]
+                acc: List[str] = []
+                for p in parents.get(n, ()):
+                    if p in _ROOTS or p in seen:
+                        continue
+                    if p not in acc:
+                        acc.append(p)
+                    acc += [q for q in up(p, seen | {n}) if q not in acc]
+                out[n] = acc
+                return acc
+            for n in parents:
+                up(n, set())
+            return out
+        self._class_sup = closure({c["name"]: c["parents"] for c in snap.classes})
+        props = snap.obj_props + snap.data_props
+        prop_sup = closure({p["name"]: p["parents"] for p in props})
+        for p in props:
+            sup = prop_sup.get(p["name"], [])
+            dom = [d for d in p["domain"] if not d.startswith(XSD)]
+            rng = [r for r in p["range"] if not r.startswith(XSD)] if p["kind"] == "object" else []
+            self._prop[p["name"]] = (sup, dom, rng)
+
+    @staticmethod
+    def _ns(iri: str) -> str:
+        return iri[:len(iri) - len(local(iri))]
+
+    def _types(self, names: Iterable[str], ns: str) -> List[int]:
+        """Class ids for names and all their superclasses, in namespace ns."""
+        out: List[int] = []
+        for n in names:
+            for c in [n, *self._class_sup.get(n, ())]:
+                i = self._id(ns + c)
+                if i not in out:
+                    out.append(i)
+        return out
+
+    def _supers(self, cls: int) -> List[int]:
+        sup = self._sup_cache.get(cls)
+        if sup is None:
+            iri = self.terms[cls]
+            sup = [] if not isinstance(iri, str) else \
+                [self._id(self._ns(iri) + c) for c in self._class_sup.get(local(iri), ())]
+            self._sup_cache[cls] = sup
+        return sup
+
+    def _prop_info(self, p: int) -> Tuple[List[int], List[int], List[int]]:
+        info = self._pinfo.get(p)
+        if info is None:
+            iri = self.terms[p]
+            sup, dom, rng = self._prop.get(local(iri), ((), (), ()))
+            ns = self._ns(iri)
+            info = ([self._id(ns + q) for q in sup], self._types(dom, ns), self._types(rng, ns))
+            self._pinfo[p] = info
+        return info
+
+    # ---------- terms ----------
+    def _id(self, key) -> int:
+        i = self.ids.get(key)
+        if i is None:
+            i = self.ids[key] = len(self.terms)
+            self.terms.append(key)
+        return i
+
+    def _encode(self, t: Triple) -> Tuple[int, int, int]:
+        s, p, o, lit, dt = t
+        ids = self.ids
+        if lit:
+            o = (o, dt)
+        si, pi, oi = ids.get(s), ids.get(p), ids.get(o)
+        return (self._id(s) if si is None else si, self._id(p) if pi is None else pi,
+                self._id(o) if oi is None else oi)
+
+    def value(self, i: int):
+        """Python value of a term: IRI str, float for numeric literals, else the lexical form."""
+        key = self.terms[i]
+        if isinstance(key, str):
+            return key
+        try:
+            return float(key[0])
+        except ValueError:
+            return key[0]
+
+    def _term_id(self, x, prefixes: Dict[str, str]) -> int:
+        if isinstance(x, tuple):
+            lex, dt = x
+            return self._id((str(lex), dt))
+        if isinstance(x, (int, float)) and not isinstance(x, bool):
+            return self._id((repr(float(x)) if isinstance(x, float) else str(x),
+                             XSD + ("double" if isinstance(x, float) else "integer")))
+        return self._id(_expand(str(x), prefixes))
+
+    # ---------- rules ----------
+    def add_rule(self, rule: Rule, prefixes: Optional[Dict[str, str]] = None):
+        prefixes = dict(PREFIXES, **(prefixes or {}))
+        enc = lambda a: tuple(x if _is_var(x) else self._term_id(x, prefixes) for x in a)
+        body = [enc(a) for a in rule.body]
+        head = rule.head if callable(rule.head) else [enc(a) for a in rule.head]
+        where = []
+        for w in rule.where:
+            if callable(w):
+                where.append(w)
+            else:
+                var, op, val = w
+                if op not in _OPS:
+                    raise ValueError(f"unsupported operator {op!r}")
+                if isinstance(val, str) and not _is_var(val):
+                    val = _expand(val, prefixes)
+                where.append((var, _OPS[op], val))
+        bound = {x for a in body for x in a if _is_var(x)}
+        free = [x for a in ([] if callable(head) else head) for x in a if _is_var(x) and x not in bound]
+        if free:
+            raise ValueError(f"head variables not bound in the body: {free}")
+        self.rules.append(_Compiled(rule, body, head, where, [_plan(body, i) for i in range(len(body))]))
+
+    # in compiled atoms constants are term ids, so a str is always a variable
+    def _matches(self, atom, b: Dict[str, int]) -> Iterator[Dict[str, int]]:
+        s, p, o = (b.get(x) if type(x) is str else x for x in atom)
+        preds = [p] if p is not None else list(self.ps)
+        for pi in preds:
+            idx = self.ps.get(pi)
+            if idx is None:
+                continue
+            if s is not None and o is not None:
+                if o in idx.get(s, ()):
+                    yield self._bind(atom, b, s, pi, o) if p is None else b
+            elif s is not None:
+                for oi in tuple(idx.get(s, ())):
+                    nb = self._bind(atom, b, s, pi, oi)
+                    if nb is not None:
+                        yield nb
+            elif o is not None:
+                for si in tuple(self.po[pi].get(o, ())):
+                    nb = self._bind(atom, b, si, pi, o)
+                    if nb is not None:
+                        yield nb
+            else:
+                for si, objs in list(idx.items()):
+                    for oi in tuple(objs):
+                        nb = self._bind(atom, b, si, pi, oi)
+                        if nb is not None:
+                            yield nb
+
+    @staticmethod
+    def _bind(atom, b: Dict[str, int], s: int, p: int, o: int) -> Optional[Dict[str, int]]:
+        nb = None
+        for x, v in zip(atom, (s, p, o)):
+            if type(x) is str:
+                cur = b.get(x) if nb is None else nb.get(x)
+                if cur is None:
+                    if nb is None:
+                        nb = dict(b)
+                    nb[x] = v
+                elif cur != v:
+                    return None
+            elif x != v:
+                return None
+        return nb if nb is not None else b
+
+    def _passes(self, where, b: Dict[str, int]) -> bool:
+        values = None
+        for w in where:
+            if callable(w):
+                if values is None:
+                    values = {k: self.value(v) for k, v in b.items()}
+                if not w(values):
+                    return False
+                continue
+            var, op, val = w
+            x = self.value(b[var])
+            if _is_var(val):
+                val = self.value(b[val])
+            if isinstance(val, float) != isinstance(x, float):
+                return False
+            if not op(x, val):
+                return False
+        return True
+
+    def _fire(self, c: _Compiled, delta_by_p: Dict[int, List[Tuple[int, int, int]]]) -> Iterator[Tuple[int, int, int]]:
+        for i, plan in enumerate(c.plans):
+            first = c.body[i]
+            p = first[1]
+            cands = delta_by_p.get(p, ()) if type(p) is not str else [t for ts in delta_by_p.values() for t in ts]
+            for (s, pi, o) in cands:
+                b0 = self._bind(first, {}, s, pi, o)
+                if b0 is None:
+                    continue
+                frontier = [b0]
+                for j in plan[1:]:
+                    frontier = [nb for b in frontier for nb in self._matches(c.body[j], b)]
+                    if not frontier:
+                        break
+                for b in frontier:
+                    if c.where and not self._passes(c.where, b):
+                        continue
+                    c.fires += 1
+                    if callable(c.head):
+                        values = {k: self.value(v) for k, v in b.items()}
+                        for h in c.head(values) or ():
+                            yield tuple(self._term_id(x, PREFIXES) for x in h)
+                    else:
+                        for h in c.head:
+                            yield tuple(b[x] if type(x) is str else x for x in h)
+
+    # ---------- evaluation ----------
+    def _insert(self, t: Tuple[int, int, int]) -> bool:
+        if t in self.facts:
+            return False
+        self.facts.add(t)
+        s, p, o = t
+        self.ps[p][s].add(o)
+        self.po[p][o].add(s)
+        return True
+
+    def _derive(self, t: Tuple[int, int, int]) -> Iterator[Tuple[int, int, int]]:
+        s, p, o = t
+        if p == self.type:
+            for c in self._supers(o):
+                yield (s, p, c)
+            return
+        sup, dom, rng = self._prop_info(p)
+        for q in sup:
+            yield (s, q, o)
+        for c in dom:
+            yield (s, self.type, c)
+        if rng and isinstance(self.terms[o], str):
+            for c in rng:
+                yield (o, self.type, c)
+
+    def _run(self, delta: List[Tuple[int, int, int]]) -> int:
+        """Semi-naive fixpoint from delta (already inserted); returns the number of new inferences."""
+        new_total, facts = 0, self.facts
+        while delta:
+            self.stats["rounds"] += 1
+            new: List[Tuple[int, int, int]] = []
+            if self.rdfs:
+                for t in delta:
+                    for d in self._derive(t):
+                        if d not in facts and self._insert(d):
+                            self.inferred.add(d)
+                            new.append(d)
+            if self.rules:
+                by_p: Dict[int, List[Tuple[int, int, int]]] = defaultdict(list)
+                for t in delta:
+                    by_p[t[1]].append(t)
+                for c in self.rules:
+                    for d in list(self._fire(c, by_p)):
+                        if self._insert(d):
+                            self.inferred.add(d)
+                            new.append(d)
+            new_total += len(new)
+            delta = new
+        return new_total
+
+    def add(self, triples: Iterable[Triple]) -> int:
+        """
+        Assert triples ((s, p, o, is_literal, datatype) as from
+        validator.iter_abox) and materialize what follows from them.
+        Returns the number of newly inferred triples.
+        """
+        t0 = time.perf_counter()
+        with metrics.span("reason.add"):
+            delta = []
+            for t in triples:
+                e = self._encode(t)
+                self.inferred.discard(e)  # asserted now, whether or not it was derived before
+                if self._insert(e):
+                    delta.append(e)
+            self.stats["asserted"] += len(delta)
+            n = self._run(delta)
+        self.stats["inferred"] += n
+        self.stats["seconds"] += time.perf_counter() - t0
+        metrics.incr("reason.asserted", len(delta))
+        metrics.incr("reason.inferred", n)
+        return n
+
+    # ---------- output ----------
+    def _nt(self, i: int) -> str:
+        key = self.terms[i]
+        if isinstance(key, str):
+            return f"_:{key[2:]}" if key.startswith("_:") else f"<{key}>"
+        from .abox_writer import _escape
+        lex, dt = key
+        return f'"{_escape(lex)}"' + (f"^^<{dt}>" if dt else "")
+
+    def iter_inferred(self) -> Iterator[Tuple[str, str, str]]:
+        """Derived (not asserted) triples as N-Triples terms."""
+        for s, p, o in self.inferred:
+            yield self._nt(s), self._nt(p), self._nt(o)
+
+    def write(self, path: str) -> int:
+        """Write the derived triples as N-Triples (sorted); returns their number."""
+        lines = sorted(f"{s} {p} {o} .\n" for s, p, o in self.iter_inferred())
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        return len(lines)
+
+    def report(self) -> Dict[str, Any]:
+        st = dict(self.stats)
+        st["triples"] = len(self.facts)
+        st["inferred_per_s"] = st["inferred"] / st["seconds"] if st["seconds"] else 0.0
+        st["rules"] = {c.rule.name: c.fires for c in self.rules}
+        return st
+
+    # ---------- persistence ----------
+    def save(self, path: str, key: str = ""):
+        """Facts and term dictionary, so a later run can add() without re-materializing."""
+        state = {"key": key, "terms": self.terms, "facts": self.facts, "inferred": self.inferred,
+                 "stats": self.stats}
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        import os
+        os.replace(path + ".tmp", path)
+
+    def restore(self, path: str, key: str = "") -> bool:
+        """Load state saved with the same key (TBox + rules); False if missing or stale."""
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return False
+        if state.get("key") != key:
+            return False
+        rules = [c.rule for c in self.rules]
+        self.terms, self.ids = [], {}
+        for k in state["terms"]:
+            self._id(k)
+        self.facts, self.inferred, self.stats = set(), state["inferred"], state["stats"]
+        self.ps.clear(); self.po.clear()
+        for t in state["facts"]:
+            self._insert(t)
+        self.type = self._id(RDF_TYPE)
+        self._sup_cache.clear(); self._pinfo.clear()
+        self.rules = []
+        for r in rules:
+            self.add_rule(r)
+        return True
+
+def reason_abox(abox_path: str, onto_path: str, rules_path: Optional[str] = None,
+                out_path: Optional[str] = None, state_path: Optional[str] = None,
+                added: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Materialize an ABox file; writes the derived triples to out_path
+    (default <abox>.inferred.nt). With state_path and added (N-Triples
+    lines without the trailing " .", as in a patch_abox delta, appended
+    since the saved run) only their consequences are computed; otherwise
+    the whole ABox is read.
+    """
+    import hashlib
+    from .vocab_snapshot import load_snapshot
+    snap = load_snapshot(onto_path)
+    rules = load_rules(rules_path) if rules_path else []
+    key = hashlib.sha1("\n".join([snap.data["source"]["sha256"], *(r.name for r in rules)])
+                       .encode("utf-8")).hexdigest()
+    r = Reasoner(snap, rules=rules)
+    incremental = bool(state_path and added is not None and r.restore(state_path, key))
+    with metrics.span("reason.materialize", incremental=incremental):
+        r.add(iter_nt_lines(l + " ." for l in added) if incremental else iter_abox(abox_path))
+    out_path = out_path or abox_path + ".inferred.nt"
+    n = r.write(out_path)
+    if state_path:
+        r.save(state_path, key)
+    st = r.report()
+    print(f"🧠 Reasoning: {n} derived triples from {st['asserted']} asserted "
+          f"({'incremental' if incremental else 'full'}, {st['rounds']} rounds, "
+          f"{st['inferred_per_s']:,.0f} inferred/s) → {out_path}")
+    return {"derived": n, "incremental": incremental, "out": out_path, **st}
@@ -1,11 +1,17 @@
 # pipeline/rules_ie.py
-import re
+import re, os, json, time, hashlib
+from typing import List, Dict, Any, Iterable, Optional, Union
+from . import metrics
 
 # Quick & dirty, extend freely
+# "triggers": lowercase keywords; a rule only runs on paragraphs containing one
+# (rules without triggers run on every paragraph).
 TUNNEL_RULES = [
     # Length
     {
+        "name": "tunnel_length",
         "pattern": r"(tunnel|structure)\s+length\s*[:\-]?\s*(\d{2,6})\s*m\b",
+        "triggers": ["length"],
         "subject": "{tunnel_id}",
         "predicate": "hasSpecification",
         "object": "{tunnel_id}_Spec",
@@ -13,7 +19,9 @@ TUNNEL_RULES = [
     },
     # Cross-passages
     {
+        "name": "cross_passages",
         "pattern": r"(cross passages?|cross-passages?)\s*[:\-]?\s*(\d{1,3})\b",
+        "triggers": ["cross"],
         "subject": "{tunnel_id}_Spec",
         "predicate": "numberOfCrossPassages",
         "object": "{2}",  # data
@@ -21,7 +29,9 @@ TUNNEL_RULES = [
     },
     # Hydrant pressure
     {
+        "name": "hydrant_pressure",
         "pattern": r"(hydrant).*?(pressure)\s*[:\-]?\s*(\d+(?:\.\d+)?)\s*bar",
+        "triggers": ["hydrant"],
         "subject": "{tunnel_id}",
         "predicate": "hasSafetyMeasure",
         "object": "{tunnel_id}_Hydrant",
@@ -29,7 +39,9 @@ TUNNEL_RULES = [
     },
     # Extinguisher weight
     {
+        "name": "extinguisher_weight",
         "pattern": r"(fire extinguisher).*?(weight)\s*[:\-]?\s*(\d+(?:\.\d+)?)\s*kg",
+        "triggers": ["extinguisher"],
         "subject": "{tunnel_id}",
         "predicate": "hasSafetyMeasure",
         "object": "{tunnel_id}_Extinguisher",
@@ -37,20 +49,123 @@ TUNNEL_RULES = [
     },
 ]
 
-def extract_with_rules(text: str, tunnel_id: str):
-    facts = []
-    datas = []
-    for rule in TUNNEL_RULES:
-        for m in re.finditer(rule["pattern"], text, flags=re.I | re.M | re.S):
-            subj = rule["subject"].format(tunnel_id=tunnel_id, **{str(i): m.group(i) for i in range(0, len(m.groups())+1)})
-            pred = rule["predicate"]
-            obj  = rule["object"].format(tunnel_id=tunnel_id, **{str(i): m.group(i) for i in range(0, len(m.groups())+1)})
-
-            # If object looks numeric but predicate is an object property, we'll still emit triple (subj pred obj)
-            facts.append((subj, pred, obj))
-
-            if "emit_data" in rule:
-                target, dp, cast, val = rule["emit_data"]
-                v = cast(val.format(tunnel_id=tunnel_id, **{str(i): m.group(i) for i in range(0, len(m.groups())+1)}))
-                datas.append((target, dp, v))
-    return facts, datas
+_CASTS = {"float": float, "int": int, "str": str}
+
+def load_rules(path: str) -> List[Dict[str, Any]]:
+    """
+    Load rules from a JSON or YAML file: a list of rule dicts (or
+    {"rules": [...]}) with the same keys as TUNNEL_RULES. emit_data is a
+    list [target, property, "float"|"int"|"str", value].
+    """
+    with open(path, encoding="utf-8") as f:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("PyYAML is required for YAML rule files (pip install pyyaml)") from e
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("rules", [])
+    return list(data)
+
+class RuleEngine:
+    """
+    Compiles rules once and scans text paragraph by paragraph: one pass of a
+    combined trigger regex picks the candidate rules for a paragraph, and
+    only those patterns run, bounded to that paragraph. Per-rule match
+    counts and time are kept in .stats.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        # fingerprint of the rule set, e.g. for manifest stage keys
+        blob = json.dumps(rules, sort_keys=True, default=lambda x: getattr(x, "__name__", str(x)))
+        self.key = hashlib.sha1(blob.encode("utf-8")).hexdigest()
+        self.rules = []
+        self.always: List[int] = []
+        self.by_trigger: Dict[str, List[int]] = {}
+        for i, rule in enumerate(rules):
+            emit = rule.get("emit_data")
+            if emit is not None:
+                target, dp, cast, val = emit
+                cast = _CASTS[cast] if isinstance(cast, str) else cast
+                emit = (target, dp, cast, val)
+            self.rules.append({
+                "name": rule.get("name") or f"rule_{i}",
+                "regex": re.compile(rule["pattern"], re.I | re.M | re.S),
+                "subject": rule["subject"],
+                "predicate": rule["predicate"],
+                "object": rule["object"],
+                "emit_data": emit,
+            })
+            triggers = [t.lower() for t in rule.get("triggers") or []]
+            if not triggers:
+                self.always.append(i)
+            for t in triggers:
+                self.by_trigger.setdefault(t, []).append(i)
+        alts = sorted(self.by_trigger, key=len, reverse=True)
+        self.trigger_re = re.compile("|".join(re.escape(t) for t in alts), re.I) if alts else None
+        self.stats = {r["name"]: {"matches": 0, "seconds": 0.0} for r in self.rules}
+
+    def _candidates(self, para: str) -> List[int]:
+        ids = set(self.always)
+        if self.trigger_re is not None:
+            for m in self.trigger_re.finditer(para):
+                ids.update(self.by_trigger[m.group().lower()])
+        return sorted(ids)
+
+    @metrics.timed("rules.extract")
+    def extract(self, paragraphs: Iterable[str], tunnel_id: str):
+        facts = []
+        datas = []
+        for para in paragraphs:
+            for i in self._candidates(para):
+                rule = self.rules[i]
+                t0 = time.perf_counter()
+                n = 0
+                for m in rule["regex"].finditer(para):
+                    n += 1
+                    # "{2}" is positional in str.format, so pass groups as args
+                    groups = (m.group(0),) + m.groups()
+                    subj = rule["subject"].format(*groups, tunnel_id=tunnel_id)
+                    pred = rule["predicate"]
+                    obj  = rule["object"].format(*groups, tunnel_id=tunnel_id)
+
+                    # If object looks numeric but predicate is an object property, we'll still emit triple (subj pred obj)
+                    facts.append((subj, pred, obj))
+
+                    if rule["emit_data"] is not None:
+                        target, dp, cast, val = rule["emit_data"]
+                        v = cast(val.format(*groups, tunnel_id=tunnel_id))
+                        datas.append((target.format(*groups, tunnel_id=tunnel_id), dp, v))
+                st = self.stats[rule["name"]]
+                st["matches"] += n
+                st["seconds"] += time.perf_counter() - t0
+        metrics.incr("rules.facts", len(facts))
+        metrics.incr("rules.data", len(datas))
+        return facts, datas
+
+    def extract_text(self, text: str, tunnel_id: str):
+        return self.extract((m.group() for m in re.finditer(r"[^\n]+", text)), tunnel_id)
+
+    def report(self, top: int = 10):
+        rows = sorted(self.stats.items(), key=lambda kv: -kv[1]["seconds"])[:top]
+        for name, st in rows:
+            print(f"  - {name}: matches={st['matches']} time={1e3 * st['seconds']:.2f} ms")
+
+_DEFAULT_ENGINE: Optional[RuleEngine] = None
+
+def get_engine(rules: Union[None, str, List[Dict[str, Any]]] = None) -> RuleEngine:
+    """Engine for a rules file or list; None gives the cached TUNNEL_RULES engine."""
+    global _DEFAULT_ENGINE
+    if rules is None:
+        if _DEFAULT_ENGINE is None:
+            _DEFAULT_ENGINE = RuleEngine(TUNNEL_RULES)
+        return _DEFAULT_ENGINE
+    if isinstance(rules, str):
+        rules = load_rules(rules)
+    return RuleEngine(rules)
+
+def extract_with_rules(text: str, tunnel_id: str, rules=None):
+    return get_engine(rules).extract_text(text, tunnel_id)
@@ -0,0 +1,540 @@
+# pipeline/triple_store.py
+import os, re, sqlite3, threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from rdflib import Graph, URIRef, Literal, BNode, RDF, XSD
+from .abox_writer import EX, _escape, _nt_term, _ttl_term, _XSD
+from .validator import _NT_LINE, _unescape
+from . import metrics
+
+PREFIXES = {"ex": str(EX), "rdf": str(RDF), "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+            "xsd": _XSD, "owl": "http://www.w3.org/2002/07/owl#",
+            "skos": "http://www.w3.org/2004/02/skos/core#"}
+_NUMERIC = {XSD.integer, XSD.int, XSD.long, XSD.decimal, XSD.float, XSD.double, XSD.short,
+            XSD.nonNegativeInteger, XSD.positiveInteger}
+_OPS = {"<": "<", "<=": "<=", ">": ">", ">=": ">=", "=": "=", "!=": "!="}
+
+IRI, LIT, BLANK = 0, 1, 2
+
+def _encode(term) -> Tuple[str, int, str, Optional[str], Optional[str], Optional[float]]:
+    """(nt, kind, value, datatype, lang, num) row for the terms table."""
+    if isinstance(term, Literal):
+        num = None
+        if term.datatype in _NUMERIC:
+            try:
+                num = float(term)
+            except (TypeError, ValueError):
+                pass
+        return (_nt_term(term), LIT, str(term), str(term.datatype) if term.datatype else None,
+                term.language, num)
+    if isinstance(term, BNode):
+        return (f"_:{term}", BLANK, str(term), None, None, None)
+    return (f"<{term}>", IRI, str(term), None, None, None)
+
+_NUMERIC_IRI = {str(x) for x in _NUMERIC}
+
+def _encode_resource(t: str) -> tuple:
+    if t[0] == "<":
+        return (t, IRI, t[1:-1], None, None, None)
+    return (t, BLANK, t[2:], None, None, None)
+
+def _encode_nt(path: str) -> Iterator[tuple]:
+    """Encoded rows of an N-Triples file without building rdflib terms."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            m = _NT_LINE.match(line)
+            if m is None:
+                g = Graph().parse(data=line, format="nt")  # rare forms the line regex skips
+                for s, p, o in g:
+                    yield _encode(s), _encode(p), _encode(o)
+                continue
+            s, p, o, lit, dt, lang = m.groups()
+            if o is not None:
+                yield _encode_resource(s), (f"<{p}>", IRI, p, None, None, None), _encode_resource(o)
+                continue
+            lit = _unescape(lit)
+            nt = f'"{_escape(lit)}"' + (f"@{lang}" if lang else f"^^<{dt}>" if dt else "")
+            num = None
+            if dt in _NUMERIC_IRI:
+                try:
+                    num = float(lit)
+                except ValueError:
+                    pass
+            yield _encode_resource(s), (f"<{p}>", IRI, p, None, None, None), (nt, LIT, lit, dt, lang, num)
+
+def _decode(kind: int, value: str, datatype: Optional[str], lang: Optional[str]):
+    if kind == LIT:
+        return Literal(value, lang=lang, datatype=URIRef(datatype) if datatype else None)
+    if kind == BLANK:
+        return BNode(value)
+    return URIRef(value)
+
+class TripleStore:
+    """
+    Persistent, indexed quad store in one SQLite file. Terms are dictionary
+    encoded to integer ids (numeric literals also keep their value in a
+    REAL column for range filters); quads (s, p, o, g) are indexed as SPO
+    (the primary key), POS and OSP, so any pattern with a bound position is
+    an index range scan. g is a graph id per document (0 = default graph),
+    so one document's triples can be replaced without touching the rest.
+
+        store = TripleStore("output/corpus/abox.sqlite")
+        store.bulk_load(graph, graph="file:///…/Building_X.docx", replace=True)
+        store.query([("?h", "rdf:type", "ex:Hydrant"), ("?h", "ex:pressure", "?p")],
+                    filters=[("?p", "<", 6)])
+    """
+
+    def __init__(self, path: str, readonly: bool = False, prefixes: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.prefixes = {**PREFIXES, **(prefixes or {})}
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}  # nt → id, bounded write-through cache
+        self._terms: Dict[int, Any] = {}  # id → rdflib term, bounded read cache
+        if readonly:
+            self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS terms (
+                    id INTEGER PRIMARY KEY, nt TEXT NOT NULL UNIQUE, kind INTEGER NOT NULL,
+                    value TEXT NOT NULL, datatype TEXT, lang TEXT, num REAL);
+                CREATE TABLE IF NOT EXISTS quads (
+                    s INTEGER NOT NULL, p INTEGER NOT NULL, o INTEGER NOT NULL, g INTEGER NOT NULL,
+                    PRIMARY KEY (s, p, o, g)) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS quads_pos ON quads (p, o, s);
+                CREATE INDEX IF NOT EXISTS quads_osp ON quads (o, s, p);
+                CREATE INDEX IF NOT EXISTS quads_g ON quads (g);""")
+            self._db.commit()
+        self._db.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        """Distinct triples over all graphs, as query() and match() see them (not quads)."""
+        return self.count()
+
+    # ---------- terms ----------
+    def _resolve(self, term) -> Optional[int]:
+        """Id of an existing term (rdflib term, "<iri>", "prefix:local" or a full IRI)."""
+        nt = _encode(self._term(term))[0]
+        i = self._ids.get(nt)
+        if i is None:
+            row = self._db.execute("SELECT id FROM terms WHERE nt = ?", (nt,)).fetchone()
+            i = row[0] if row else None
+        return i
+
+    def _term(self, x):
+        if isinstance(x, (URIRef, Literal, BNode)):
+            return x
+        if isinstance(x, str):
+            if x.startswith("<") and x.endswith(">"):
+                return URIRef(x[1:-1])
+            if x == "a":
+                return RDF.type
+            pref, sep, local = x.partition(":")
+            if sep and pref in self.prefixes and not local.startswith("//"):
+                return URIRef(self.prefixes[pref] + local)
+            return URIRef(x)
+        return Literal(x)
+
+    def _intern(self, nts: Dict[str, tuple]) -> None:
+        """Make sure every encoded term in nts has an id (fills self._ids)."""
+        todo = [nt for nt in nts if nt not in self._ids]
+        for i in range(0, len(todo), 500):
+            part = todo[i:i + 500]
+            q = f"SELECT nt, id FROM terms WHERE nt IN ({','.join('?' * len(part))})"
+            self._ids.update(self._db.execute(q, part).fetchall())
+        new = [nts[nt] for nt in todo if nt not in self._ids]
+        if new:
+            start = (self._db.execute("SELECT MAX(id) FROM terms").fetchone()[0] or 0) + 1
+            rows = [(start + k, *row) for k, row in enumerate(new)]
+            self._db.executemany("INSERT INTO terms VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._ids.update((r[1], r[0]) for r in rows)
+
+    def _decode_ids(self, ids: Iterable[int]):
+        todo = [i for i in set(ids) if i not in self._terms]
+        if len(self._terms) + len(todo) > 1_000_000:
+            self._terms.clear()
+            todo = list(set(ids))
+        for k in range(0, len(todo), 500):
+            part = todo[k:k + 500]
+            q = f"SELECT id, kind, value, datatype, lang FROM terms WHERE id IN ({','.join('?' * len(part))})"
+            for i, kind, value, dt, lang in self._db.execute(q, part):
+                self._terms[i] = _decode(kind, value, dt, lang)
+
+    def _graph_id(self, graph) -> int:
+        if graph is None:
+            return 0
+        enc = _encode(self._term(graph))
+        self._intern({enc[0]: enc})
+        return self._ids[enc[0]]
+
+    # ---------- loading ----------
+    def bulk_load(self, triples: Iterable[Tuple[Any, Any, Any]], graph=None, replace: bool = False,
+                  batch: int = 50_000) -> int:
+        """
+        Insert rdflib triples (a Graph or any iterable of (s, p, o) terms)
+        into graph (None = default graph); replace=True first drops that
+        graph's triples. Returns the number of new quads.
+        """
+        return self._load(((_encode(s), _encode(p), _encode(o)) for s, p, o, *_ in triples),
+                          graph, replace, batch)
+
+    def load_file(self, path: str, graph=None, replace: bool = True, batch: int = 50_000) -> int:
+        """
+        Load an ABox file; graph defaults to the file's URI. N-Triples are
+        encoded straight from the lines, other formats go through rdflib.
+        """
+        graph = graph if graph is not None else URIRef(_file_uri(path))
+        if path.endswith(".nt"):
+            return self._load(_encode_nt(path), graph, replace, batch)
+        from rdflib.util import guess_format
+        g = Graph()
+        g.parse(path, format=guess_format(path) or "turtle")
+        return self.bulk_load(g, graph=graph, replace=replace, batch=batch)
+
+    def _load(self, rows: Iterable[tuple], graph, replace: bool, batch: int) -> int:
+        # into an empty store the POS/OSP indexes are built once at the end
+        # instead of being maintained row by row
+        with self._lock, metrics.span("store.load"):
+            db = self._db
+            db.execute("BEGIN IMMEDIATE")
+            n = inserted = 0
+            try:
+                g = self._graph_id(graph)
+                if replace:
+                    db.execute("DELETE FROM quads WHERE g = ?", (g,))
+                empty = db.execute("SELECT 1 FROM quads LIMIT 1").fetchone() is None
+                if empty:
+                    for idx in ("quads_pos", "quads_osp", "quads_g"):
+                        db.execute(f"DROP INDEX IF EXISTS {idx}")
+                keys: List[Tuple[str, str, str]] = []
+                enc: Dict[str, tuple] = {}
+                for row in rows:
+                    for e in row:
+                        if e[0] not in enc:
+                            enc[e[0]] = e
+                    keys.append((row[0][0], row[1][0], row[2][0]))
+                    if len(keys) >= batch:
+                        inserted += self._insert(keys, enc, g)
+                        n += len(keys); keys.clear(); enc.clear()
+                if keys:
+                    inserted += self._insert(keys, enc, g)
+                    n += len(keys)
+                if empty:
+                    db.execute("CREATE INDEX IF NOT EXISTS quads_pos ON quads (p, o, s)")
+                    db.execute("CREATE INDEX IF NOT EXISTS quads_osp ON quads (o, s, p)")
+                    db.execute("CREATE INDEX IF NOT EXISTS quads_g ON quads (g)")
+                db.commit()
+            except BaseException:
+                db.rollback()
+                self._ids.clear()
+                raise
+        metrics.incr("store.triples_in", n)
+        metrics.incr("store.quads_added", inserted)
+        print(f"🗄️ Store: loaded {n} triples ({inserted} new) into {self.path}")
+        return inserted
+
+    def _insert(self, keys: List[Tuple[str, str, str]], enc: Dict[str, tuple], g: int) -> int:
+        self._intern(enc)
+        ids = self._ids
+        cur = self._db.executemany("INSERT OR IGNORE INTO quads VALUES (?, ?, ?, ?)",
+                                   [(ids[s], ids[p], ids[o], g) for s, p, o in keys])
+        if len(ids) > 2_000_000:
+            ids.clear()
+        return cur.rowcount
+
+    def delete_graph(self, graph) -> int:
+        g = self._resolve(graph)
+        if g is None:
+            return 0
+        with self._lock:
+            n = self._db.execute("DELETE FROM quads WHERE g = ?", (g,)).rowcount
+            self._db.commit()
+        return n
+
+    def graphs(self) -> List[Any]:
+        ids = [r[0] for r in self._db.execute("SELECT DISTINCT g FROM quads WHERE g != 0")]
+        self._decode_ids(ids)
+        return [self._terms[i] for i in ids]
+
+    # ---------- queries ----------
+    def _rows(self, sql: str, params: Sequence[Any], width: int) -> Iterator[tuple]:
+        cur = self._db.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(10_000)
+            if not rows:
+                return
+            self._decode_ids(i for r in rows for i in r[:width])
+            terms = self._terms
+            for r in rows:
+                yield tuple(terms[i] for i in r[:width])
+
+    def match(self, s=None, p=None, o=None, graph=None) -> Iterator[Tuple[Any, Any, Any]]:
+        """Triples matching a pattern; None is a wildcard."""
+        where, params = [], []
+        for col, x in (("s", s), ("p", p), ("o", o), ("g", graph)):
+            if x is None:
+                continue
+            i = self._resolve(x)
+            if i is None:
+                return
+            where.append(f"{col} = ?"); params.append(i)
+        sql = "SELECT DISTINCT s, p, o FROM quads" + (" WHERE " + " AND ".join(where) if where else "")
+        with metrics.span("store.match"):
+            yield from self._rows(sql, params, 3)
+
+    def count(self, s=None, p=None, o=None, graph=None) -> int:
+        """Triples matching a pattern, each counted once however many graphs hold it."""
+        where, params = [], []
+        for col, x in (("s", s), ("p", p), ("o", o), ("g", graph)):
+            if x is None:
+                continue
+            i = self._resolve(x)
+            if i is None:
+                return 0
+            where.append(f"{col} = ?"); params.append(i)
+        sql = "SELECT DISTINCT s, p, o FROM quads" + (" WHERE " + " AND ".join(where) if where else "")
+        return self._db.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+
+    def query(self, patterns: Sequence[Tuple[Any, Any, Any]], filters: Sequence[Tuple[str, str, Any]] = (),
+              select: Optional[Sequence[str]] = None, distinct: bool = True,
+              limit: Optional[int] = None, graph=None) -> Iterator[Dict[str, Any]]:
+        """
+        Basic graph pattern: patterns are (s, p, o) with "?var" variables
+        and constants (rdflib terms, "<iri>", "prefix:local"; a Python
+        number matches any numeric literal of that value). filters are
+        (var, op, value) with op one of < <= > >= = != (numbers compare
+        numerically, strings against the lexical value) or "contains".
+        Yields {var: term}; the whole pattern runs as one SQL join over the
+        given graph, or over the distinct triples of all graphs.
+        """
+        frm, where, params = [], [], []
+        cols: Dict[str, str] = {}
+        term_alias: Dict[str, str] = {}
+
+        def term_of(var: str) -> str:
+            a = term_alias.get(var)
+            if a is None:
+                a = term_alias[var] = f"v{len(term_alias)}"
+                frm.append(f"terms {a}")
+                where.append(f"{a}.id = {cols[var]}")
+            return a
+
+        gid = None
+        if graph is not None:
+            gid = self._resolve(graph)
+            if gid is None:
+                return
+        for k, pat in enumerate(patterns):
+            t = f"t{k}"
+            frm.append(f"quads {t}")
+            if gid is not None:
+                where.append(f"{t}.g = ?"); params.append(gid)
+            else:
+                # union of all graphs: a triple stored in several graphs joins once, through
+                # its lowest graph (a primary-key lookup, so the pattern indexes still apply)
+                where.append(f"{t}.g = (SELECT MIN(q.g) FROM quads q "
+                             f"WHERE q.s = {t}.s AND q.p = {t}.p AND q.o = {t}.o)")
+            for col, x in zip("spo", pat):
+                ref = f"{t}.{col}"
+                if isinstance(x, str) and x.startswith("?"):
+                    if x in cols:
+                        where.append(f"{ref} = {cols[x]}")
+                    else:
+                        cols[x] = ref
+                elif isinstance(x, (int, float)) and not isinstance(x, bool):
+                    a = f"n{k}{col}"
+                    frm.append(f"terms {a}")
+                    where += [f"{a}.id = {ref}", f"{a}.num = ?"]
+                    params.append(float(x))
+                else:
+                    i = self._resolve(x)
+                    if i is None:
+                        return
+                    where.append(f"{ref} = ?"); params.append(i)
+
+        for var, op, value in filters:
+            if var not in cols:
+                raise ValueError(f"filter on unbound variable {var}")
+            a = term_of(var)
+            if op == "contains":
+                where.append(f"instr({a}.value, ?) > 0"); params.append(str(value))
+            elif op not in _OPS:
+                raise ValueError(f"unsupported filter operator {op!r}")
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                where.append(f"{a}.num {_OPS[op]} ?"); params.append(float(value))
+            else:
+                where.append(f"{a}.value {_OPS[op]} ?"); params.append(str(value))
+
+        names = list(select) if select else list(cols)
+        missing = [v for v in names if v not in cols]
+        if missing:
+            raise ValueError(f"unbound variables in select: {missing}")
+        sql = (f"SELECT {'DISTINCT ' if distinct else ''}{', '.join(cols[v] for v in names) or '1'} "
+               f"FROM {', '.join(frm)}" + (f" WHERE {' AND '.join(where)}" if where else ""))
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        keys = [v[1:] for v in names]
+        with metrics.span("store.query"):
+            for row in self._rows(sql, params, len(names)):
+                yield dict(zip(keys, row))
+
+    def sparql(self, q: str) -> Iterator[Dict[str, Any]]:
+        """
+        The SPARQL subset query() can run: PREFIX lines, SELECT [DISTINCT]
+        vars|*, one WHERE block of triple patterns ("." separated, "a" for
+        rdf:type), FILTER(?v op value && …) and LIMIT.
+        """
+        patterns, filters, select, distinct, limit = parse_sparql(q, self.prefixes)
+        return self.query(patterns, filters, select=select, distinct=distinct, limit=limit)
+
+    # ---------- export ----------
+    def export(self, path: str, graph=None) -> int:
+        """Write N-Triples (.nt) or Turtle (anything else), streamed in subject order."""
+        n = 0
+        last_s = None
+        with metrics.span("store.export"), open(path, "w", encoding="utf-8") as f:
+            ttl = not path.endswith(".nt")
+            if ttl:
+                f.write(f"@prefix ex: <{EX}> .\n@prefix xsd: <{_XSD}> .\n\n")
+            where, params = "", []
+            if graph is not None:
+                g = self._resolve(graph)
+                where, params = " WHERE g = ?", [g if g is not None else -1]
+            # SPO order keeps each subject's triples together for Turtle ";" grouping
+            sql = f"SELECT DISTINCT s, p, o FROM quads{where} ORDER BY s, p, o"
+            for s, p, o in self._rows(sql, params, 3):
+                n += 1
+                if not ttl:
+                    f.write(f"{_out(s, False)} {_out(p, False)} {_out(o, False)} .\n")
+                    continue
+                st, pt, ot = _out(s, True), "a" if p == RDF.type else _out(p, True), _out(o, True)
+                if st == last_s:
+                    f.write(f" ;\n    {pt} {ot}")
+                else:
+                    if last_s is not None:
+                        f.write(" .\n")
+                    f.write(f"{st} {pt} {ot}")
+                    last_s = st
+            if ttl and last_s is not None:
+                f.write(" .\n")
+        print(f"✅ Store exported: {path}  ({n} triples)")
+        return n
+
+    def to_graph(self, graph=None) -> Graph:
+        g = Graph()
+        g.bind("ex", EX)
+        for t in self.match(graph=graph):
+            g.add(t)
+        return g
+
+def _file_uri(path: str) -> str:
+    import pathlib
+    return pathlib.Path(path).resolve().as_uri()
+
+def _out(term, ttl: bool) -> str:
+    if isinstance(term, BNode):
+        return f"_:{term}"
+    return _ttl_term(term) if ttl else _nt_term(term)
+
+# ---------- SPARQL subset ----------
+_TOKEN = re.compile(r'''\s*(<[^>]*>|"(?:[^"\\]|\\.)*"(?:\^\^\S+?(?=[\s.;)]|$)|@[\w-]+)?|\?\w+|[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?
+                        |&&|<=|>=|!=|[<>=(){}.;*]|[A-Za-z_][\w-]*:[\w.-]*[\w-]|[A-Za-z_][\w-]*:|\w+)''', re.X)
+
+def _tokens(q: str) -> List[str]:
+    out, pos = [], 0
+    q = re.sub(r"(?m)^\s*#.*$", "", q)
+    while pos < len(q):
+        m = _TOKEN.match(q, pos)
+        if m is None:
+            if q[pos:].strip():
+                raise ValueError(f"cannot parse SPARQL near {q[pos:pos + 30]!r}")
+            break
+        out.append(m.group(1)); pos = m.end()
+    return out
+
+def parse_sparql(q: str, prefixes: Dict[str, str]):
+    """(patterns, filters, select, distinct, limit) for TripleStore.query."""
+    toks = _tokens(q)
+    prefixes = dict(prefixes)
+    k = 0
+    def take(expected: Optional[str] = None) -> str:
+        nonlocal k
+        if k >= len(toks):
+            raise ValueError("unexpected end of query")
+        t = toks[k]; k += 1
+        if expected is not None and t.upper() != expected:
+            raise ValueError(f"expected {expected}, got {t!r}")
+        return t
+    def term(t: str):
+        if t.startswith("?") or t == "a":
+            return t
+        if t.startswith("<"):
+            return URIRef(t[1:-1])
+        if t.startswith('"'):
+            m = re.match(r'"((?:[^"\\]|\\.)*)"(?:\^\^(\S+)|@([\w-]+))?$', t)
+            dt = m.group(2)
+            if dt:
+                dt = dt[1:-1] if dt.startswith("<") else prefixes[dt.split(":", 1)[0]] + dt.split(":", 1)[1]
+            lex = _unescape(m.group(1))
+            return Literal(lex, datatype=dt, lang=m.group(3))
+        if re.fullmatch(r"[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?", t):
+            return float(t) if re.search(r"[.eE]", t) else int(t)
+        pref, _, local = t.partition(":")
+        if pref not in prefixes:
+            raise ValueError(f"unknown prefix {pref!r}")
+        return URIRef(prefixes[pref] + local)
+
+    while k < len(toks) and toks[k].upper() == "PREFIX":
+        take(); name = take().rstrip(":"); prefixes[name] = take()[1:-1]
+    take("SELECT")
+    distinct = k < len(toks) and toks[k].upper() == "DISTINCT"
+    if distinct:
+        take()
+    select = []
+    while toks[k].upper() not in ("WHERE", "{"):
+        t = take()
+        if t != "*":
+            select.append(t)
+    if toks[k].upper() == "WHERE":
+        take()
+    take("{")
+    patterns, filters, cur = [], [], []
+    while toks[k] != "}":
+        t = take()
+        if t.upper() == "FILTER":
+            take("(")
+            while True:
+                var, op, val = take(), take(), take()
+                filters.append((var, op, term(val)))
+                if toks[k] == "&&":
+                    take(); continue
+                take(")")
+                break
+        elif t == ".":
+            if cur:
+                raise ValueError(f"incomplete triple pattern {cur}")
+        elif t == ";":  # same subject, new predicate/object
+            cur = [patterns[-1][0]]
+        else:
+            cur.append(term(t))
+            if len(cur) == 3:
+                patterns.append(tuple(RDF.type if x == "a" else x for x in cur)); cur = []
+    take("}")
+    limit = None
+    if k < len(toks) and toks[k].upper() == "LIMIT":
+        take(); limit = int(take())
+    return patterns, filters, select or None, distinct, limit
@@ -0,0 +1,399 @@
+# pipeline/validator.py
+# README step 7. TBox domain/range/datatype axioms (from the vocab snapshot)
+# and a subset of SHACL are compiled into per-predicate check tables; the
+# ABox is then validated as a stream of triples. Checks that depend on a
+# node's rdf:type are deferred until the stream ends, since the type triple
+# may come after the triples that use the node.
+import re, json, datetime, operator, functools
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from . import metrics
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+SH = "http://www.w3.org/ns/shacl#"
+# annotation-ish predicates that are always allowed
+BUILTIN = {RDF_TYPE, "http://www.w3.org/2000/01/rdf-schema#label",
+           "http://www.w3.org/2000/01/rdf-schema#comment",
+           "http://www.w3.org/2004/02/skos/core#prefLabel",
+           "http://www.w3.org/2004/02/skos/core#altLabel",
+           "http://www.w3.org/2002/07/owl#sameAs"}
+
+_NUMERIC = {"decimal", "float", "double", "integer", "int", "long", "short", "byte",
+            "nonNegativeInteger", "positiveInteger", "negativeInteger", "nonPositiveInteger",
+            "unsignedInt", "unsignedLong", "unsignedShort", "unsignedByte"}
+_INTEGER = _NUMERIC - {"decimal", "float", "double"}
+
+# (s, p, o, o_is_literal, datatype) — plain strings, IRIs without <>
+Triple = Tuple[str, str, str, bool, Optional[str]]
+
+@functools.lru_cache(maxsize=1 << 16)  # predicates, classes and datatypes repeat
+def local(iri: str) -> str:
+    return iri[max(iri.rfind("#"), iri.rfind("/")) + 1:]
+
+def _lexical_ok(dtype: str, value: str) -> bool:
+    name = local(dtype)
+    try:
+        if name in _INTEGER:
+            int(value)
+        elif name in _NUMERIC:
+            float(value)
+        elif name == "boolean":
+            return value in ("true", "false", "1", "0")
+        elif name in ("date", "dateTime"):
+            datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    return True
+
+def _datatype_ok(expected: str, value: str, actual: Optional[str], exact: bool = False) -> bool:
+    """
+    Literal value/actual datatype against an expected datatype. TBox ranges
+    let numeric types interconvert (the writer emits xsd:float for a
+    decimal range); exact=True is SHACL's sh:datatype, same IRI only, except
+    that any numeric type satisfies a numeric one whose lexical form it
+    fits (the writer types "7" as xsd:integer, "7.5" as xsd:float).
+    """
+    exp, act = local(expected), local(actual) if actual else "string"
+    if exact:
+        if exp != act and not (exp in _NUMERIC and act in _NUMERIC):
+            return False
+    elif exp in _NUMERIC:
+        if act not in _NUMERIC and act != "string":
+            return False
+        if act == "string" and actual is not None:
+            return False  # "12"^^xsd:string is not a number
+    elif exp != act and not (exp == "string" and actual is None):
+        return False
+    return _lexical_ok(expected, value)
+
+# ---------- N-Triples / rdflib input ----------
+# shared with triple_store: subject/object keep their <> or _: so blank nodes stay distinct
+_NT_LINE = re.compile(r'^\s*(<[^>]*>|_:\S+)\s+<([^>]*)>\s+(?:(<[^>]*>|_:\S+)|"((?:[^"\\]|\\.)*)"'
+                      r'(?:\^\^<([^>]*)>|@([\w-]+))?)\s*\.\s*$')
+_ESC = re.compile(r'\\(?:[\\"\'nrtbf]|u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8})')
+_UNESC = {"\\\\": "\\", '\\"': '"', "\\'": "'", "\\n": "\n", "\\r": "\r", "\\t": "\t",
+          "\\b": "\b", "\\f": "\f"}
+
+def _unescape(lit: str) -> str:
+    """Lexical form of an N-Triples string body (ECHAR and \\u/\\U escapes)."""
+    if "\\" not in lit:
+        return lit
+    return _ESC.sub(lambda m: _UNESC.get(m.group()) or chr(int(m.group()[2:], 16)), lit)
+
+def iter_nt_lines(lines: Iterable[str], source: str = "<lines>") -> Iterator[Triple]:
+    """Triples of N-Triples lines (e.g. the "add" lines of a patch_abox delta)."""
+    for n, line in enumerate(lines, 1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        m = _NT_LINE.match(line)
+        if m is None:
+            raise ValueError(f"{source}:{n}: not an N-Triples line")
+        s, p, o, lit, dt, _ = m.groups()
+        s = s[1:-1] if s[0] == "<" else s
+        if o is not None:
+            yield s, p, o[1:-1] if o[0] == "<" else o, False, None
+        else:
+            yield s, p, _unescape(lit), True, dt
+
+def iter_nt(path: str) -> Iterator[Triple]:
+    """Triples of an N-Triples file, line by line (as written by write_abox_stream/patch_abox)."""
+    with open(path, encoding="utf-8") as f:
+        yield from iter_nt_lines(f, path)
+
+def iter_graph(g) -> Iterator[Triple]:
+    from rdflib import Literal
+    for s, p, o in g:
+        if isinstance(o, Literal):
+            yield str(s), str(p), str(o), True, str(o.datatype) if o.datatype else None
+        else:
+            yield str(s), str(p), str(o), False, None
+
+def iter_abox(path: str) -> Iterator[Triple]:
+    """.nt files stream; anything else is parsed with rdflib first (format from the extension)."""
+    if path.endswith(".nt"):
+        yield from iter_nt(path)
+        return
+    from rdflib import Graph
+    from rdflib.util import guess_format
+    g = Graph()
+    g.parse(path, format=guess_format(path) or "turtle")
+    yield from iter_graph(g)
+
+# ---------- compiled constraints ----------
+class _Shape:
+    __slots__ = ("name", "target", "path", "datatype", "cls", "min_count", "max_count",
+                 "min_incl", "max_incl", "min_excl", "max_excl", "pattern", "values", "severity",
+                 "pred", "bounds")
+
+    def __init__(self, **kw):
+        for k in self.__slots__:
+            setattr(self, k, kw.get(k))
+        self.pred = local(self.path)
+        self.bounds = [(b, op, name) for b, op, name in (
+            (self.min_incl, operator.ge, "sh:minInclusive"), (self.max_incl, operator.le, "sh:maxInclusive"),
+            (self.min_excl, operator.gt, "sh:minExclusive"), (self.max_excl, operator.lt, "sh:maxExclusive"))
+            if b is not None]
+
+    def value_errors(self, o: str, lit: bool, dtype: Optional[str]) -> List[Tuple[str, str]]:
+        """(constraint, message) for value-level failures; sh:class is deferred."""
+        errs = []
+        if self.datatype and (not lit or not _datatype_ok(self.datatype, o, dtype, exact=True)):
+            errs.append(("sh:datatype", f"expected {local(self.datatype)}"))
+        for bound, ok, name in self.bounds:
+            try:
+                good = lit and ok(float(o), bound)
+            except ValueError:
+                good = False
+            if not good:
+                errs.append((name, f"{o!r} vs {bound:g}"))
+        if self.pattern is not None and not self.pattern.search(o):
+            errs.append(("sh:pattern", f"does not match {self.pattern.pattern!r}"))
+        if self.values is not None and o not in self.values:
+            errs.append(("sh:in", "not an allowed value"))
+        return errs
+
+def load_shapes(path: str) -> List[_Shape]:
+    """
+    The supported SHACL subset: NodeShapes with sh:targetClass and
+    sh:property shapes using sh:path (a single IRI), sh:datatype, sh:class,
+    sh:minCount/maxCount, sh:min/maxInclusive, sh:min/maxExclusive,
+    sh:pattern, sh:in and sh:severity. Anything else is ignored with a warning.
+    """
+    from rdflib import Graph, Namespace, URIRef
+    from rdflib.collection import Collection
+    S = Namespace(SH)
+    g = Graph()
+    g.parse(path)
+    known = {S.path, S.datatype, S["class"], S.minCount, S.maxCount, S.minInclusive, S.maxInclusive,
+             S.minExclusive, S.maxExclusive, S.pattern, S["in"], S.severity, S.name, S.description,
+             S.message, S.order, S.group}
+    shapes, ignored = [], set()
+    num = lambda v: float(v) if v is not None else None
+    for node in set(g.subjects(S.targetClass, None)):
+        severity = local(str(g.value(node, S.severity) or S.Violation))
+        for target in g.objects(node, S.targetClass):
+            for ps in g.objects(node, S.property):
+                path = g.value(ps, S.path)
+                if not isinstance(path, URIRef):
+                    ignored.add("complex sh:path")
+                    continue
+                ignored.update(local(str(p)) for p in g.predicates(ps, None) if p not in known
+                               and str(p).startswith(SH))
+                vals = g.value(ps, S["in"])
+                pat = g.value(ps, S.pattern)
+                cnt = lambda q: int(g.value(ps, q)) if g.value(ps, q) is not None else None
+                shapes.append(_Shape(
+                    name=str(g.value(ps, S.name) or f"{local(str(target))}.{local(str(path))}"),
+                    target=local(str(target)), path=str(path),
+                    datatype=str(g.value(ps, S.datatype)) if g.value(ps, S.datatype) else None,
+                    cls=local(str(g.value(ps, S["class"]))) if g.value(ps, S["class"]) else None,
+                    min_count=cnt(S.minCount), max_count=cnt(S.maxCount),
+                    min_incl=num(g.value(ps, S.minInclusive)), max_incl=num(g.value(ps, S.maxInclusive)),
+                    min_excl=num(g.value(ps, S.minExclusive)), max_excl=num(g.value(ps, S.maxExclusive)),
+                    pattern=re.compile(str(pat)) if pat is not None else None,
+                    values={str(v) for v in Collection(g, vals)} if vals is not None else None,
+                    severity=local(str(g.value(ps, S.severity) or severity))))
+    if ignored:
+        print(f"⚠️ SHACL features not supported, ignored: {', '.join(sorted(ignored))}")
+    return shapes
+
+class Validator:
+    """
+    Streaming ABox validator. Predicates and classes are matched by local
+    name, so an ABox in the ex: namespace validates against the ontology's
+    own base IRI. Checks:
+
+    - unknown-predicate / unknown-class: not in the TBox (strict=True)
+    - kind: literal on an object property, IRI on a data property
+    - datatype: literal does not fit the data property's range
+    - domain / range: subject / object not typed with a (subclass of the)
+      declared class; nodes with no rdf:type at all are reported once as
+      "untyped" warnings instead
+    - SHACL (load_shapes): value constraints, sh:class and min/maxCount on
+      nodes of the target class or its subclasses
+
+    feed() may be called repeatedly; finish() runs the deferred checks and
+    returns the report. Only max_examples violations are kept verbatim,
+    counts cover all of them.
+    """
+
+    def __init__(self, snap, shapes: Optional[str] = None, strict: bool = True,
+                 max_examples: int = 1000):
+        self.strict = strict
+        self.max_examples = max_examples
+        self.classes: Set[str] = {c["name"] for c in snap.classes}
+        parents = {c["name"]: c["parents"] for c in snap.classes}
+        self._anc: Dict[str, frozenset] = {}
+        for c in self.classes:
+            self._ancestors(c, parents)
+
+        # predicate local name → (kind, domains, ranges or datatype)
+        self.props: Dict[str, Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = {}
+        for p in snap.obj_props + snap.data_props:
+            self.props[p["name"]] = (p["kind"], tuple(p["domain"]), tuple(p["range"]))
+        self.shapes: Dict[str, List[_Shape]] = {}
+        self._count_shapes: List[_Shape] = []
+        for sh in (load_shapes(shapes) if shapes else []):
+            self.shapes.setdefault(sh.pred, []).append(sh)
+            if sh.min_count is not None or sh.max_count is not None:
+                self._count_shapes.append(sh)
+        self._count_preds = {sh.pred for sh in self._count_shapes}
+        self._local: Dict[str, str] = {}  # IRI → local name, for predicates and classes
+        self.reset()
+
+    def _ancestors(self, c: str, parents: Dict[str, List[str]]) -> frozenset:
+        hit = self._anc.get(c)
+        if hit is None:
+            self._anc[c] = frozenset([c])  # cycle guard
+            out = {c}
+            for p in parents.get(c, ()):
+                out |= self._ancestors(p, parents)
+            hit = self._anc[c] = frozenset(out)
+        return hit
+
+    def reset(self):
+        self.triples = 0
+        self.counts: Counter = Counter()
+        self.examples: List[Dict[str, Any]] = []
+        self._types: Dict[str, Set[str]] = {}
+        self._need: Dict[Tuple[str, str], Tuple[str, str, str]] = {}  # (node, class) → (check, pred, role)
+        # (focus, shape, check) → [count, first value, message], for foci not yet known to be targets
+        self._shape_fail: Dict[Tuple[str, _Shape, str], list] = {}
+        self._shape_class: Dict[Tuple[str, str], Tuple[str, _Shape]] = {}
+        self._card: Counter = Counter()
+
+    # ---------- recording ----------
+    def _violation(self, check: str, focus: str, path: Optional[str] = None, value: Any = None,
+                   message: str = "", severity: str = "Violation", count: int = 1):
+        self.counts[(severity, check)] += count
+        if len(self.examples) < self.max_examples:
+            self.examples.append({"severity": severity, "check": check, "focus": focus,
+                                  "path": path, "value": value, "message": message})
+
+    def _require(self, node: str, cls: str, check: str, pred: str, role: str):
+        self._need.setdefault((node, cls), (check, pred, role))
+
+    # ---------- streaming pass ----------
+    def feed(self, triples: Iterable[Triple]):
+        props, shapes, strict = self.props, self.shapes, self.strict
+        types, names = self._types, self._local
+        n = 0
+        with metrics.span("validate.feed"):
+            for s, p, o, lit, dtype in triples:
+                n += 1
+                if p == RDF_TYPE:
+                    c = names.get(o)
+                    if c is None:
+                        c = names[o] = local(o)
+                    types.setdefault(s, set()).add(c)
+                    if strict and c not in self.classes:
+                        self._violation("unknown-class", s, p, o, f"{c} is not a TBox class")
+                    continue
+                name = names.get(p)
+                if name is None:
+                    name = names[p] = local(p)
+                for sh in shapes.get(name, ()):
+                    errs = sh.value_errors(o, lit, dtype)
+                    # types only grow: a focus already of the target class fails for good
+                    target = errs and self._is_a(s, sh.target)
+                    for check, msg in errs:
+                        if target:
+                            self._violation(check, s, sh.name, o, msg, sh.severity)
+                            continue
+                        hit = self._shape_fail.get((s, sh, check))
+                        if hit is None:
+                            self._shape_fail[(s, sh, check)] = [1, o, msg]
+                        else:
+                            hit[0] += 1
+                    if sh.cls and not lit:
+                        self._shape_class.setdefault((o, sh.cls), (s, sh))
+                if name in self._count_preds:
+                    self._card[(s, name)] += 1
+                spec = props.get(name)
+                if spec is None:
+                    if strict and p not in BUILTIN:
+                        self._violation("unknown-predicate", s, p, o, f"{name} is not a TBox property")
+                    continue
+                kind, domains, ranges = spec
+                for d in domains:
+                    self._require(s, d, "domain", name, "subject")
+                if kind == "object":
+                    if lit:
+                        self._violation("kind", s, name, o, "literal on an object property")
+                    else:
+                        for r in ranges:
+                            self._require(o, r, "range", name, "object")
+                elif not lit:
+                    self._violation("kind", s, name, o, "IRI on a data property")
+                else:
+                    for r in ranges:
+                        if r.startswith(XSD) and not _datatype_ok(r, o, dtype):
+                            self._violation("datatype", s, name, o, f"expected {local(r)}")
+        self.triples += n
+        metrics.incr("validate.triples", n)
+        return self
+
+    # ---------- deferred checks ----------
+    def _is_a(self, node: str, cls: str) -> Optional[bool]:
+        """None when the node has no type at all."""
+        ts = self._types.get(node)
+        if not ts:
+            return None
+        anc = self._anc
+        return any(cls in anc.get(t, (t,)) for t in ts)
+
+    def finish(self) -> Dict[str, Any]:
+        with metrics.span("validate.finish"):
+            untyped = set()
+            for (node, cls), (check, pred, role) in self._need.items():
+                ok = self._is_a(node, cls)
+                if ok is None:
+                    if node not in untyped:
+                        untyped.add(node)
+                        self._violation("untyped", node, pred, None,
+                                        f"{role} of {pred} has no rdf:type (expected {cls})", "Warning")
+                elif not ok:
+                    self._violation(check, node, pred, cls, f"{role} of {pred} is not a {cls}")
+
+            for (focus, sh, check), (n, value, msg) in self._shape_fail.items():
+                if self._is_a(focus, sh.target):
+                    self._violation(check, focus, sh.name, value, msg, sh.severity, count=n)
+            for (node, cls), (focus, sh) in self._shape_class.items():
+                if self._is_a(focus, sh.target) and not self._is_a(node, cls):
+                    self._violation("sh:class", focus, sh.name, node, f"value is not a {cls}", sh.severity)
+            if self._count_shapes:
+                for node in self._types:
+                    for sh in self._count_shapes:
+                        if not self._is_a(node, sh.target):
+                            continue
+                        n = self._card.get((node, sh.pred), 0)
+                        if sh.min_count is not None and n < sh.min_count:
+                            self._violation("sh:minCount", node, sh.name, n, f"{n} < {sh.min_count}", sh.severity)
+                        if sh.max_count is not None and n > sh.max_count:
+                            self._violation("sh:maxCount", node, sh.name, n, f"{n} > {sh.max_count}", sh.severity)
+
+        violations = sum(v for (sev, _), v in self.counts.items() if sev == "Violation")
+        return {"conforms": violations == 0, "triples": self.triples, "nodes": len(self._types),
+                "violations": violations,
+                "by_check": {f"{sev}:{check}": v for (sev, check), v in self.counts.most_common()},
+                "examples": self.examples}
+
+def print_report(report: Dict[str, Any], top: int = 10):
+    mark = "✅" if report["conforms"] else "❌"
+    print(f"{mark} Validation: {report['triples']} triples, {report['violations']} violation(s)")
+    for check, n in list(report["by_check"].items())[:top]:
+        print(f"  - {check}: {n}")
+
+def validate_abox(abox_path: str, onto_path: str, shapes: Optional[str] = None,
+                  report_path: Optional[str] = None, strict: bool = True) -> Dict[str, Any]:
+    """Validate an ABox file against the ontology (and shapes); optionally write the report as JSON."""
+    from .vocab_snapshot import load_snapshot
+    v = Validator(load_snapshot(onto_path), shapes=shapes, strict=strict)
+    report = v.feed(iter_abox(abox_path)).finish()
+    print_report(report)
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
@@ -1,16 +1,45 @@
 # pipeline/viz.py
-from pyvis.network import Network
+import os, json, math, shutil
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 from rdflib import Graph, URIRef, RDF
-from owlready2 import get_ontology, ThingClass
 
-def _enable_controls(net: Network):
+if TYPE_CHECKING:
+    from pyvis.network import Network
+
+def _enable_controls(net: "Network"):
     if isinstance(net.options, dict):
         net.options["configure"] = {"enabled": True}
     else:
         net.show_buttons()
 
-def visualize_abox(abox_path: str, html_out: str):
-    g = Graph(); g.parse(abox_path, format="turtle")
+def _parse(path: str) -> Graph:
+    # N-Triples output of write_abox_stream/patch_abox parses much faster than Turtle
+    if path.endswith((".sqlite", ".db")):
+        from .triple_store import TripleStore
+        with TripleStore(path, readonly=True) as store:
+            return store.to_graph()
+    from rdflib.util import guess_format
+    return Graph().parse(path, format=guess_format(path) or "turtle")
+
+def _prepare(g: Graph, focus: Optional[str], hops: int, large: Optional[bool]):
+    if focus:
+        g = ego_graph(g, focus, hops)
+    if large is None:
+        large = _count_nodes(g) > LARGE_NODES
+    return g, large
+
+def visualize_abox(abox_path: str, html_out: str, large: Optional[bool] = None,
+                   focus: Optional[str] = None, hops: int = 2):
+    """
+    Interactive pyvis view of an ABox. focus (IRI or local name) restricts
+    it to the ego graph within hops links. large=None switches to the
+    static large-graph view (write_large_view) above LARGE_NODES nodes.
+    """
+    g = _parse(abox_path)
+    g, large = _prepare(g, focus, hops, large)
+    if large:
+        return write_large_view(g, html_out)
+    from pyvis.network import Network  # pyvis pulls in IPython/jinja; load on first use
     net = Network(height="800px", width="100%", directed=True, bgcolor="white", font_color="black")
     net.set_options("""{
       "physics": {"solver": "forceAtlas2Based", "stabilization": {"iterations": 300}},
@@ -42,9 +71,17 @@ def visualize_abox(abox_path: str, html_out: str):
     net.write_html(html_out)
     print(f"✅ ABox graph saved to {html_out}")
 
-def visualize_tbox_abox(onto_path: str, abox_path: str, html_out: str):
-    onto = get_ontology(onto_path).load()
-    g = Graph(); g.parse(abox_path, format="turtle")
+def visualize_tbox_abox(onto_path: str, abox_path: str, html_out: str, large: Optional[bool] = None,
+                        focus: Optional[str] = None, hops: int = 2):
+    """Class hierarchy plus ABox overlay; focus/large as in visualize_abox."""
+    from .vocab_snapshot import load_snapshot
+    snap = load_snapshot(onto_path)
+    g = _parse(abox_path)
+    g, large = _prepare(g, focus, hops, large)
+    if large:
+        return write_large_view(g, html_out, class_edges=snap.class_edges(),
+                                classes=[c["name"] for c in snap.classes])
+    from pyvis.network import Network
 
     net = Network(height="800px", width="100%", directed=True)
     net.set_options("""{
@@ -60,11 +97,11 @@ def visualize_tbox_abox(onto_path: str, abox_path: str, html_out: str):
             net.add_node(nid, label=label, color=color); added.add(nid)
 
     # TBox (classes)
-    for cls in onto.classes():
-        add_node(cls.name, cls.name, "lightblue")
-        for parent in [p for p in cls.is_a if isinstance(p, ThingClass)]:
-            add_node(parent.name, parent.name, "lightblue")
-            net.add_edge(parent.name, cls.name, label="is_a", color="#8ec7ff")
+    for cls in snap.classes:
+        add_node(cls["name"], cls["name"], "lightblue")
+    for parent, child in snap.class_edges():
+        add_node(parent, parent, "lightblue")
+        net.add_edge(parent, child, label="is_a", color="#8ec7ff")
 
     # ABox overlay
     for s, p, o in g:
@@ -90,3 +127,189 @@ def visualize_tbox_abox(onto_path: str, abox_path: str, html_out: str):
                  shape="box", color="#f0f0f0")
     net.write_html(html_out)
     print(f"✅ TBox+ABox graph saved to {html_out}")
+
+# ---------- large-graph mode ----------
+# Above LARGE_NODES nodes the visualize_* functions switch to a static view:
+# literals become tooltips, instances are clustered by rdf:type around their
+# class, positions are computed here (physics off in the browser), and the
+# graph is written as a compact data script next to a small HTML loader.
+# Both are plain <script> tags against the bundled vis-network, so the page
+# opens from file:// and offline.
+LARGE_NODES = 2000
+_VIS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    "lib", "vis-9.1.2", "vis-network.min.js")
+_VIS_REL = "lib/vis-9.1.2/vis-network.min.js"  # pyvis' local-resources layout, next to the HTML
+_GOLDEN = math.pi * (3 - math.sqrt(5))
+
+def _local(term) -> str:
+    s = str(term)
+    return s.rsplit("#", 1)[-1].rsplit("/", 1)[-1] or s
+
+def ego_graph(g: Graph, center: str, hops: int = 1) -> Graph:
+    """
+    Triples within `hops` resource links of center (an IRI or a local name),
+    following edges in both directions; literals and rdf:type of every
+    reached node are kept.
+    """
+    node = URIRef(center)
+    if (node, None, None) not in g and (None, None, node) not in g:
+        matches = {t for t in g.all_nodes() if isinstance(t, URIRef) and _local(t) == center}
+        if not matches:
+            raise KeyError(f"{center!r} not found in graph")
+        node = sorted(matches)[0]
+    seen, frontier = {node}, {node}
+    for _ in range(hops):
+        nxt = set()
+        for n in frontier:
+            for _, p, o in g.triples((n, None, None)):
+                if isinstance(o, URIRef) and p != RDF.type:
+                    nxt.add(o)
+            for s, p, _ in g.triples((None, None, n)):
+                if p != RDF.type:
+                    nxt.add(s)
+        frontier = nxt - seen
+        seen |= frontier
+    sub = Graph()
+    for prefix, ns in g.namespaces():
+        sub.bind(prefix, ns)
+    for n in seen:
+        for t in g.triples((n, None, None)):
+            if not isinstance(t[2], URIRef) or t[2] in seen or t[1] == RDF.type:
+                sub.add(t)
+    print(f"🔎 Ego graph around {_local(node)} ({hops} hops): {len(seen)} nodes, {len(sub)} triples")
+    return sub
+
+def _count_nodes(g: Graph) -> int:
+    # what the pyvis views would draw: every subject and object, literals included
+    return len(set(g.subjects()) | set(g.objects()))
+
+def _layout(clusters: Dict[int, List[int]], spacing: float = 30.0) -> Dict[int, tuple]:
+    """
+    {hub: members} -> positions. Cluster centres (the hubs) sit on a
+    sunflower spiral spaced by cumulative cluster area; members sit on a
+    phyllotaxis spiral around their hub.
+    """
+    pos: Dict[int, tuple] = {}
+    area = 0.0
+    for k, (hub, members) in enumerate(sorted(clusters.items(), key=lambda kv: -len(kv[1]))):
+        r = spacing * math.sqrt(len(members) + 1)
+        dist = 2.0 * spacing * math.sqrt(area) + (r if k else 0.0)
+        cx, cy = dist * math.cos(k * _GOLDEN), dist * math.sin(k * _GOLDEN)
+        area += len(members) + 1 + 2 * math.sqrt(len(members) + 1)
+        for j, idx in enumerate(members):
+            d = spacing * math.sqrt(j + 1)
+            pos[idx] = (cx + d * math.cos(j * _GOLDEN), cy + d * math.sin(j * _GOLDEN))
+        pos[hub] = (cx, cy)
+    return pos
+
+_LOADER = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<script src="{vis}"></script>
+<script src="{data}"></script>
+<style>html,body,#g{{margin:0;width:100%;height:100%}}</style></head>
+<body><div id="g"></div><script>
+(d => {{
+  const nodes = d.nodes.map(n => ({{id: n[0], label: n[1], group: d.groups[n[2]],
+    x: n[3], y: n[4], title: n[5] || undefined, shape: n[6] ? "box" : "dot"}}));
+  const edges = d.edges.map(e => ({{from: e[0], to: e[1], title: d.labels[e[2]]}}));
+  new vis.Network(document.getElementById("g"),
+    {{nodes: new vis.DataSet(nodes), edges: new vis.DataSet(edges)}},
+    {{physics: false, layout: {{improvedLayout: false}},
+      interaction: {{hideEdgesOnDrag: true, tooltipDelay: 100}},
+      nodes: {{size: 6, font: {{size: 10}}}},
+      edges: {{arrows: {{to: {{enabled: true, scaleFactor: 0.4}}}}, color: {{opacity: 0.4}}, smooth: false}}}});
+}})(window.GRAPH_DATA);
+</script></body></html>
+"""
+
+def write_large_view(g: Graph, html_out: str, class_edges: Optional[List[tuple]] = None,
+                     classes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Static large-graph view of g: <html_out> (loader) + <stem>.data.js
+    (data, assigned to window.GRAPH_DATA); the bundled vis-network is copied
+    to lib/ next to html_out if missing.
+    Resource nodes only; each node's literal values go into its tooltip and
+    rdf:type becomes its cluster. Clusters are anchored on a hub node per
+    type; with classes/class_edges (TBox) every class is a hub and is_a
+    edges connect them. Returns node/edge counts.
+    """
+    ids: Dict[Any, int] = {}
+    nodes: List[list] = []
+    groups: Dict[str, int] = {}
+    labels: Dict[str, int] = {}
+    tips: Dict[int, List[str]] = {}
+    edges: List[list] = []
+
+    def gid(name):
+        return groups.setdefault(name, len(groups))
+
+    def node(key, label, group, hub=False):
+        i = ids.get(key)
+        if i is None:
+            i = ids[key] = len(nodes)
+            nodes.append([i, label, gid(group), 0.0, 0.0, "", 1 if hub else 0])
+        return i
+
+    def edge(a, b, label):
+        edges.append([a, b, labels.setdefault(label, len(labels))])
+
+    # class hubs
+    hubs: Dict[str, int] = {}
+    for c in classes or []:
+        hubs[c] = node(("class", c), c, "class", hub=True)
+    for parent, child in class_edges or []:
+        for c in (parent, child):
+            if c not in hubs:
+                hubs[c] = node(("class", c), c, "class", hub=True)
+        edge(hubs[child], hubs[parent], "is_a")
+
+    types: Dict[Any, str] = {}
+    for s, o in sorted(g.subject_objects(RDF.type)):
+        types.setdefault(s, _local(o))
+
+    for s, p, o in g:
+        if p == RDF.type:
+            continue
+        si = node(s, _local(s), types.get(s, "(untyped)"))
+        if isinstance(o, URIRef):
+            edge(si, node(o, _local(o), types.get(o, "(untyped)")), _local(p))
+        else:
+            tips.setdefault(si, []).append(f"{_local(p)} = {o}")
+    for s, t in types.items():
+        node(s, _local(s), t)
+
+    # clusters by type, anchored on the class hub (created if needed)
+    clusters: Dict[int, List[int]] = {}
+    for key, i in list(ids.items()):
+        if isinstance(key, tuple):  # a class hub
+            continue
+        t = types.get(key, "(untyped)")
+        if t not in hubs:
+            hubs[t] = node(("class", t), t, "class", hub=True)
+        clusters.setdefault(hubs[t], []).append(i)
+    for h in hubs.values():
+        clusters.setdefault(h, [])
+    for i, (x, y) in _layout(clusters).items():
+        nodes[i][3], nodes[i][4] = round(x, 1), round(y, 1)
+    for i, rows in tips.items():
+        nodes[i][5] = "\n".join(rows)
+    for i, members in clusters.items():
+        nodes[i][1] = f"{nodes[i][1]} ({len(members)})"
+
+    out_dir = os.path.dirname(os.path.abspath(html_out))
+    vis = os.path.join(out_dir, *_VIS_REL.split("/"))
+    if not os.path.exists(vis):
+        os.makedirs(os.path.dirname(vis), exist_ok=True)
+        shutil.copyfile(_VIS, vis)
+    data_path = os.path.splitext(html_out)[0] + ".data.js"
+    with open(data_path, "w", encoding="utf-8") as f:
+        f.write("window.GRAPH_DATA = ")
+        json.dump({"groups": list(groups), "labels": list(labels), "nodes": nodes, "edges": edges},
+                  f, ensure_ascii=False, separators=(",", ":"))
+        f.write(";\n")
+    with open(html_out, "w", encoding="utf-8") as f:
+        f.write(_LOADER.format(title=os.path.basename(html_out), vis=_VIS_REL,
+                               data=os.path.basename(data_path)))
+    print(f"✅ Large graph view saved to {html_out} (+ {os.path.basename(data_path)}: "
+          f"{len(nodes)} nodes, {len(edges)} edges)")
+    return {"nodes": len(nodes), "edges": len(edges), "data": data_path}
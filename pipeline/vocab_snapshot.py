@@ -0,0 +1,187 @@
+# pipeline/vocab_snapshot.py
+import os, sys, pickle, hashlib, threading
+from typing import List, Dict, Any, Optional, Tuple
+from . import metrics
+
+SNAPSHOT_VERSION = 1
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+# owlready2 hands data-property ranges back as Python types
+_PY_TO_XSD = {float: XSD + "decimal", int: XSD + "integer", str: XSD + "string", bool: XSD + "boolean"}
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def snapshot_path(owl_path: str) -> str:
+    return owl_path + ".vocab.pkl"
+
+def _names(items) -> List[str]:
+    out = []
+    for x in items:
+        if isinstance(x, type) and x in _PY_TO_XSD:
+            out.append(_PY_TO_XSD[x])
+        elif hasattr(x, "name"):
+            out.append(x.name)
+    return out
+
+@metrics.timed("vocab.compile")
+def compile_snapshot(owl_path: str, out_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parse the ontology once with owlready2 (in a private World) and write a
+    compact snapshot: classes and properties with labels, parents, and
+    property domains/ranges. An owlready2 quadstore (.sqlite3, from
+    ontology/ontology_builder.py) is opened instead of parsed. Returns the
+    snapshot dict.
+    """
+    from owlready2 import World, ThingClass
+    from .ontology_vocab import extract_vocab, is_quadstore, open_quadstore
+
+    path = os.path.abspath(owl_path)
+    if is_quadstore(path):
+        onto = open_quadstore(path)
+    else:
+        onto = World().get_ontology(f"file://{path}").load()
+    classes, obj_props, data_props = extract_vocab(onto)
+    labels = {x["iri"]: x["labels"] for x in classes + obj_props + data_props}
+
+    def entry(ent):
+        return {"iri": ent.iri, "name": ent.name, "labels": labels.get(ent.iri, [ent.name]),
+                "rdfs_labels": sorted(str(v) for v in getattr(ent, "label", []))}
+
+    snap_classes = []
+    for c in onto.classes():
+        e = entry(c)
+        e["parents"] = [p.name for p in c.is_a if isinstance(p, ThingClass)]
+        snap_classes.append(e)
+
+    def props(items, kind):
+        out = []
+        for p in items:
+            e = entry(p)
+            e["kind"] = kind
+            e["parents"] = [q.name for q in p.is_a if isinstance(q, type) and q.namespace is not None
+                            and q.namespace.ontology is onto]
+            e["domain"] = _names(p.domain)
+            e["range"] = _names(p.range)
+            out.append(e)
+        return out
+
+    st = os.stat(path)
+    snap = {
+        "version": SNAPSHOT_VERSION,
+        "source": {"sha256": file_sha256(path), "mtime_ns": st.st_mtime_ns, "size": st.st_size},
+        "base_iri": onto.base_iri,
+        "classes": snap_classes,
+        "obj_props": props(onto.object_properties(), "object"),
+        "data_props": props(onto.data_properties(), "data"),
+    }
+    _write(snap, out_path or snapshot_path(path))
+    return snap
+
+def _write(snap: Dict[str, Any], out_path: str):
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(snap, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, out_path)
+
+class VocabSnapshot:
+    """Read-only view of a compiled snapshot, in the shapes consumers expect."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.base_iri: str = data["base_iri"]
+        self.classes: List[Dict[str, Any]] = data["classes"]
+        self.obj_props: List[Dict[str, Any]] = data["obj_props"]
+        self.data_props: List[Dict[str, Any]] = data["data_props"]
+        self._gaz = None
+
+    def vocab(self):
+        """Same shape as ontology_vocab.extract_vocab."""
+        def strip(items):
+            return [{"iri": x["iri"], "name": x["name"], "labels": list(x["labels"])} for x in items]
+        return strip(self.classes), strip(self.obj_props), strip(self.data_props)
+
+    def gazetteer(self) -> Tuple[dict, dict]:
+        """Same maps as gazetteer.build_gazetteer (memoized)."""
+        if self._gaz is None:
+            from .gazetteer import _norm
+            label_to_class, label_to_prop = {}, {}
+            for c in self.classes:
+                for n in c["labels"]:
+                    label_to_class[_norm(n)] = c["name"]
+            for p in self.obj_props + self.data_props:
+                for n in [p["name"], *p["rdfs_labels"]]:
+                    label_to_prop[_norm(n)] = p["name"]
+            self._gaz = (label_to_class, label_to_prop)
+        return self._gaz
+
+    def class_edges(self) -> List[Tuple[str, str]]:
+        """(parent, child) pairs of the asserted class hierarchy."""
+        return [(p, c["name"]) for c in self.classes for p in c["parents"]]
+
+# abs path -> ((mtime_ns, size), VocabSnapshot)
+_LOADED: Dict[str, Tuple[Tuple[int, int], VocabSnapshot]] = {}
+_LOCK = threading.Lock()
+
+def _read(path: str) -> Optional[Dict[str, Any]]:
+    # an ordinary pickle cache: what it saves is the owlready2 parse, not the read
+    try:
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+        return None
+    if data.get("version") != SNAPSHOT_VERSION:
+        return None
+    return data
+
+def load_snapshot(owl_path: str) -> VocabSnapshot:
+    """
+    Snapshot for owl_path (.owl or quadstore), memoized per process. The
+    on-disk snapshot is rebuilt when the file's content hash changes
+    (mtime/size is checked first, so an untouched file costs one stat call;
+    a touched but unchanged file is hashed once and its stamp refreshed).
+    """
+    path = os.path.abspath(owl_path)
+    st = os.stat(path)
+    quick = (st.st_mtime_ns, st.st_size)
+    with _LOCK:
+        hit = _LOADED.get(path)
+        if hit and hit[0] == quick:
+            return hit[1]
+
+        data = _read(snapshot_path(path))
+        if data is not None:
+            src = data["source"]
+            if (src["mtime_ns"], src["size"]) != quick:
+                if src["sha256"] != file_sha256(path):
+                    data = None
+                else:  # touched or checked out again: same content, new stamp
+                    src["mtime_ns"], src["size"] = quick
+                    _write(data, snapshot_path(path))
+        if data is None:
+            data = compile_snapshot(path)
+        snap = VocabSnapshot(data)
+        _LOADED[path] = (quick, snap)
+        return snap
+
+def invalidate_snapshot(owl_path: Optional[str] = None):
+    """Forget loaded snapshots (one ontology, or all) and delete the files."""
+    with _LOCK:
+        paths = [os.path.abspath(owl_path)] if owl_path else list(_LOADED)
+        for path in paths:
+            _LOADED.pop(path, None)
+            try:
+                os.remove(snapshot_path(path))
+            except FileNotFoundError:
+                pass
+
+if __name__ == "__main__":
+    # python -m pipeline.vocab_snapshot ontology/general_aec.owl
+    for p in sys.argv[1:]:
+        s = compile_snapshot(p)
+        print(f"✅ Snapshot {snapshot_path(os.path.abspath(p))}: "
+              f"{len(s['classes'])} classes, {len(s['obj_props'])}+{len(s['data_props'])} properties")
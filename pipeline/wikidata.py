@@ -1,16 +1,199 @@
 # pipeline/wikidata.py
+import os, json, time, sqlite3, pathlib, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Optional
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_URL = "https://www.wikidata.org/w/api.php"
+USER_AGENT = "Semantic_Tech/0.1 (AEC ontology pipeline)"  # Wikidata asks for a descriptive UA
+
+def _norm(label: str) -> str:
+    return " ".join(label.lower().split())
+
+def _parse(data: Dict[str, Any]) -> List[Dict[str, str]]:
+    return [{"id": x["id"], "label": x.get("label", ""), "desc": x.get("description", "")}
+            for x in data.get("search", [])]
+
+class WikidataCache:
+    """
+    SQLite cache of search results keyed by (lang, limit, normalized label).
+    Empty results are cached too, with their own (shorter) TTL.
+    A cache file doubles as an offline dump; readonly=True opens an
+    existing one without creating or writing anything.
+    """
+
+    def __init__(self, path: str, ttl: float = 30 * 86400, negative_ttl: float = 86400,
+                 readonly: bool = False):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        if readonly:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Wikidata dump not found at {path}")
+            self._db = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + "?mode=ro", uri=True,
+                                       check_same_thread=False)
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS search (
+            key TEXT PRIMARY KEY, label TEXT, results TEXT, fetched REAL)""")
+        self._db.commit()
+
+    @staticmethod
+    def key(label: str, lang: str, limit: int) -> str:
+        return f"{lang}|{limit}|{_norm(label)}"
+
+    def get(self, key: str, expire: bool = True) -> Optional[List[Dict[str, str]]]:
+        with self._lock:
+            row = self._db.execute("SELECT results, fetched FROM search WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        results = json.loads(row[0])
+        if expire and time.time() - row[1] > (self.ttl if results else self.negative_ttl):
+            return None
+        return results
+
+    def put_many(self, rows: Iterable[tuple]):
+        """rows: (key, label, results)"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO search VALUES (?, ?, ?, ?)",
+                                 [(k, lab, json.dumps(res, ensure_ascii=False), now) for k, lab, res in rows])
+            self._db.commit()
+
+    def export_json(self, path: str):
+        """Dump {label: results} (first lang/limit seen per label) for offline runs."""
+        out: Dict[str, Any] = {}
+        with self._lock:
+            for label, results in self._db.execute("SELECT label, results FROM search ORDER BY key"):
+                out.setdefault(label, json.loads(results))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(out, f, ensure_ascii=False, indent=1)
+
+    def close(self):
+        self._db.close()
+
+class WikidataLinker:
+    """
+    Batched Wikidata entity search. Labels are deduplicated (case and
+    whitespace folded) and looked up in the cache first. Misses go out over
+    one pooled requests.Session with at most max_workers requests in flight.
+    The session retries 429/5xx with backoff and honours Retry-After.
+
+    offline: path to a dump, either a WikidataCache .sqlite file or JSON
+    {label: [{"id","label","desc"}]}; a missing dump raises FileNotFoundError.
+    Nothing goes over the network then; unknown labels return []. Network
+    errors are never cached.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, lang: str = "en", limit: int = 1,
+                 max_workers: int = 8, timeout: float = 8.0, ttl: float = 30 * 86400,
+                 negative_ttl: float = 86400, offline: Optional[str] = None,
+                 session: Optional[requests.Session] = None):
+        self.lang = lang
+        self.limit = limit
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.cache = WikidataCache(cache_path, ttl, negative_ttl) if cache_path else None
+        self.offline: Optional[Dict[str, Any]] = None
+        self._offline_db: Optional[WikidataCache] = None
+        if offline:
+            if offline.endswith(".json"):
+                with open(offline, encoding="utf-8") as f:
+                    self.offline = {_norm(k): v for k, v in json.load(f).items()}
+            else:
+                self._offline_db = WikidataCache(offline, readonly=True)
+        self._session = session
+        self._session_lock = threading.Lock()
+        self.stats = {"labels": 0, "unique": 0, "hits": 0, "requests": 0, "errors": 0}
+
+    @property
+    def session(self) -> requests.Session:
+        with self._session_lock:
+            if self._session is None:
+                s = requests.Session()
+                retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                              allowed_methods=("GET",), respect_retry_after_header=True)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers, max_retries=retry)
+                s.mount("https://", adapter)
+                s.headers["User-Agent"] = USER_AGENT
+                self._session = s
+            return self._session
+
+    def _fetch(self, label: str) -> Optional[List[Dict[str, str]]]:
+        params = {"action": "wbsearchentities", "format": "json",
+                  "language": self.lang, "search": label, "limit": self.limit}
+        try:
+            r = self.session.get(API_URL, params=params, timeout=self.timeout)
+            r.raise_for_status()
+            return _parse(r.json())
+        except Exception:
+            return None
+
+    def _lookup_offline(self, label: str, key: str) -> List[Dict[str, str]]:
+        if self.offline is not None:
+            return self.offline.get(_norm(label), [])[:self.limit]
+        return (self._offline_db.get(key, expire=False) or [])[:self.limit]
+
+    def search_many(self, labels: Iterable[str]) -> Dict[str, List[Dict[str, str]]]:
+        """{label: [{"id","label","desc"}]} for every input label."""
+        labels = list(labels)
+        by_key: Dict[str, str] = {}
+        for lab in labels:
+            if lab and lab.strip():
+                by_key.setdefault(WikidataCache.key(lab, self.lang, self.limit), lab)
+        self.stats["labels"] += len(labels)
+        self.stats["unique"] += len(by_key)
+
+        found: Dict[str, List[Dict[str, str]]] = {}
+        missing = []
+        for key, lab in by_key.items():
+            if self.offline is not None or self._offline_db is not None:
+                found[key] = self._lookup_offline(lab, key)
+                continue
+            hit = self.cache.get(key) if self.cache else None
+            if hit is not None:
+                found[key] = hit
+                self.stats["hits"] += 1
+            else:
+                missing.append(key)
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                fetched = list(pool.map(lambda k: self._fetch(by_key[k]), missing))
+            self.stats["requests"] += len(missing)
+            fresh = []
+            for key, res in zip(missing, fetched):
+                if res is None:
+                    self.stats["errors"] += 1
+                    res = []
+                else:
+                    fresh.append((key, _norm(by_key[key]), res))
+                found[key] = res
+            if self.cache and fresh:
+                self.cache.put_many(fresh)
+
+        return {lab: found.get(WikidataCache.key(lab, self.lang, self.limit), []) if lab and lab.strip() else []
+                for lab in labels}
+
+    def search(self, label: str) -> List[Dict[str, str]]:
+        return self.search_many([label])[label]
+
+    def report(self):
+        st = self.stats
+        print(f"🌐 Wikidata: labels={st['labels']} unique={st['unique']} cache_hits={st['hits']} "
+              f"requests={st['requests']} errors={st['errors']}")
+
+_DEFAULT: Dict[tuple, WikidataLinker] = {}
+_DEFAULT_LOCK = threading.Lock()
 
 def wikidata_search(label: str, lang="en", limit=1):
-    url = "https://www.wikidata.org/w/api.php"
-    params = {
-        "action":"wbsearchentities","format":"json",
-        "language": lang, "search": label, "limit": limit
-    }
-    try:
-        r = requests.get(url, params=params, timeout=8)
-        r.raise_for_status()
-        data = r.json().get("search", [])
-        return [{"id":x["id"], "label":x.get("label",""), "desc":x.get("description","")} for x in data]
-    except Exception:
-        return []
+    # one pooled linker per (lang, limit), so repeated calls reuse connections
+    with _DEFAULT_LOCK:
+        linker = _DEFAULT.get((lang, limit))
+        if linker is None:
+            linker = _DEFAULT[(lang, limit)] = WikidataLinker(lang=lang, limit=limit)
+    return linker.search(label)
@@ -0,0 +1,22 @@
+# tests/test_fusion.py
+from pipeline.fusion import RDF_TYPE, TripleFusion
+
+def _linked(subject, cls):
+    return {"subject": {"name": subject, "class": cls, "score": 0.9},
+            "predicate": {"name": "pressure", "kind": "data"},
+            "object_literal": {"value": 6}}
+
+def test_class_does_not_merge_with_same_named_instance():
+    f = TripleFusion()
+    f.add_linked([_linked("hydrant", "Hydrant"), _linked("Hydrant", "Hydrant")])
+    triples = f.resolve().triples()
+    assert ("hydrant", RDF_TYPE, "Hydrant", "object") in triples
+    assert ("hydrant", RDF_TYPE, "hydrant", "object") not in triples
+    assert len([t for t in triples if t[1] == RDF_TYPE]) == 1
+
+def test_instances_still_merge_case_insensitively():
+    f = TripleFusion()
+    f.add("Tunnel X", "hasRisk", "fire risk")
+    f.add("tunnel  x", "hasRisk", "Fire Risk")
+    r = f.resolve()
+    assert r.stats["fused"] == 1 and r.stats["duplicates"] == 1
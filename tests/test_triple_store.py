@@ -0,0 +1,33 @@
+# tests/test_triple_store.py
+from pipeline.triple_store import TripleStore
+
+NT = ('<http://example.org/aec#h1> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> '
+      '<http://example.org/aec#Hydrant> .\n'
+      '<http://example.org/aec#h1> <http://example.org/aec#pressure> '
+      '"7"^^<http://www.w3.org/2001/XMLSchema#integer> .\n')
+
+def _store(tmp_path):
+    ts = TripleStore(str(tmp_path / "store.sqlite"))
+    for doc in ("doc1", "doc2"):
+        path = tmp_path / f"{doc}.nt"
+        path.write_text(NT, encoding="utf-8")
+        ts.load_file(str(path))
+    return ts
+
+def test_union_query_returns_triple_in_two_graphs_once(tmp_path):
+    with _store(tmp_path) as ts:
+        rows = list(ts.sparql("SELECT ?h ?p WHERE { ?h a ex:Hydrant ; ex:pressure ?p }"))
+        assert len(rows) == 1
+        assert len(list(ts.query([("?h", "rdf:type", "ex:Hydrant")], distinct=False))) == 1
+
+def test_graph_query_reads_only_that_graph(tmp_path):
+    with _store(tmp_path) as ts:
+        g = ts.graphs()[1]
+        rows = list(ts.query([("?h", "ex:pressure", 7)], distinct=False, graph=g))
+        assert len(rows) == 1
+
+def test_len_counts_triples_not_quads(tmp_path):
+    with _store(tmp_path) as ts:
+        assert len(ts) == 2
+        assert ts.count(p="ex:pressure") == 1
+        assert ts.count(graph=ts.graphs()[0]) == 2
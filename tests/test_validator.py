@@ -0,0 +1,40 @@
+# tests/test_validator.py
+from types import SimpleNamespace
+from pipeline.validator import Validator, iter_nt_lines
+
+EX = "http://example.org/aec#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+SHAPES = f"""@prefix sh: <http://www.w3.org/ns/shacl#> .
+@prefix xsd: <{XSD}> .
+@prefix ex: <{EX}> .
+ex:HydrantShape a sh:NodeShape ;
+    sh:targetClass ex:Hydrant ;
+    sh:property [ sh:path ex:pressure ; sh:datatype xsd:float ; sh:maxInclusive 40 ] ;
+    sh:property [ sh:path ex:colour ; sh:in ("red") ] .
+"""
+
+def _validator(tmp_path, strict=True):
+    shapes = tmp_path / "shapes.ttl"
+    shapes.write_text(SHAPES, encoding="utf-8")
+    snap = SimpleNamespace(
+        classes=[{"name": "Hydrant", "parents": []}], obj_props=[],
+        data_props=[{"name": "pressure", "kind": "data", "domain": ["Hydrant"], "range": [XSD + "decimal"]}])
+    return Validator(snap, shapes=str(shapes), strict=strict)
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+def test_integer_value_satisfies_numeric_shape_datatype(tmp_path):
+    lines = [f'<{EX}h1> <{EX}pressure> "7"^^<{XSD}integer> .', f"<{EX}h1> <{RDF_TYPE}> <{EX}Hydrant> ."]
+    report = _validator(tmp_path).feed(iter_nt_lines(lines)).finish()
+    assert report["conforms"] and report["by_check"] == {}
+
+def test_shape_failures_count_before_and_after_type(tmp_path):
+    lines = [f"<{EX}h1> <{EX}pressure> \"{v}\"^^<{XSD}float> ." for v in (50, 60)]
+    lines.insert(1, f"<{EX}h1> <{RDF_TYPE}> <{EX}Hydrant> .")
+    report = _validator(tmp_path).feed(iter_nt_lines(lines)).finish()
+    assert report["by_check"]["Violation:sh:maxInclusive"] == 2
+
+def test_shapes_checked_on_predicates_outside_the_tbox(tmp_path):
+    lines = [f"<{EX}h1> <{RDF_TYPE}> <{EX}Hydrant> .",
+             f'<{EX}h1> <{EX}colour> "blue" .']
+    report = _validator(tmp_path, strict=False).feed(iter_nt_lines(lines)).finish()
+    assert report["by_check"] == {"Violation:sh:in": 1}